@@ -0,0 +1,71 @@
+# benchmarks/_offline.py  (shared stand-ins: the real graph wired to local fakes, no API calls)
+
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from langchain_core.documents import Document
+
+
+class SleepyRetriever:
+    """
+    Fixed chunks after `latency` seconds of blocking work, like a Chroma
+    search behind a remote query embedding. Counts its calls.
+    """
+
+    def __init__(self, docs: List[Document], latency: float = 0.1):
+        self.docs = docs
+        self.latency = latency
+        self.calls = 0
+
+    def invoke(self, query: str, **kwargs) -> List[Document]:
+        self.calls += 1
+        time.sleep(self.latency)
+        return list(self.docs)
+
+
+def sample_docs(n: int = 12) -> List[Document]:
+    topics = ["sore throat", "seasonal flu", "blood pressure", "clinic hours", "vaccinations", "allergies"]
+    return [
+        Document(
+            page_content=f"{topics[i % len(topics)].capitalize()}: guidance paragraph {i}. " * 20,
+            metadata={"source": f"Data/guide-{i % 3}.pdf", "page": i},
+        )
+        for i in range(n)
+    ]
+
+
+def offline_app(tmp_dir: Path, retriever=None, llm_latency: float = 0.5):
+    """
+    Compiled graph with the offline LLM, `retriever` (SleepyRetriever by
+    default), an in-memory checkpointer and a throwaway appointment book.
+    """
+    from checkpoint import BoundedMemorySaver
+    from graph import build_graph
+    from replay import OfflineChatModel
+    from slots import SlotSchedule
+
+    retriever = retriever or SleepyRetriever(sample_docs())
+    return build_graph(
+        retriever,
+        OfflineChatModel(latency=llm_latency),
+        checkpointer=BoundedMemorySaver(),
+        response_cache=None,
+        schedule=SlotSchedule(Path(tmp_dir) / "slots.sqlite"),
+    )
+
+
+def serve_offline(app_graph) -> None:
+    """
+    Point main.py's clinic registry at `app_graph`, skipping warm-up.
+    """
+    import main
+    from graph import DEFAULT_CLINIC
+    from tenants import TenantRegistry
+
+    main.Components.clinics = TenantRegistry({DEFAULT_CLINIC.id: DEFAULT_CLINIC}, lambda _: (app_graph, lambda: None))
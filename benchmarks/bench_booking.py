@@ -0,0 +1,94 @@
+# benchmarks/bench_booking.py  (per-turn latency, LLM calls and prompt tokens: booking turns vs a RAG turn)
+#
+#   python benchmarks/bench_booking.py --llm-latency 0.5 --retrieve-latency 0.1
+#
+# Runs a full ten-turn booking through the compiled graph with the offline LLM
+# and a throwaway appointment book, then one medical question on the same
+# thread. Before the booking state machine every booking turn was such a
+# RAG + generation turn over the whole history; the last row is that cost.
+
+import argparse
+import asyncio
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from _offline import SleepyRetriever, sample_docs
+
+from langchain_core.messages import HumanMessage
+
+from checkpoint import BoundedMemorySaver
+from graph import build_graph
+from replay import OfflineChatModel
+from rerank import approx_tokens
+from slots import SlotSchedule
+
+
+class CountingChatModel(OfflineChatModel):
+    calls: int = 0
+    prompt_tokens: int = 0
+
+    def _reply(self, messages):
+        self.calls += 1
+        self.prompt_tokens += sum(approx_tokens(str(m.content)) for m in messages)
+        return super()._reply(messages)
+
+
+def next_weekday() -> date:
+    day = date.today() + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+SCRIPT = [
+    "I'd like to book an appointment",
+    "I've had a sore throat for a week",
+    next_weekday().isoformat(),
+    "10am",
+    "Ana Lee",
+    "ana.lee@example.com",
+    "555-123-4567",
+    "March 3, 1990",
+    "no",
+    "yes",
+]
+
+
+async def run(llm_latency: float, retrieve_latency: float) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        retriever = SleepyRetriever(sample_docs(), retrieve_latency)
+        llm = CountingChatModel(latency=llm_latency)
+        # As _offline.offline_app, with the counting model
+        app_graph = build_graph(retriever, llm, checkpointer=BoundedMemorySaver(), response_cache=None,
+                                schedule=SlotSchedule(Path(tmp) / "slots.sqlite"))
+        config = {"configurable": {"thread_id": "bench-booking"}}
+
+        rows = []
+        for text in SCRIPT + ["What helps a sore throat?"]:
+            calls, tokens, searches = llm.calls, llm.prompt_tokens, retriever.calls
+            started = time.perf_counter()
+            result = await app_graph.ainvoke({"messages": [HumanMessage(content=text)]}, config=config)
+            rows.append((text, result.get("route"), time.perf_counter() - started,
+                         llm.calls - calls, llm.prompt_tokens - tokens, retriever.calls - searches))
+
+    print(f"{'turn':38s} {'route':8s} {'ms':>7s} {'llm':>4s} {'prompt tok':>10s} {'searches':>8s}")
+    for text, route, seconds, calls, tokens, searches in rows:
+        print(f"{text[:38]:38s} {str(route):8s} {seconds * 1000:7.1f} {calls:4d} {tokens:10d} {searches:8d}")
+
+    booking = [r for r in rows[:-1] if r[1] == "booking"]
+    rag = rows[-1]
+    mean = sum(r[2] for r in booking) / len(booking)
+    print(f"\nbooking turns: mean {mean * 1000:.1f} ms, {sum(r[3] for r in booking)} LLM calls, "
+          f"{sum(r[4] for r in booking)} prompt tokens over {len(booking)} turns")
+    print(f"one RAG turn:  {rag[2] * 1000:.1f} ms, {rag[3]} LLM call(s), {rag[4]} prompt tokens "
+          f"-> x{rag[2] / mean:.0f} the latency of a booking turn")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Booking-turn cost through the graph with offline stand-ins.")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--retrieve-latency", type=float, default=0.1)
+    args = parser.parse_args()
+    asyncio.run(run(args.llm_latency, args.retrieve_latency))
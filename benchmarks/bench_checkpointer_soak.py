@@ -0,0 +1,90 @@
+# benchmarks/bench_checkpointer_soak.py  (RSS stays flat as sessions pile up)
+#
+#   python benchmarks/bench_checkpointer_soak.py --sessions 100000 --backend sqlite
+#
+# Each synthetic session is a two-turn conversation written through a
+# compiled LangGraph graph, so the checkpoints have the real shape. Prints
+# resident memory and retained threads every `--every` sessions; with the
+# eviction caps the RSS column should level off instead of growing.
+
+import argparse
+import asyncio
+import gc
+import os
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import _offline  # noqa: F401  (puts the project root on sys.path)
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, StateGraph
+from langgraph.graph.message import MessagesState
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        # Peak, not current, outside Linux; still shows unbounded growth
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def retained_threads(checkpointer) -> int:
+    if hasattr(checkpointer, "conn"):
+        return checkpointer.conn.execute("SELECT COUNT(*) FROM thread_activity").fetchone()[0]
+    return len(checkpointer.storage)
+
+
+def make_app(checkpointer):
+    async def answer(state: MessagesState):
+        question = state["messages"][-1].content
+        return {"messages": [AIMessage(content=f"Here is some guidance about {question}. " * 8)]}
+
+    graph = StateGraph(MessagesState)
+    graph.add_node("answer", answer)
+    graph.set_entry_point("answer")
+    graph.add_edge("answer", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+async def soak(checkpointer, sessions: int, every: int) -> None:
+    app = make_app(checkpointer)
+    started = time.perf_counter()
+    print(f"{'sessions':>9} {'rss MB':>8} {'threads':>8} {'sessions/s':>10}")
+    for n in range(1, sessions + 1):
+        config = {"configurable": {"thread_id": f"soak-{n}"}}
+        for turn in ("a sore throat", "how long it lasts"):
+            await app.ainvoke({"messages": [HumanMessage(content=f"Patient {n} asks about {turn}")]}, config)
+        if n % every == 0:
+            gc.collect()
+            rate = n / (time.perf_counter() - started)
+            print(f"{n:>9} {rss_mb():>8.1f} {retained_threads(checkpointer):>8} {rate:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkpointer RSS soak over synthetic sessions.")
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--every", type=int, default=10_000)
+    parser.add_argument("--backend", choices=["sqlite", "memory"], default="sqlite")
+    parser.add_argument("--max-threads", type=int, default=5_000)
+    args = parser.parse_args()
+
+    from checkpoint import BoundedMemorySaver, SqliteCheckpointer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.backend == "sqlite":
+            checkpointer = SqliteCheckpointer(Path(tmp) / "soak.sqlite", max_threads=args.max_threads)
+        else:
+            checkpointer = BoundedMemorySaver(max_threads=args.max_threads)
+        asyncio.run(soak(checkpointer, args.sessions, args.every))
+        if args.backend == "sqlite":
+            checkpointer.conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/bench_concurrency.py  (concurrent /chat requests overlap instead of queuing)
+#
+#   python benchmarks/bench_concurrency.py --requests 32
+#
+# Drives main.app in-process with an offline LLM (fixed latency) and a
+# blocking fake retriever. With the async graph, N concurrent turns should
+# take about one turn's latency, not N of them.
+
+import argparse
+import asyncio
+import tempfile
+import time
+
+from _offline import offline_app, serve_offline
+
+import httpx
+
+
+async def run(requests: int, llm_latency: float, retrieve_latency: float) -> None:
+    import main
+    from _offline import SleepyRetriever, sample_docs
+
+    with tempfile.TemporaryDirectory() as tmp:
+        serve_offline(offline_app(tmp, SleepyRetriever(sample_docs(), retrieve_latency), llm_latency))
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+
+            async def turn(n: int) -> float:
+                started = time.perf_counter()
+                r = await client.post("/chat", json={"question": "What helps a sore throat?", "thread_id": f"b{n}"})
+                r.raise_for_status()
+                return time.perf_counter() - started
+
+            single = await turn(-1)
+            started = time.perf_counter()
+            latencies = sorted(await asyncio.gather(*(turn(n) for n in range(requests))))
+            wall = time.perf_counter() - started
+
+    print(f"single turn:        {single * 1000:.0f} ms")
+    print(f"{requests} concurrent:     {wall * 1000:.0f} ms wall "
+          f"(p50 {latencies[len(latencies) // 2] * 1000:.0f} ms, max {latencies[-1] * 1000:.0f} ms)")
+    print(f"if queued serially: {single * requests * 1000:.0f} ms -> overlap x{single * requests / wall:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent /chat turns against offline stand-ins.")
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--retrieve-latency", type=float, default=0.1)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.llm_latency, args.retrieve_latency))
@@ -0,0 +1,103 @@
+# benchmarks/bench_frontend_throughput.py  (frontend /send throughput: pooled client vs a client per request)
+#
+#   python benchmarks/bench_frontend_throughput.py --requests 400 --concurrency 32
+#
+# Serves a stub backend (/chat answers after --backend-latency) with uvicorn on
+# a local port and drives frontend.app in-process. "before" opens a fresh
+# httpx.AsyncClient per turn, as the frontend used to; "after" uses the pooled
+# keep-alive client from the lifespan.
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import httpx
+import uvicorn
+from fastapi import FastAPI
+
+
+def stub_backend(latency: float) -> FastAPI:
+    stub = FastAPI()
+
+    @stub.post("/chat")
+    async def chat(body: dict):
+        await asyncio.sleep(latency)
+        return {"answer": f"Stub answer to: {body['question']}", "sources": []}
+
+    return stub
+
+
+def serve_stub(latency: float) -> str:
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(stub_backend(latency), log_level="warning"))
+    threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+class PerRequestClient:
+    """The old frontend: a new client (and TCP connection) for every backend call."""
+
+    async def post(self, url, **kwargs):
+        async with httpx.AsyncClient(timeout=40.0) as client:
+            return await client.post(url, **kwargs)
+
+
+async def drive(app, requests: int, concurrency: int) -> tuple:
+    transport = httpx.ASGITransport(app=app)
+    gate = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+
+        async def turn(n: int) -> None:
+            async with gate:
+                started = time.perf_counter()
+                r = await client.post("/send", json={"message": f"question {n}"},
+                                      cookies={"vena_session": f"s{n % concurrency}"})
+                r.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(turn(n) for n in range(requests)))
+        wall = time.perf_counter() - started
+
+    latencies.sort()
+    return requests / wall, latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99) - 1]
+
+
+async def run(requests: int, concurrency: int, backend_latency: float) -> None:
+    os.environ["BACKEND_URLS"] = serve_stub(backend_latency)
+    os.chdir(ROOT)  # StaticFiles / templates resolve from the repo root
+    import frontend
+
+    async with frontend.lifespan(frontend.app):
+        pooled = frontend.http_client
+        for label, client in (("before (client per request)", PerRequestClient()), ("after (pooled client)", pooled)):
+            frontend.http_client = client
+            await drive(frontend.app, concurrency, concurrency)  # warm-up
+            rps, p50, p99 = await drive(frontend.app, requests, concurrency)
+            print(f"{label:28s} {rps:7.1f} req/s   p50 {p50 * 1000:6.1f} ms   p99 {p99 * 1000:6.1f} ms")
+        frontend.http_client = pooled
+        assert all(b.in_flight == 0 for b in frontend.backend_pool.backends), "backend slot leaked"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Frontend /send throughput against a local stub backend.")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--backend-latency", type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.concurrency, args.backend_latency))
@@ -0,0 +1,111 @@
+# benchmarks/bench_ingest.py  (ingestion throughput on a synthetic PDF corpus)
+#
+#   python benchmarks/bench_ingest.py --files 24 --pages 10
+#
+# Writes plain-text PDFs to a temp Data/ dir and runs ingest.sync_vectorstore
+# into a temp Chroma store with a local fake embedder that sleeps like an
+# API call. Compares one parsing process + one embedding request in flight
+# against the configured pool sizes, and reports chunks/s and peak RSS.
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+import _offline  # noqa: F401  (puts the project root on sys.path)
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+WORDS = ("clinic policy appointment cold remedy ibuprofen fever hydration vaccine blood pressure "
+         "allergy dosage follow-up referral insurance pharmacy").split()
+
+
+class SlowFakeEmbeddings(DeterministicFakeEmbedding):
+    """
+    Deterministic vectors; each embed_documents call takes `latency` seconds.
+    """
+
+    latency: float = 0.3
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+
+def write_pdf(path: Path, pages) -> None:
+    """
+    Minimal single-font PDF, one text block per page; enough for pypdf.
+    """
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        text = "BT /F1 10 Tf 40 800 Td 12 TL " + " ".join(f"({line}) '" for line in lines) + " ET"
+        objects.append(f"<< /Length {len(text)} >>\nstream\n{text}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out, offsets = b"%PDF-1.4\n", []
+    for n, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{n} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(out)
+
+
+def make_corpus(data_dir: Path, files: int, pages: int) -> None:
+    data_dir.mkdir(parents=True)
+    for f in range(files):
+        write_pdf(data_dir / f"doc-{f:03d}.pdf", [
+            [f"Document {f} page {p} line {l}: " + " ".join(WORDS[(f + p + l + i) % len(WORDS)] for i in range(12))
+             for l in range(60)]
+            for p in range(pages)
+        ])
+
+
+def run(root: Path, files: int, pages: int, workers: int, concurrency: int, latency: float) -> float:
+    import graph
+    import ingest
+    from tenants import Tenant
+
+    embeddings = SlowFakeEmbeddings(size=256, latency=latency)
+    graph.get_embeddings = ingest.get_embeddings = lambda: embeddings
+    ingest.EMBED_CONCURRENCY = concurrency
+
+    clinic = Tenant("bench", "Bench Clinic", "UTC", root / "Data", root / f"vs-{workers}-{concurrency}",
+                    root / "slots.sqlite")
+    if not clinic.data_dir.exists():
+        make_corpus(clinic.data_dir, files, pages)
+
+    started = time.perf_counter()
+    vectordb = ingest.sync_vectorstore(workers=workers, clinic=clinic)
+    elapsed = time.perf_counter() - started
+    chunks = len(vectordb.get(include=[])["ids"])
+    print(f"workers={workers} embed_concurrency={concurrency}: {chunks} chunks in {elapsed:.2f}s "
+          f"({chunks / elapsed:.0f} chunks/s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion throughput on synthetic PDFs.")
+    parser.add_argument("--files", type=int, default=24)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds per fake embedding request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        serial = run(Path(tmp), args.files, args.pages, 1, 1, args.latency)
+        parallel = run(Path(tmp), args.files, args.pages, args.workers, args.concurrency, args.latency)
+    print(f"speed-up x{serial / parallel:.1f}; peak RSS {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
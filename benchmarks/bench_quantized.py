@@ -0,0 +1,136 @@
+# benchmarks/bench_quantized.py  (recall@k, query latency and index size: Chroma vs the quantized store)
+#
+#   python benchmarks/bench_quantized.py --vectors 20000 --queries 200
+#
+# Synthetic 3072-dim vectors shaped like text-embedding-3 output: variance is
+# front-loaded, so a prefix is a usable lower-dimensional embedding
+# (Matryoshka). Each query is a noisy copy of one stored vector, and recall@k
+# is measured against exact float32 cosine search over the full vectors, so
+# every backend is scored on what it loses by approximating. Real corpus
+# recall still has to be checked on real embeddings.
+
+import argparse
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from _offline import ROOT  # noqa: F401  (puts the repo root on sys.path)
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import FakeEmbeddings
+
+from quantized_store import QuantizedVectorStore
+
+BATCH = 2000
+
+
+def synthetic(n_vectors: int, n_queries: int, dim: int, noise: float, seed: int = 7):
+    """(vectors, queries), both unit-norm float32."""
+    rng = np.random.default_rng(seed)
+    scale = (np.arange(dim) + 1.0) ** -0.5
+    vectors = (rng.standard_normal((n_vectors, dim)) * scale).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    targets = rng.choice(n_vectors, n_queries, replace=False)
+    queries = vectors[targets] + noise * (rng.standard_normal((n_queries, dim)) * scale).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+    return vectors, queries
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> list:
+    truth = []
+    for start in range(0, len(queries), 64):
+        scores = queries[start:start + 64] @ vectors.T
+        truth.extend(set(map(int, row)) for row in np.argsort(-scores, axis=1)[:, :k])
+    return truth
+
+
+def dir_mb(path: Path) -> float:
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file()) / (1 << 20)
+
+
+def report(name: str, search, queries: np.ndarray, truth: list, k: int, size_mb: float, open_ms: float) -> None:
+    hits, latencies = 0, []
+    for query, relevant in zip(queries, truth):
+        started = time.perf_counter()
+        found = search(query)
+        latencies.append(time.perf_counter() - started)
+        hits += len(relevant & set(found))
+    latencies.sort()
+    print(f"{name:32s} recall@{k} {hits / (k * len(queries)):6.3f}   p50 {statistics.median(latencies) * 1000:7.2f} ms   "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.2f} ms   {size_mb:7.1f} MB   open {open_ms:6.1f} ms")
+
+
+def bench_chroma(root: Path, vectors: np.ndarray, queries: np.ndarray, truth: list, k: int) -> None:
+    import chromadb
+
+    path = root / "chroma"
+    client = chromadb.PersistentClient(path=str(path))
+    collection = client.create_collection("bench", metadata={"hnsw:space": "cosine"})
+    for start in range(0, len(vectors), BATCH):
+        ids = [str(i) for i in range(start, min(start + BATCH, len(vectors)))]
+        collection.add(ids=ids, embeddings=vectors[start:start + BATCH], documents=ids)
+    client.close()
+
+    started = time.perf_counter()
+    client = chromadb.PersistentClient(path=str(path))
+    collection = client.get_collection("bench")
+    open_ms = (time.perf_counter() - started) * 1000
+
+    def search(query):
+        result = collection.query(query_embeddings=[query], n_results=k)
+        return [int(i) for i in result["ids"][0]]
+
+    report(f"chroma HNSW, {vectors.shape[1]} float32", search, queries, truth, k, dir_mb(path), open_ms)
+    client.close()
+
+
+def bench_quantized(root: Path, vectors: np.ndarray, queries: np.ndarray, truth: list, k: int,
+                    dim: int, dtype: str, rescore: bool) -> None:
+    path = root / f"quantized-{dim}-{dtype}-{rescore}"
+    embedding = FakeEmbeddings(size=vectors.shape[1])   # unused: the benchmark searches by vector
+    store = QuantizedVectorStore(path, embedding, dim=dim, dtype=dtype, rescore=rescore)
+    for start in range(0, len(vectors), BATCH):
+        ids = [str(i) for i in range(start, min(start + BATCH, len(vectors)))]
+        store.upsert_vectors(ids, [Document(page_content=i) for i in ids], vectors[start:start + BATCH].tolist())
+    store.persist()
+
+    started = time.perf_counter()
+    store = QuantizedVectorStore(path, embedding, dim=dim, dtype=dtype, rescore=rescore)
+    open_ms = (time.perf_counter() - started) * 1000
+
+    def search(query):
+        return [int(doc.id) for doc, _ in store.search_by_vector(query.tolist(), k=k)]
+
+    name = f"quantized {dim} {dtype}{' + rescore' if rescore else ''}"
+    report(name, search, queries, truth, k, dir_mb(path), open_ms)
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def main(n_vectors: int, n_queries: int, full_dim: int, k: int, noise: float, skip_chroma: bool) -> None:
+    vectors, queries = synthetic(n_vectors, n_queries, full_dim, noise)
+    truth = exact_top_k(vectors, queries, k)
+    print(f"{n_vectors} vectors x {full_dim} dims, {n_queries} queries, recall against exact float32 top-{k}")
+    print("MB is on disk; with rescoring that includes full.npy, of which a search reads only the candidate rows\n")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        if not skip_chroma:
+            bench_chroma(root, vectors, queries, truth, k)
+        for dim, dtype, rescore in [(256, "int8", False), (256, "int8", True),
+                                    (1024, "float16", False), (1024, "int8", True)]:
+            bench_quantized(root, vectors, queries, truth, k, dim, dtype, rescore)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantized vector store vs Chroma on synthetic embeddings.")
+    parser.add_argument("--vectors", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--full-dim", type=int, default=3072)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--noise", type=float, default=0.6, help="query noise relative to the vectors")
+    parser.add_argument("--skip-chroma", action="store_true", help="quantized rows only (no chromadb needed)")
+    args = parser.parse_args()
+    main(args.vectors, args.queries, args.full_dim, args.k, args.noise, args.skip_chroma)
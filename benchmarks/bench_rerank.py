@@ -0,0 +1,84 @@
+# benchmarks/bench_rerank.py  (prompt context tokens per turn and rerank latency, top-k vs over-fetch + rerank)
+#
+#   python benchmarks/bench_rerank.py --pages 200 --queries 150
+#
+# Splits fixture pages with the ingest splitter (CHUNK_SIZE / CHUNK_OVERLAP),
+# with some pages duplicated under a second file name as clinics' leaflets
+# often are. "top-k" puts the first RERANK_TOP_K (4) hits straight into the
+# prompt, as before the rerank stage; "rerank" over-fetches RETRIEVER_K
+# candidates and runs the graph's rerank node (dedupe, lexical scores, token budget).
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from _offline import ROOT  # noqa: F401  (puts the repo root on sys.path)
+from bench_retrieval import FILLER, fixture
+
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from bm25 import BM25Index
+from graph import CHUNK_OVERLAP, CHUNK_SIZE, CONTEXT_TOKEN_BUDGET, RERANK_TOP_K, RETRIEVER_K, make_rerank_node
+from rerank import LexicalReranker, approx_tokens
+
+
+def corpus(n_pages: int, duplicate_share: float, seed: int = 3):
+    rng = random.Random(seed)
+    facts, queries = fixture(n_pages * 6)
+    pages = []
+    for p in range(n_pages):
+        paragraphs = []
+        for fact in facts[p * 6:(p + 1) * 6]:
+            paragraphs.append(fact.page_content)
+            paragraphs.append(" ".join(rng.choices(FILLER, k=40)) + ".")
+        text = "\n\n".join(paragraphs)
+        pages.append(Document(page_content=text, metadata={"source": f"leaflet-{p}.pdf", "page": 0}))
+        if rng.random() < duplicate_share:
+            pages.append(Document(page_content=text, metadata={"source": f"leaflet-{p}-copy.pdf", "page": 0}))
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+    chunks = splitter.split_documents(pages)
+    # Each query's answer is the fact sentence itself
+    targets = [(query, facts[i].page_content.split(".")[0]) for query, i in queries]
+    return chunks, targets
+
+
+def main(n_pages: int, n_queries: int, duplicate_share: float) -> None:
+    chunks, targets = corpus(n_pages, duplicate_share)
+    targets = random.Random(1).sample(targets, min(n_queries, len(targets)))
+    index = BM25Index.build(chunks)
+    rerank = make_rerank_node(LexicalReranker())
+    print(f"{len(chunks)} chunks, {len(targets)} queries, budget {CONTEXT_TOKEN_BUDGET} tokens\n")
+
+    for label in ("top-k", "rerank"):
+        tokens, seconds, hits, n_chunks = [], [], 0, []
+        for query, answer in targets:
+            started = time.perf_counter()
+            if label == "top-k":
+                docs = [d for d, _ in index.search(query, k=RERANK_TOP_K)]
+                context = "\n\n".join(d.page_content for d in docs)
+            else:
+                candidates = [d for d, _ in index.search(query, k=RETRIEVER_K)]
+                out = asyncio.run(rerank({"messages": [HumanMessage(query)], "documents": candidates}))
+                docs, context = out["documents"], out["context"]
+            seconds.append(time.perf_counter() - started)
+            tokens.append(approx_tokens(context))
+            n_chunks.append(len(docs))
+            hits += answer in context
+
+        print(f"{label:7s} context tokens/turn mean {statistics.mean(tokens):6.0f}  max {max(tokens):5d}   "
+              f"chunks {statistics.mean(n_chunks):.1f}   answer in context {hits / len(targets):6.1%}   "
+              f"retrieve+select p50 {statistics.median(seconds) * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Context tokens per turn with and without the rerank stage.")
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=150)
+    parser.add_argument("--duplicate-share", type=float, default=0.3)
+    args = parser.parse_args()
+    main(args.pages, args.queries, args.duplicate_share)
@@ -0,0 +1,112 @@
+# benchmarks/bench_response_cache.py  (p50/p99 turn latency and hit rate, response cache off vs on)
+#
+#   python benchmarks/bench_response_cache.py --requests 300 --concurrency 8
+#
+# Opening questions drawn with a Zipf-like skew from a small FAQ pool (as
+# a clinic's traffic is: opening hours and sore throats over and over), each
+# on a new thread, through the compiled graph with the offline LLM and a
+# blocking fake retriever. The cache's query embedding is a local stand-in
+# that sleeps like an API round trip; it matches repeats of the same
+# wording only, so paraphrase hits are not measured here.
+
+import argparse
+import asyncio
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from _offline import SleepyRetriever, sample_docs
+
+from langchain_core.messages import HumanMessage
+
+from checkpoint import BoundedMemorySaver
+from graph import build_graph
+from replay import OfflineChatModel, OfflineEmbeddings
+from response_cache import SemanticResponseCache
+from slots import SlotSchedule
+
+QUESTIONS = [
+    "What helps a sore throat?",
+    "How long does the flu usually last?",
+    "What should I do about a high temperature?",
+    "Is ibuprofen or paracetamol better for a headache?",
+    "When should I see a doctor about a cough?",
+    "What are the side effects of the flu vaccine?",
+    "How can I lower my blood pressure?",
+    "What helps with hay fever?",
+    "How much water should I drink when I have a cold?",
+    "What can I take for heartburn?",
+    "Is a rash after antibiotics serious?",
+    "How do I treat a sprained ankle?",
+    "What are the symptoms of strep throat?",
+    "Can I exercise with a chest cold?",
+    "How long is someone with chickenpox contagious?",
+    "What helps an earache in adults?",
+]
+
+
+class CountingChatModel(OfflineChatModel):
+    calls: int = 0
+
+    def _reply(self, messages):
+        self.calls += 1
+        return super()._reply(messages)
+
+
+def workload(n: int, skew: float, seed: int = 7):
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) ** skew for rank in range(len(QUESTIONS))]
+    return rng.choices(QUESTIONS, weights=weights, k=n)
+
+
+async def run(questions, cached: bool, concurrency: int, llm_latency: float, retrieve_latency: float,
+              embed_latency: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        llm = CountingChatModel(latency=llm_latency)
+        cache = SemanticResponseCache(OfflineEmbeddings(size=256, latency=embed_latency)) if cached else None
+        # As _offline.offline_app, with the counting model and the cache under test
+        app_graph = build_graph(SleepyRetriever(sample_docs(), retrieve_latency), llm,
+                                checkpointer=BoundedMemorySaver(), response_cache=cache,
+                                schedule=SlotSchedule(Path(tmp) / "slots.sqlite"))
+        slots = asyncio.Semaphore(concurrency)
+
+        async def turn(n: int, question: str) -> float:
+            async with slots:
+                started = time.perf_counter()
+                await app_graph.ainvoke({"messages": [HumanMessage(content=question)]},
+                                        config={"configurable": {"thread_id": f"bench-{n}"}})
+                return time.perf_counter() - started
+
+        latencies = sorted(await asyncio.gather(*(turn(n, q) for n, q in enumerate(questions))))
+    return latencies, llm.calls, cache.stats() if cache else None
+
+
+def report(name: str, latencies, calls: int, stats) -> None:
+    hit_rate = f"{stats['hit_rate']:.1%}" if stats and stats.get("hit_rate") is not None else "-"
+    print(f"{name:10s} hit rate {hit_rate:>6s}   p50 {statistics.median(latencies) * 1000:7.1f} ms   "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1000:7.1f} ms   LLM calls {calls}")
+
+
+def main(requests: int, concurrency: int, skew: float, llm_latency: float, retrieve_latency: float,
+         embed_latency: float) -> None:
+    questions = workload(requests, skew)
+    print(f"{requests} opening questions, {len(set(questions))} distinct, concurrency {concurrency}\n")
+    for name, cached in (("cache off", False), ("cache on", True)):
+        latencies, calls, stats = asyncio.run(
+            run(questions, cached, concurrency, llm_latency, retrieve_latency, embed_latency)
+        )
+        report(name, latencies, calls, stats)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Response cache hit rate and latency with offline stand-ins.")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent of question popularity")
+    parser.add_argument("--llm-latency", type=float, default=0.5)
+    parser.add_argument("--retrieve-latency", type=float, default=0.1)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    args = parser.parse_args()
+    main(args.requests, args.concurrency, args.skew, args.llm_latency, args.retrieve_latency, args.embed_latency)
@@ -0,0 +1,131 @@
+# benchmarks/bench_retrieval.py  (recall@k and latency: dense only vs BM25 only vs hybrid)
+#
+#   python benchmarks/bench_retrieval.py --docs 600 --embed-latency 0.05
+#
+# A fixture corpus of clinic-style chunks (drug names, ICD-10 codes, policy
+# names) with one known relevant chunk per query. The dense side is a local
+# stand-in: a hashed bag-of-words embedding in a small space, which, like real
+# embedding models, blurs exact identifiers. Its numbers measure the fusion and
+# the lexical fast path, not the quality of any embedding model.
+
+import argparse
+import hashlib
+import random
+import re
+import statistics
+import time
+from typing import List
+
+import numpy as np
+from _offline import ROOT  # noqa: F401  (puts the repo root on sys.path)
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from bm25 import BM25Index, HybridRetriever
+
+DRUGS = ["amoxicillin", "ibuprofen", "metformin", "lisinopril", "atorvastatin", "omeprazole",
+         "salbutamol", "cetirizine", "sertraline", "levothyroxine", "prednisolone", "azithromycin"]
+CONDITIONS = ["asthma", "hypertension", "type 2 diabetes", "reflux", "hay fever", "depression",
+              "hypothyroidism", "sinusitis", "high cholesterol", "ear infection"]
+POLICIES = ["late cancellation", "repeat prescription", "new patient registration", "home visit",
+            "test results", "interpreter service"]
+FILLER = ("Please speak to the reception team if you have questions. Appointments can be booked "
+          "online or by phone. Bring a list of your current medicines to every visit.").split()
+
+
+def icd_code(rng: random.Random) -> str:
+    return f"{rng.choice('EIJKLM')}{rng.randint(10, 99)}.{rng.randint(0, 999):03d}"
+
+
+def fixture(n_docs: int, seed: int = 7):
+    """(chunks, [(query, index of the relevant chunk)])"""
+    rng = random.Random(seed)
+    chunks, queries = [], []
+    for i in range(n_docs):
+        filler = " ".join(rng.sample(FILLER, 12))
+        kind = i % 3
+        if kind == 0:
+            drug, condition = rng.choice(DRUGS), rng.choice(CONDITIONS)
+            dose = f"{rng.choice([5, 10, 20, 250, 500])} mg"
+            text = f"{drug.title()} {dose} is used for {condition}. {filler}"
+            queries.append((f"{drug} {dose} dose", i))
+        elif kind == 1:
+            code, condition = icd_code(rng), rng.choice(CONDITIONS)
+            text = f"Diagnosis code {code} covers {condition} follow-up reviews. {filler}"
+            queries.append((f"What is {code}?", i))
+        else:
+            policy = rng.choice(POLICIES)
+            ref = f"POL-{rng.randint(100, 999)}"
+            text = f"Our {policy} policy ({ref}) explains what happens next. {filler}"
+            queries.append((f"{policy} policy {ref}", i))
+        chunks.append(Document(page_content=text, metadata={"source": f"fixture-{i}.pdf", "page": 0}))
+    return chunks, queries
+
+
+class HashedBagOfWords(Embeddings):
+    """Word-hash embedding; queries take `latency` seconds like an API round trip."""
+
+    def __init__(self, dim: int = 64, latency: float = 0.0):
+        self.dim = dim
+        self.latency = latency
+
+    def _embed(self, text: str) -> List[float]:
+        vec = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"[a-z]+|\d+", text.lower()):
+            vec[int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dim] += 1.0
+        return (vec / (np.linalg.norm(vec) or 1.0)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return self._embed(text)
+
+
+def evaluate(name: str, search, chunks, queries, k: int) -> None:
+    hits, latencies = 0, []
+    for query, target in queries:
+        started = time.perf_counter()
+        results = search(query)[:k]
+        latencies.append(time.perf_counter() - started)
+        hits += any(doc.page_content == chunks[target].page_content for doc in results)
+    latencies.sort()
+    print(f"{name:34s} recall@{k} {hits / len(queries):6.1%}   "
+          f"p50 {statistics.median(latencies) * 1000:7.1f} ms   p95 {latencies[int(len(latencies) * 0.95)] * 1000:7.1f} ms")
+
+
+def main(n_docs: int, n_queries: int, k: int, embed_latency: float, slow_latency: float, dense_timeout: float) -> None:
+    chunks, queries = fixture(n_docs)
+    queries = random.Random(1).sample(queries, min(n_queries, len(queries)))
+
+    embeddings = HashedBagOfWords(latency=embed_latency)
+    vectorstore = InMemoryVectorStore(embeddings)
+    vectorstore.add_documents(chunks)
+
+    started = time.perf_counter()
+    index = BM25Index.build(chunks)
+    print(f"fixture: {len(chunks)} chunks, {len(queries)} queries; BM25 build {1000 * (time.perf_counter() - started):.0f} ms\n")
+
+    hybrid = HybridRetriever(vectorstore=vectorstore, bm25=index, k=k, fetch_k=20, dense_timeout=dense_timeout)
+    evaluate("dense only", lambda q: vectorstore.similarity_search(q, k=k), chunks, queries, k)
+    evaluate("BM25 only", lambda q: [d for d, _ in index.search(q, k=k)], chunks, queries, k)
+    evaluate("hybrid (RRF)", hybrid.invoke, chunks, queries, k)
+
+    # Embedding service slower than the timeout: the lexical fast path answers
+    embeddings.latency = slow_latency
+    evaluate(f"hybrid, embeddings at {slow_latency:.1f}s", hybrid.invoke, chunks, queries[:20], k)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Hybrid retrieval recall and latency on a fixture corpus.")
+    parser.add_argument("--docs", type=int, default=600)
+    parser.add_argument("--queries", type=int, default=150)
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--embed-latency", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=1.0)
+    parser.add_argument("--dense-timeout", type=float, default=0.2)
+    args = parser.parse_args()
+    main(args.docs, args.queries, args.k, args.embed_latency, args.slow_latency, args.dense_timeout)
@@ -0,0 +1,110 @@
+# benchmarks/bench_startup.py  (cold start: import cost and time until /healthz and /readyz answer)
+#
+#   python benchmarks/bench_startup.py --repeat 3 --budget 2.0
+#
+# Every measurement runs in a fresh interpreter, like a new container or
+# uvicorn worker. Reports the import time of `main` and of the heavy modules
+# the warm-up task pulls in, then starts `uvicorn main:app` and times the
+# first /healthz 200 (liveness) and the end of warm-up on /readyz.
+# Exits non-zero when /healthz takes longer than --budget seconds.
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+
+MODULES = [
+    "main",
+    "langchain_core",
+    "langchain_openai",
+    "langchain_community.vectorstores",
+    "chromadb",
+    "langgraph.graph",
+    "graph",
+]
+
+
+def import_seconds(module: str, env: dict) -> float:
+    code = (
+        "import time; started = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - started)"
+    )
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve_seconds(env: dict, ready_timeout: float) -> tuple:
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        live = ready = None
+        status = "timeout"
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < ready_timeout:
+                try:
+                    if live is None and client.get(f"{base}/healthz").status_code == 200:
+                        live = time.perf_counter() - started
+                    if live is not None:
+                        status = client.get(f"{base}/readyz").json()["status"]
+                        if status not in ("warming_up", "idle"):
+                            ready = time.perf_counter() - started
+                            break
+                except httpx.TransportError:
+                    pass
+                time.sleep(0.01)
+        return live, ready, status
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main(repeat: int, budget: float, ready_timeout: float) -> int:
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1", WARMUP_ON_STARTUP="1")
+
+    print(f"{'import':36s} {'median s':>9s} {'max s':>7s}")
+    for module in MODULES:
+        runs = [import_seconds(module, env) for _ in range(repeat)]
+        print(f"{module:36s} {statistics.median(runs):9.3f} {max(runs):7.3f}")
+
+    print()
+    lives = []
+    for _ in range(repeat):
+        live, ready, status = serve_seconds(env, ready_timeout)
+        lives.append(live if live is not None else float("inf"))
+        ready_text = f"{ready:.3f} s" if ready is not None else "-"
+        print(f"uvicorn main:app  /healthz 200 after {live or float('inf'):.3f} s, "
+              f"warm-up ended ({status}) after {ready_text}")
+
+    worst = max(lives)
+    verdict = "within" if worst <= budget else "OVER"
+    print(f"\nworst time to liveness {worst:.3f} s: {verdict} the {budget:.1f} s budget")
+    return 0 if worst <= budget else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backend cold-start timings in fresh interpreters.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=2.0, help="max seconds until /healthz answers")
+    parser.add_argument("--ready-timeout", type=float, default=120.0)
+    args = parser.parse_args()
+    sys.exit(main(args.repeat, args.budget, args.ready_timeout))
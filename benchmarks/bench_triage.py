@@ -0,0 +1,55 @@
+# benchmarks/bench_triage.py  (triage precision / recall per route and per-message latency)
+#
+#   python benchmarks/bench_triage.py [--cases tests/fixtures/triage_cases.jsonl]
+#
+# Runs the rule classifier (plus TRIAGE_MODEL when set) over the labeled cases
+# and prints precision and recall for each route, the misrouted messages, and
+# how long one classification takes.
+
+import argparse
+import json
+import statistics
+import time
+
+from _offline import ROOT
+
+from triage import EMERGENCY, MEDICAL, OFF_TOPIC, get_triage_classifier
+
+
+def main(cases_path: str, repeat: int) -> None:
+    with open(cases_path, encoding="utf-8") as f:
+        cases = [json.loads(line) for line in f if line.strip()]
+    classifier = get_triage_classifier()
+
+    predicted = [classifier.classify(case["text"]) for case in cases]
+    print(f"{len(cases)} labeled messages\n")
+    print(f"{'route':10s} {'precision':>9s} {'recall':>7s} {'n':>4s}")
+    for route in (EMERGENCY, OFF_TOPIC, MEDICAL):
+        tp = sum(p == route and c["label"] == route for p, c in zip(predicted, cases))
+        n_pred = sum(p == route for p in predicted)
+        n_true = sum(c["label"] == route for c in cases)
+        precision = tp / n_pred if n_pred else 1.0
+        recall = tp / n_true if n_true else 1.0
+        print(f"{route:10s} {precision:9.1%} {recall:7.1%} {n_true:4d}")
+
+    misses = [(c, p) for c, p in zip(cases, predicted) if p != c["label"]]
+    for case, got in misses:
+        print(f"  misrouted: {case['text']!r} -> {got} (expected {case['label']})")
+
+    timings = []
+    for _ in range(repeat):
+        for case in cases:
+            started = time.perf_counter()
+            classifier.classify(case["text"])
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    print(f"\nlatency per message: p50 {statistics.median(timings) * 1e6:.0f} µs, "
+          f"p99 {timings[int(len(timings) * 0.99)] * 1e6:.0f} µs")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Triage precision/recall/latency on labeled cases.")
+    parser.add_argument("--cases", default=str(ROOT / "tests" / "fixtures" / "triage_cases.jsonl"))
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    main(args.cases, args.repeat)
@@ -0,0 +1,268 @@
+# bm25.py  (local lexical index + hybrid retriever)
+
+import contextvars
+import json
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from pydantic import ConfigDict
+
+from metrics import SEARCH_SECONDS, timed
+
+
+# Keeps drug names, dosages and codes like "J45.909" or "COVID-19" as one token
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def doc_key(doc: Document) -> Tuple:
+    meta = doc.metadata or {}
+    return meta.get("source"), meta.get("page"), doc.page_content
+
+
+# ------------------------
+#   BM25 INDEX
+# ------------------------
+
+class BM25Index:
+    """
+    Okapi BM25 over the chunk corpus.
+
+    Postings are flat arrays (CSR layout): term i owns
+    doc_ids[offsets[i]:offsets[i+1]] and the matching tfs, so the index
+    saves as one .npz and loads with a single read.
+    """
+
+    def __init__(self, terms: Dict[str, int], offsets: np.ndarray, doc_ids: np.ndarray,
+                 tfs: np.ndarray, doc_lens: np.ndarray, docs: List[Document],
+                 k1: float = 1.5, b: float = 0.75):
+        self.terms = terms
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.tfs = tfs
+        self.doc_lens = doc_lens
+        self.docs = docs
+        self.k1 = k1
+        self.b = b
+
+        n_docs = len(docs)
+        doc_freq = np.diff(offsets).astype(np.float32)
+        self.idf = np.log(1.0 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        self.avg_len = float(doc_lens.mean()) if n_docs else 0.0
+
+    @classmethod
+    def build(cls, docs: Sequence[Document]) -> "BM25Index":
+        postings: Dict[str, Dict[int, int]] = {}
+        doc_lens = np.zeros(len(docs), dtype=np.int32)
+
+        for doc_id, doc in enumerate(docs):
+            tokens = tokenize(doc.page_content)
+            doc_lens[doc_id] = len(tokens)
+            for token in tokens:
+                per_doc = postings.setdefault(token, {})
+                per_doc[doc_id] = per_doc.get(doc_id, 0) + 1
+
+        vocab = sorted(postings)
+        offsets = np.zeros(len(vocab) + 1, dtype=np.int64)
+        doc_ids, tfs = [], []
+        for i, term in enumerate(vocab):
+            per_doc = postings[term]
+            doc_ids.extend(per_doc.keys())
+            tfs.extend(per_doc.values())
+            offsets[i + 1] = offsets[i] + len(per_doc)
+
+        return cls(
+            terms={term: i for i, term in enumerate(vocab)},
+            offsets=offsets,
+            doc_ids=np.asarray(doc_ids, dtype=np.int32),
+            tfs=np.asarray(tfs, dtype=np.float32),
+            doc_lens=doc_lens,
+            docs=list(docs),
+        )
+
+    def save(self, directory: Path) -> None:
+        # Each file is swapped in whole; postings.npz goes last, so its mtime
+        # marks a complete index for running retrievers (see ReloadingBM25Index)
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+
+        tmp = directory / "terms.json.tmp"
+        tmp.write_text(json.dumps(list(self.terms)), encoding="utf-8")
+        os.replace(tmp, directory / "terms.json")
+
+        tmp = directory / "docs.jsonl.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for doc in self.docs:
+                f.write(json.dumps({"text": doc.page_content, "metadata": doc.metadata or {}}) + "\n")
+        os.replace(tmp, directory / "docs.jsonl")
+
+        tmp = directory / "postings.npz.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, offsets=self.offsets, doc_ids=self.doc_ids, tfs=self.tfs, doc_lens=self.doc_lens)
+        os.replace(tmp, directory / "postings.npz")
+
+    @classmethod
+    def load(cls, directory: Path) -> "BM25Index":
+        directory = Path(directory)
+        with np.load(directory / "postings.npz") as npz:
+            arrays = {name: npz[name] for name in ("offsets", "doc_ids", "tfs", "doc_lens")}
+        vocab = json.loads((directory / "terms.json").read_text(encoding="utf-8"))
+        with open(directory / "docs.jsonl", encoding="utf-8") as f:
+            docs = [Document(page_content=row["text"], metadata=row["metadata"]) for row in map(json.loads, f)]
+        if len(arrays["offsets"]) != len(vocab) + 1 or len(arrays["doc_lens"]) != len(docs):
+            raise ValueError(f"BM25 index files at {directory} are from different builds")
+        return cls(terms={term: i for i, term in enumerate(vocab)}, docs=docs, **arrays)
+
+    @classmethod
+    def exists(cls, directory: Path) -> bool:
+        return (Path(directory) / "postings.npz").exists()
+
+    @classmethod
+    def version(cls, directory: Path) -> int:
+        return (Path(directory) / "postings.npz").stat().st_mtime_ns
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        if not self.docs:
+            return []
+
+        scores = np.zeros(len(self.docs), dtype=np.float32)
+        norm = self.k1 * (1.0 - self.b + self.b * self.doc_lens / (self.avg_len or 1.0))
+
+        for token in set(tokenize(query)):
+            term_id = self.terms.get(token)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            ids = self.doc_ids[start:end]
+            tf = self.tfs[start:end]
+            scores[ids] += self.idf[term_id] * tf * (self.k1 + 1.0) / (tf + norm[ids])
+
+        k = min(k, len(self.docs))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.docs[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+class ReloadingBM25Index:
+    """
+    The BM25 index in `directory`, reloaded when ingestion rewrites it.
+
+    A stat per search checks the version; a load that fails (e.g. files from
+    two builds mid-save) keeps the previous index until the next search.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+        self._version = BM25Index.version(self.directory)
+        self._index = BM25Index.load(self.directory)
+
+    def current(self) -> BM25Index:
+        try:
+            version = BM25Index.version(self.directory)
+        except OSError:
+            return self._index
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    try:
+                        self._index = BM25Index.load(self.directory)
+                        self._version = version
+                        print(f"[RAG] Reloaded BM25 index from: {self.directory}")
+                    except (OSError, ValueError) as e:
+                        print(f"[RAG] BM25 reload failed ({e}); keeping the previous index")
+        return self._index
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[Document, float]]:
+        return self.current().search(query, k=k)
+
+
+# ------------------------
+#   HYBRID RETRIEVER
+# ------------------------
+
+# Dense searches run here so a slow embedding call can be abandoned. A timed-out
+# search still holds its worker until the call returns, so at most
+# DENSE_WORKERS run or wait at once; beyond that, queries go lexical-only
+# instead of queueing behind stuck embedding calls.
+DENSE_WORKERS = 8
+_dense_executor = ThreadPoolExecutor(max_workers=DENSE_WORKERS, thread_name_prefix="dense-search")
+_dense_slots = threading.BoundedSemaphore(DENSE_WORKERS)
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Document]], rrf_k: int = 60) -> List[Document]:
+    scores: Dict[Tuple, float] = {}
+    first_seen: Dict[Tuple, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = doc_key(doc)
+            first_seen.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank + 1)
+    ordered = sorted(scores, key=scores.get, reverse=True)
+    return [first_seen[key] for key in ordered]
+
+
+class HybridRetriever(BaseRetriever):
+    """
+    Chroma dense search + local BM25, merged with reciprocal-rank fusion.
+
+    If the dense search (embedding call + ANN) exceeds `dense_timeout`
+    seconds, the lexical results are returned on their own.
+    """
+
+    vectorstore: object
+    bm25: object
+    k: int = 4
+    fetch_k: int = 10
+    rrf_k: int = 60
+    dense_timeout: Optional[float] = 2.0
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    def _dense_search(self, query: str) -> List[Document]:
+        # Query embedding + ANN search
+        with timed(SEARCH_SECONDS, kind="dense"):
+            return self.vectorstore.similarity_search(query, k=self.fetch_k)
+
+    def _submit_dense(self, query: str) -> Optional[Future]:
+        if not _dense_slots.acquire(blocking=False):
+            return None
+        try:
+            # Same context in the worker, so the embedding call keeps the caller's scheduler lane
+            future = _dense_executor.submit(contextvars.copy_context().run, self._dense_search, query)
+        except BaseException:
+            _dense_slots.release()
+            raise
+        future.add_done_callback(lambda _: _dense_slots.release())
+        return future
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        dense_future = self._submit_dense(query)
+        with timed(SEARCH_SECONDS, kind="lexical"):
+            lexical = [doc for doc, _ in self.bm25.search(query, k=self.fetch_k)]
+
+        if dense_future is None:
+            print("[RAG] Dense searches backed up; using lexical results only")
+            return lexical[:self.k]
+        try:
+            dense = dense_future.result(timeout=self.dense_timeout)
+        except FutureTimeout:
+            dense_future.cancel()
+            print(f"[RAG] Dense search slower than {self.dense_timeout}s; using lexical results only")
+            return lexical[:self.k]
+        except Exception as e:
+            print(f"[RAG] Dense search failed ({e}); using lexical results only")
+            return lexical[:self.k]
+
+        return reciprocal_rank_fusion([dense, lexical], rrf_k=self.rrf_k)[:self.k]
@@ -0,0 +1,481 @@
+# booking.py  (deterministic appointment-booking state machine)
+
+import re
+from datetime import date, datetime, time as dtime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple, TypedDict
+from zoneinfo import ZoneInfo
+
+from slots import CLOSE_HOUR, OPEN_HOUR, SLOT_MINUTES, SLOTS_PER_DAY
+
+
+# ------------------------
+#   STATE
+# ------------------------
+
+class Booking(TypedDict, total=False):
+    status: str          # "collecting" | "confirmed" | "cancelled"
+    step: str            # next field to collect, see STEPS
+    editing: bool        # re-collecting one field from the confirmation step
+    reason: str
+    date: str            # ISO date of the visit
+    time: str            # "HH:MM", clinic timezone
+    name: str
+    email: str
+    phone: str
+    dob: str             # ISO date of birth
+    notes: str
+    provider: str        # set once the slot is reserved
+    booking_id: str
+
+
+class BookingSummary(TypedDict, total=False):
+    # What the patient is asked to confirm, display-ready (dates and times formatted)
+    status: str          # "pending" (awaiting confirmation) | "confirmed"
+    name: str
+    email: str
+    phone: str
+    date_of_birth: str
+    reason: str
+    date: str
+    time: str            # with the clinic timezone
+    notes: str
+    provider: str        # confirmed bookings only
+    booking_id: str
+
+
+STEPS = ["reason", "date", "time", "name", "email", "phone", "dob", "notes", "confirm"]
+
+
+# ------------------------
+#   INTENT DETECTION
+# ------------------------
+
+# First person, not a question about booking: "Do I need an appointment for a flu shot?" is not intent
+_ME = r"(?<!do\s)(?<!did\s)(?<!does\s)(?<!will\s)(?<!would\s)(?<!should\s)(?<!must\s)\b(i|we)"
+_VISIT = r"(appointment|visit|slot|consultation|check-?up)"
+BOOKING_INTENT_RE = re.compile(
+    rf"{_ME}\s*('d|\s+would)\s+like\s+(to\s+(book|schedule|make|set\s+up|get)\s+)?(an?\s+)?.{{0,20}}\b{_VISIT}\b"
+    rf"|{_ME}\s+(want|need|wanna|have)\s+to\s+(book|schedule|make|set\s+up)\b"
+    rf"|{_ME}\s+want\s+(an?|to\s+get\s+an?)\s+{_VISIT}\b"
+    r"|\b(can|could|may)\s+(i|we|you)\s+(please\s+)?(book|schedule)\b"
+    r"|^\s*(please\s+)?(book|schedule)\s+(me\s+)?(an?\s+)?" + _VISIT +
+    r"|\bbook\s+(me|us|a\s+time|in)\b|\bhelp\s+(me\s+)?(to\s+)?book\b",
+    re.IGNORECASE,
+)
+AFFIRMATIVE_RE = re.compile(
+    r"^\s*(yes|yeah|yep|yup|sure|ok(ay)?|please|please do|go ahead|sounds good|that works|correct|right|confirm(ed)?)\b",
+    re.IGNORECASE,
+)
+# A "yes" that asks for a change is not a confirmation: "ok, but can you change the time?"
+QUALIFIED_RE = re.compile(r"\b(but|change|edit|update|fix|wrong|instead|actually|except|different)\b", re.IGNORECASE)
+NEGATIVE_RE = re.compile(r"^\s*(no|nope|nah|not really|wrong|incorrect)\b", re.IGNORECASE)
+# Whole-message intent only: "a cough that will not stop" is a reason, not a cancellation
+CANCEL_RE = re.compile(
+    r"^\s*(please\s+)?(cancel|stop|never\s*mind|forget\s+(it|about\s+it))\b"
+    r"|\b(cancel|stop)\s+(the|my|this)\s+(booking|appointment|reservation)\b"
+    r"|\b(want|like)\s+to\s+cancel\b|\bdon'?t\s+want\s+to\s+book\b",
+    re.IGNORECASE,
+)
+BOOKING_OFFER_RE = re.compile(r"book\s+an\s+appointment|schedule\s+(a|an)\s+(visit|appointment)", re.IGNORECASE)
+
+
+def wants_to_book(text: str, last_assistant: Optional[str]) -> bool:
+    """
+    Explicit request to book, or "yes" to the assistant's booking offer.
+    """
+    if BOOKING_INTENT_RE.search(text):
+        return True
+    return bool(
+        last_assistant
+        and BOOKING_OFFER_RE.search(last_assistant)
+        and last_assistant.rstrip().endswith("?")
+        and AFFIRMATIVE_RE.search(text)
+    )
+
+
+def is_active(booking: Optional[Booking]) -> bool:
+    return bool(booking) and booking.get("status") == "collecting"
+
+
+# ------------------------
+#   VALIDATORS
+# ------------------------
+
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+(\.[\w-]+)+")
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+MONTHS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1)}
+# Not a count or a date: "in 2 weeks", "10 mg", "3 times a day", "10/20"
+TIME_RE = re.compile(
+    r"(?<![/.\-])\b(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?\b"
+    r"(?!\s*(min|hour|hr|day|week|wk|month|year|mg|ml|times?\b|tablets?|pills?|[/%]|\.\d))",
+    re.IGNORECASE,
+)
+
+
+def parse_email(text: str) -> Optional[str]:
+    match = EMAIL_RE.search(text)
+    return match.group(0).lower() if match else None
+
+
+def parse_phone(text: str) -> Optional[str]:
+    digits = re.sub(r"\D", "", text)
+    if text.strip().startswith("+") and 8 <= len(digits) <= 15:
+        return "+" + digits
+    if len(digits) == 10:
+        return f"({digits[:3]}) {digits[3:6]}-{digits[6:]}"
+    if len(digits) == 11 and digits.startswith("1"):
+        return f"({digits[1:4]}) {digits[4:7]}-{digits[7:]}"
+    return None
+
+
+def parse_date(text: str, today: date, future: bool = True) -> Optional[date]:
+    """
+    Local parser for the usual ways patients write dates; None if unsure.
+    `future` allows relative dates ("tomorrow", "friday") and year-less ones,
+    which are rolled forward to the next occurrence. Dates of birth need a year.
+    """
+    t = text.lower().strip()
+
+    if future:
+        if re.search(r"\btoday\b", t):
+            return today
+        if re.search(r"\btomorrow\b", t):
+            return today + timedelta(days=1)
+        for i, name in enumerate(WEEKDAYS):
+            if re.search(rf"\b{name[:3]}({name[3:]})?\b", t):
+                ahead = (i - today.weekday()) % 7 or 7
+                if re.search(r"\bnext\s+week\b|\bafter\s+next\b", t):
+                    ahead += 7
+                return today + timedelta(days=ahead)
+
+    # 2026-10-20
+    m = re.search(r"\b(\d{4})-(\d{1,2})-(\d{1,2})\b", t)
+    if m:
+        return _safe_date(int(m.group(1)), int(m.group(2)), int(m.group(3)))
+
+    # 10/20/2026, 10/20/26, 10/20
+    m = re.search(r"\b(\d{1,2})/(\d{1,2})(?:/(\d{2,4}))?\b", t)
+    if m:
+        return _resolve(m.group(3), int(m.group(1)), int(m.group(2)), today, future)
+
+    # October 20(th) [2026]  /  20(th) (of) October [2026]
+    m = re.search(r"\b([a-z]{3,9})\.?\s+(\d{1,2})(?:st|nd|rd|th)?(?:,?\s+(\d{4}))?\b", t)
+    if m and m.group(1)[:3] in MONTHS:
+        return _resolve(m.group(3), MONTHS[m.group(1)[:3]], int(m.group(2)), today, future)
+    m = re.search(r"\b(\d{1,2})(?:st|nd|rd|th)?\s+(?:of\s+)?([a-z]{3,9})\.?(?:,?\s+(\d{4}))?\b", t)
+    if m and m.group(2)[:3] in MONTHS:
+        return _resolve(m.group(3), MONTHS[m.group(2)[:3]], int(m.group(1)), today, future)
+
+    return None
+
+
+def _resolve(raw_year: Optional[str], month: int, day: int, today: date, future: bool) -> Optional[date]:
+    if raw_year:
+        year = int(raw_year)
+        if year < 100:
+            year += 2000 if year <= today.year % 100 + 1 else 1900
+        return _safe_date(year, month, day)
+    if not future:
+        return None
+    parsed = _safe_date(today.year, month, day)
+    if parsed and parsed < today:
+        parsed = _safe_date(today.year + 1, month, day)
+    return parsed
+
+
+def _safe_date(year: int, month: int, day: int) -> Optional[date]:
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def parse_time(text: str) -> Optional[dtime]:
+    t = text.lower()
+    if "noon" in t:
+        return dtime(12, 0)
+    for m in TIME_RE.finditer(t):
+        hour, minute, meridiem = int(m.group(1)), int(m.group(2) or 0), (m.group(3) or "").replace(".", "")
+        if minute > 59 or hour > 23:
+            continue
+        if meridiem == "pm" and hour < 12:
+            hour += 12
+        elif meridiem == "am" and hour == 12:
+            hour = 0
+        elif not meridiem and 1 <= hour <= 5:
+            hour += 12          # "at 3" during clinic hours means 3pm
+        return dtime(hour, minute)
+    return None
+
+
+def visit_date_error(visit: date, today: date) -> Optional[str]:
+    if visit < today:
+        return "That date has already passed."
+    if visit.weekday() >= 5:
+        return "The clinic is closed on weekends."
+    if visit > today + timedelta(days=90):
+        return "We can only book up to three months ahead."
+    return None
+
+
+def visit_time_error(slot: dtime) -> Optional[str]:
+    if not (OPEN_HOUR <= slot.hour < CLOSE_HOUR):
+        return "That's outside clinic hours (9:00am–5:00pm)."
+    if slot.minute % SLOT_MINUTES:
+        return "Appointments start on the hour or half hour."
+    return None
+
+
+def dob_error(dob: date, today: date) -> Optional[str]:
+    if dob >= today:
+        return "A date of birth has to be in the past."
+    if today.year - dob.year > 120:
+        return "That date of birth doesn't look right."
+    return None
+
+
+def format_time(value: str) -> str:
+    hour, minute = map(int, value.split(":"))
+    return f"{hour % 12 or 12}:{minute:02d}{'am' if hour < 12 else 'pm'}"
+
+
+def format_date(value: str) -> str:
+    # No %-d: it isn't portable to Windows
+    d = date.fromisoformat(value)
+    return f"{d:%A}, {d:%B} {d.day}, {d.year}"
+
+
+# ------------------------
+#   STATE MACHINE
+# ------------------------
+
+FIELD_WORDS = {
+    "reason": r"reason",
+    "date": r"\b(date|day)\b(?!\s+of\s+birth)",
+    "time": r"\btime\b",
+    "name": r"\bname\b",
+    "email": r"e-?mail",
+    "phone": r"phone|number",
+    "dob": r"birth|dob|birthday",
+    "notes": r"note",
+}
+
+
+class BookingFlow:
+    """
+    One field per turn, validated locally. `interpret_date(text)` (an LLM
+    call) is consulted only when the local date parser gives up.
+    `slot_tools` (see slots.make_slot_tools) supplies real availability and
+    reserves the slot on confirmation; without it any slot in hours is offered.
+    """
+
+    def __init__(self, clinic_name: str, timezone: str,
+                 interpret_date: Optional[Callable[[str, date], Optional[date]]] = None,
+                 slot_tools: Optional[Dict] = None):
+        self.clinic_name = clinic_name
+        self.timezone = timezone
+        self.interpret_date = interpret_date
+        self.tools = slot_tools
+
+    def today(self) -> date:
+        return datetime.now(ZoneInfo(self.timezone)).date()
+
+    # ---- prompts ----
+
+    def ask(self, booking: Booking) -> str:
+        step = booking["step"]
+        if step == "reason":
+            return "What is the main reason you want to see the doctor?"
+        if step == "date":
+            return (
+                f"{self.clinic_name} is open Monday to Friday, 9:00am–5:00pm ({self.timezone}). "
+                "Let me check available time slots for you. Which day works best for you?"
+            )
+        if step == "time":
+            return f"What time would you like on {format_date(booking['date'])}?{self._slot_hint(booking)}"
+        if step == "name":
+            return "Great, I will reserve that slot for you. Could I have your full name?"
+        if step == "email":
+            return "Thank you. What is your email address?"
+        if step == "phone":
+            return "And what is the best phone number to reach you?"
+        if step == "dob":
+            return "What is your date of birth?"
+        if step == "notes":
+            return "Is there anything you'd like the doctor to know before your visit? You can say \"no\" if not."
+        return self.summary(booking)
+
+    def now_hhmm(self) -> str:
+        return datetime.now(ZoneInfo(self.timezone)).strftime("%H:%M")
+
+    def free_times(self, visit_date: str, limit: int = 3) -> List[str]:
+        # Same-day visits: skip slots that have already started
+        after = self.now_hhmm() if visit_date == self.today().isoformat() else ""
+        slots = self.tools["check_availability"].invoke({"day": visit_date, "limit": SLOTS_PER_DAY})
+        return [s["time"] for s in slots if s["time"] > after][:limit]
+
+    def _slot_hint(self, booking: Booking) -> str:
+        if not self.tools:
+            return " We have openings every half hour between 9:00am and 5:00pm."
+        return " The earliest openings are " + ", ".join(map(format_time, self.free_times(booking["date"]))) + "."
+
+    def summary_card(self, booking: Optional[Booking]) -> Optional[BookingSummary]:
+        """
+        The booking as structured parts, for replies that show it: the
+        confirmation step and the turn it is booked. None otherwise.
+        """
+        if not booking or booking.get("step") != "confirm" or booking.get("status") not in ("collecting", "confirmed"):
+            return None
+        card: BookingSummary = {
+            "status": "confirmed" if booking["status"] == "confirmed" else "pending",
+            "name": booking["name"],
+            "email": booking["email"],
+            "phone": booking["phone"],
+            "date_of_birth": format_date(booking["dob"]),
+            "reason": booking["reason"],
+            "date": format_date(booking["date"]),
+            "time": f"{format_time(booking['time'])} ({self.timezone})",
+            "notes": booking.get("notes") or "None",
+        }
+        for key in ("provider", "booking_id"):
+            if booking.get(key):
+                card[key] = booking[key]
+        return card
+
+    def summary(self, booking: Booking) -> str:
+        card = self.summary_card(booking)
+        return (
+            "Here’s a summary of your appointment:\n\n"
+            f"- Name: {card['name']}\n"
+            f"- Email: {card['email']}\n"
+            f"- Phone: {card['phone']}\n"
+            f"- Date of Birth: {card['date_of_birth']}\n"
+            f"- Reason for Visit: {card['reason']}\n"
+            f"- Date: {card['date']}\n"
+            f"- Time: {card['time']}\n"
+            f"- Notes for the Doctor: {card['notes']}\n\n"
+            "Please confirm if all the details are correct."
+        )
+
+    # ---- transitions ----
+
+    def start(self) -> Tuple[Booking, str]:
+        booking: Booking = {"status": "collecting", "step": "reason"}
+        return booking, self.ask(booking)
+
+    def handle(self, booking: Booking, text: str) -> Tuple[Booking, str]:
+        """
+        Consume the patient's reply for the current step; returns the new
+        booking state and the assistant's next message.
+        """
+        booking = dict(booking)
+        step = booking["step"]
+
+        if CANCEL_RE.search(text):
+            booking["status"] = "cancelled"
+            return booking, (
+                "That’s completely okay. If things change or you feel worse, "
+                "please consider visiting the clinic."
+            )
+
+        if step == "confirm":
+            return self._confirm(booking, text)
+
+        error = self._collect(booking, step, text.strip())
+        if error:
+            return booking, f"{error} {self.ask(booking)}"
+
+        if booking.pop("editing", False):
+            booking["step"] = "confirm"
+        else:
+            booking["step"] = STEPS[STEPS.index(step) + 1]
+        return booking, self.ask(booking)
+
+    def _collect(self, booking: Booking, step: str, text: str) -> Optional[str]:
+        today = self.today()
+
+        if step in ("reason", "name"):
+            if len(text) < 2:
+                return "Sorry, I didn't catch that."
+            booking[step] = text
+            return None
+
+        if step == "notes":
+            booking["notes"] = "" if NEGATIVE_RE.search(text) or text.lower() in {"none", "nothing"} else text
+            return None
+
+        if step == "email":
+            email = parse_email(text)
+            if not email:
+                return "That doesn't look like a valid email address."
+            booking["email"] = email
+            return None
+
+        if step == "phone":
+            phone = parse_phone(text)
+            if not phone:
+                return "That doesn't look like a valid phone number."
+            booking["phone"] = phone
+            return None
+
+        if step in ("date", "dob"):
+            parsed = parse_date(text, today, future=(step == "date"))
+            if parsed is None and self.interpret_date:
+                parsed = self.interpret_date(text, today)
+            if parsed is None:
+                return "Sorry, I couldn't understand that date."
+            error = visit_date_error(parsed, today) if step == "date" else dob_error(parsed, today)
+            if error:
+                return error
+            if step == "date" and self.tools and not self.free_times(parsed.isoformat(), limit=1):
+                return "That day is fully booked."
+            booking[step] = parsed.isoformat()
+            if step == "date":
+                booking.pop("time", None)
+            return None
+
+        if step == "time":
+            slot = parse_time(text)
+            if slot is None:
+                return "Sorry, I couldn't understand that time."
+            error = visit_time_error(slot)
+            if error:
+                return error
+            value = slot.strftime("%H:%M")
+            if booking["date"] == today.isoformat() and value <= self.now_hhmm():
+                return "That time has already passed."
+            if self.tools and value not in self.free_times(booking["date"], limit=SLOTS_PER_DAY):
+                return "That time is already taken."
+            booking["time"] = value
+            return None
+
+        return None
+
+    def _confirm(self, booking: Booking, text: str) -> Tuple[Booking, str]:
+        if AFFIRMATIVE_RE.search(text) and not QUALIFIED_RE.search(text):
+            with_provider = ""
+            if self.tools:
+                reservation = self.tools["reserve_slot"].invoke({"day": booking["date"], "time": booking["time"]})
+                if reservation is None:
+                    booking["step"] = "time"
+                    booking["editing"] = True
+                    return booking, f"I'm sorry, that slot was just taken. {self.ask(booking)}"
+                booking["provider"] = reservation["provider"]
+                booking["booking_id"] = reservation["booking_id"]
+                with_provider = f" with {reservation['provider']}"
+
+            booking["status"] = "confirmed"
+            return booking, (
+                f"Your appointment at {self.clinic_name}{with_provider} is booked for "
+                f"{format_date(booking['date'])} at {format_time(booking['time'])} ({self.timezone}). "
+                f"We will send a confirmation to {booking['email']}. Take care, and see you soon!"
+            )
+
+        for field, pattern in FIELD_WORDS.items():
+            if re.search(pattern, text, re.IGNORECASE):
+                booking["step"] = field
+                booking["editing"] = True
+                return booking, f"No problem, let's fix that. {self.ask(booking)}"
+
+        return booking, "Which detail should I change — name, email, phone, date of birth, reason, date, time or notes?"
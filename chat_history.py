@@ -0,0 +1,164 @@
+# chat_history.py  (per-session chat transcript for the frontend)
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# "memory" (per process) or "sqlite" (survives restarts, shared by workers)
+CHAT_HISTORY_BACKEND = os.getenv("CHAT_HISTORY_BACKEND", "memory")
+CHAT_HISTORY_DB = Path(os.getenv("CHAT_HISTORY_DB", str(BASE_DIR / "cache" / "chat_history.sqlite")))
+CHAT_HISTORY_MAX_MESSAGES = int(os.getenv("CHAT_HISTORY_MAX_MESSAGES", "50"))    # per session
+CHAT_HISTORY_MAX_SESSIONS = int(os.getenv("CHAT_HISTORY_MAX_SESSIONS", "5000"))
+CHAT_HISTORY_TTL_SECONDS = int(os.getenv("CHAT_HISTORY_TTL_SECONDS", str(2 * 3600)))
+
+
+class MemoryHistoryStore:
+    """
+    Ring buffer of the last `max_messages` per session; idle sessions expire
+    after `ttl`, least-recently-used ones are dropped beyond `max_sessions`.
+
+    Messages are {"sender", "text"} plus any structured `parts` of a bot
+    reply ("booking", "emergency", ...), so the page re-renders them as sent.
+    """
+
+    def __init__(self, max_messages: int, max_sessions: int, ttl: int):
+        self.max_messages = max_messages
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()   # session_id -> (last_seen, deque)
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float) -> None:
+        while self._sessions:
+            session_id, (last_seen, _) = next(iter(self._sessions.items()))
+            if now - last_seen <= self.ttl and len(self._sessions) <= self.max_sessions:
+                break
+            del self._sessions[session_id]
+
+    def append(self, session_id: str, sender: str, text: str, parts: Optional[Dict[str, Any]] = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            _, messages = self._sessions.pop(session_id, (now, deque(maxlen=self.max_messages)))
+            messages.append({**(parts or {}), "sender": sender, "text": text})
+            self._sessions[session_id] = (now, messages)
+            self._evict(now)
+
+    def get(self, session_id: str) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            self._evict(now)
+            if session_id not in self._sessions:
+                return []
+            _, messages = self._sessions[session_id]
+            return list(messages)
+
+
+class SqliteHistoryStore:
+    """
+    Same contract as MemoryHistoryStore, persisted to a WAL-mode SQLite file.
+    """
+
+    EVICT_EVERY = 500
+
+    def __init__(self, path: Path, max_messages: int, max_sessions: int, ttl: int):
+        self.max_messages = max_messages
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30.0)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                sender TEXT NOT NULL,
+                text TEXT NOT NULL,
+                parts TEXT,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS chat_messages_session ON chat_messages (session_id, id);
+            """
+        )
+        # Databases created before structured replies
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(chat_messages)")}
+        if "parts" not in columns:
+            self._conn.execute("ALTER TABLE chat_messages ADD COLUMN parts TEXT")
+
+    def append(self, session_id: str, sender: str, text: str, parts: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO chat_messages (session_id, sender, text, parts, created_at) VALUES (?, ?, ?, ?, ?)",
+                (session_id, sender, text, json.dumps(parts) if parts else None, time.time()),
+            )
+            # Keep only this session's newest max_messages rows
+            self._conn.execute(
+                """
+                DELETE FROM chat_messages WHERE session_id = ? AND id NOT IN (
+                    SELECT id FROM chat_messages WHERE session_id = ? ORDER BY id DESC LIMIT ?
+                )
+                """,
+                (session_id, session_id, self.max_messages),
+            )
+            self._conn.commit()
+
+            self._writes += 1
+            if self._writes % self.EVICT_EVERY == 0:
+                self._evict()
+
+    def _evict(self) -> None:
+        # Called with the lock held
+        self._conn.execute(
+            """
+            DELETE FROM chat_messages WHERE session_id IN (
+                SELECT session_id FROM chat_messages GROUP BY session_id HAVING MAX(created_at) < ?
+            )
+            """,
+            (time.time() - self.ttl,),
+        )
+        self._conn.execute(
+            """
+            DELETE FROM chat_messages WHERE session_id IN (
+                SELECT session_id FROM chat_messages GROUP BY session_id
+                ORDER BY MAX(created_at) DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_sessions,),
+        )
+        self._conn.commit()
+
+    def get(self, session_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT sender, text, parts, created_at FROM chat_messages WHERE session_id = ? ORDER BY id",
+                (session_id,),
+            ).fetchall()
+
+        if rows and time.time() - rows[-1][3] > self.ttl:
+            return []
+        return [
+            {**(json.loads(parts) if parts else {}), "sender": sender, "text": text}
+            for sender, text, parts, _ in rows
+        ]
+
+
+def get_history_store():
+    if CHAT_HISTORY_BACKEND == "memory":
+        return MemoryHistoryStore(CHAT_HISTORY_MAX_MESSAGES, CHAT_HISTORY_MAX_SESSIONS, CHAT_HISTORY_TTL_SECONDS)
+    if CHAT_HISTORY_BACKEND == "sqlite":
+        return SqliteHistoryStore(
+            CHAT_HISTORY_DB, CHAT_HISTORY_MAX_MESSAGES, CHAT_HISTORY_MAX_SESSIONS, CHAT_HISTORY_TTL_SECONDS
+        )
+    raise ValueError(f"Unknown CHAT_HISTORY_BACKEND: {CHAT_HISTORY_BACKEND!r}")
@@ -0,0 +1,251 @@
+# checkpoint.py
+
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+
+# ------------------------
+#   CONFIG
+# ------------------------
+
+BASE_DIR = Path(__file__).resolve().parent
+CHECKPOINT_DIR = BASE_DIR / "checkpoints"    # created automatically
+
+# "sqlite" (persistent, shared by all uvicorn workers) or "memory" (single process)
+CHECKPOINTER = os.getenv("CHECKPOINTER", "sqlite")
+CHECKPOINT_DB = Path(os.getenv("CHECKPOINT_DB", str(CHECKPOINT_DIR / "threads.sqlite")))
+
+# Idle threads are dropped after this many seconds
+CHECKPOINT_TTL_SECONDS = int(os.getenv("CHECKPOINT_TTL_SECONDS", str(24 * 3600)))
+# Least-recently-used threads are dropped beyond these caps
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "10000"))
+CHECKPOINT_MAX_BYTES = int(os.getenv("CHECKPOINT_MAX_BYTES", str(256 * 1024 * 1024)))
+# SQLite page cache per process, in KiB
+CHECKPOINT_CACHE_KB = int(os.getenv("CHECKPOINT_CACHE_KB", "8192"))
+
+# Run the eviction sweep every N checkpoint writes
+EVICT_EVERY = 200
+
+
+# ------------------------
+#   IN-MEMORY BACKEND
+# ------------------------
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    MemorySaver with TTL + LRU eviction of whole threads.
+    Only suitable for a single process; state is lost on restart.
+    """
+
+    def __init__(self, max_threads: int = CHECKPOINT_MAX_THREADS, ttl: int = CHECKPOINT_TTL_SECONDS):
+        super().__init__()
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self._last_seen = OrderedDict()
+        self._lru_lock = threading.Lock()
+
+    def _touch(self, thread_id: str) -> None:
+        now = time.monotonic()
+        with self._lru_lock:
+            self._last_seen[thread_id] = now
+            self._last_seen.move_to_end(thread_id)
+
+            expired = []
+            for tid, seen in self._last_seen.items():
+                if now - seen <= self.ttl and len(self._last_seen) - len(expired) <= self.max_threads:
+                    break
+                expired.append(tid)
+
+            for tid in expired:
+                del self._last_seen[tid]
+
+        for tid in expired:
+            self.delete_thread(tid)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        saved = super().put(config, checkpoint, metadata, new_versions)
+        self._touch(str(config["configurable"]["thread_id"]))
+        return saved
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self._lru_lock:
+            self._last_seen.pop(str(thread_id), None)
+
+
+# ------------------------
+#   SQLITE BACKEND
+# ------------------------
+
+class SqliteCheckpointer(SqliteSaver):
+    """
+    Persistent checkpointer on a single SQLite file.
+
+    - WAL mode + busy timeout so several uvicorn workers can share one file.
+    - Only the latest checkpoint per thread is kept (no time-travel history).
+    - Idle threads expire after `ttl`; beyond `max_threads` / `max_bytes`
+      the least-recently-used threads are deleted.
+    - Async methods run on one dedicated thread (SQLite has a single writer anyway).
+    """
+
+    def __init__(
+        self,
+        path: Path = CHECKPOINT_DB,
+        ttl: int = CHECKPOINT_TTL_SECONDS,
+        max_threads: int = CHECKPOINT_MAX_THREADS,
+        max_bytes: int = CHECKPOINT_MAX_BYTES,
+        cache_kb: int = CHECKPOINT_CACHE_KB,
+    ):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{cache_kb}")
+        super().__init__(conn)
+
+        self.ttl = ttl
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self._puts = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS thread_activity (
+                thread_id TEXT PRIMARY KEY,
+                last_seen REAL NOT NULL,
+                bytes INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS thread_activity_last_seen
+                ON thread_activity (last_seen);
+            """
+        )
+
+    # ---- sync API ----
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        saved = super().put(config, checkpoint, metadata, new_versions)
+
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoint_id = checkpoint["id"]
+
+        with self.cursor() as cur:
+            # Drop superseded checkpoints (and their pending writes) for this thread
+            cur.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            )
+            cur.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                (thread_id, checkpoint_ns, checkpoint_id),
+            )
+            cur.execute(
+                """
+                INSERT OR REPLACE INTO thread_activity (thread_id, last_seen, bytes)
+                SELECT ?, ?, COALESCE(SUM(LENGTH(checkpoint)), 0)
+                FROM checkpoints WHERE thread_id = ?
+                """,
+                (thread_id, time.time(), thread_id),
+            )
+
+        self._puts += 1
+        if self._puts % EVICT_EVERY == 0:
+            self.evict()
+
+        return saved
+
+    def delete_thread(self, thread_id: str) -> None:
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),))
+
+    def evict(self) -> int:
+        """
+        Delete expired threads, then least-recently-used ones until under the caps.
+        Returns the number of threads removed.
+        """
+        with self.cursor(transaction=False) as cur:
+            cur.execute(
+                "SELECT thread_id FROM thread_activity WHERE last_seen < ?",
+                (time.time() - self.ttl,),
+            )
+            doomed = [row[0] for row in cur.fetchall()]
+
+            cur.execute(
+                "SELECT thread_id, bytes FROM thread_activity WHERE last_seen >= ? ORDER BY last_seen DESC",
+                (time.time() - self.ttl,),
+            )
+            live = cur.fetchall()
+
+        total = 0
+        for rank, (thread_id, size) in enumerate(live):
+            total += size
+            if rank >= self.max_threads or total > self.max_bytes:
+                doomed.append(thread_id)
+
+        for thread_id in doomed:
+            self.delete_thread(thread_id)
+
+        if doomed:
+            print(f"[RAG] Evicted {len(doomed)} idle conversation threads")
+        return len(doomed)
+
+    # ---- async API (delegates to the sync one) ----
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def aget_tuple(self, config):
+        return await self._run(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await self._run(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await self._run(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await self._run(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return await self._run(self.delete_thread, thread_id)
+
+
+# ------------------------
+#   FACTORY
+# ------------------------
+
+@lru_cache(maxsize=1)
+def get_checkpointer():
+    """
+    Return the checkpointer selected by CHECKPOINTER ("sqlite" or "memory").
+    One per process, shared by every clinic's graph.
+    """
+    if CHECKPOINTER == "memory":
+        return BoundedMemorySaver()
+    if CHECKPOINTER == "sqlite":
+        print(f"[RAG] Using SQLite checkpointer at: {CHECKPOINT_DB}")
+        return SqliteCheckpointer()
+    raise ValueError(f"Unknown CHECKPOINTER backend: {CHECKPOINTER!r}")
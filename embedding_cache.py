@@ -0,0 +1,142 @@
+# embedding_cache.py
+
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from metrics import EMBEDDING_SECONDS, timed
+
+
+def normalize_text(text: str) -> str:
+    """
+    Case and whitespace differences should not cost another API call.
+    """
+    return " ".join(text.split()).casefold()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with an in-memory LRU in front of a SQLite store.
+
+    Vectors are keyed by sha256(model + normalized text) and stored as
+    float32 blobs, so a text is sent to the provider once per model.
+    """
+
+    def __init__(self, inner: Embeddings, model: str, path: Path, memory_items: int = 4096):
+        self.inner = inner
+        self.model = model
+        self.memory_items = memory_items
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # ---- keys + storage ----
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]) -> None:
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_items:
+            self._lru.popitem(last=False)
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+                    self.memory_hits += 1
+
+            missing = [k for k in dict.fromkeys(keys) if k not in found]
+            for start in range(0, len(missing), 500):
+                part = missing[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                    part,
+                ).fetchall()
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                    found[key] = vector
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+        return found
+
+    def _store(self, items: Dict[str, List[float]]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(k, np.asarray(v, dtype=np.float32).tobytes()) for k, v in items.items()],
+            )
+            self._conn.commit()
+            for key, vector in items.items():
+                self._remember(key, vector)
+
+    # ---- Embeddings API ----
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(t) for t in texts]
+        found = self._lookup(keys)
+
+        # Embed each missing text once, even if it repeats in the batch
+        pending = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in pending:
+                pending[key] = text
+
+        if pending:
+            with self._lock:
+                self.misses += len(pending)
+            with timed(EMBEDDING_SECONDS, kind="documents"):
+                vectors = self.inner.embed_documents(list(pending.values()))
+            fresh = dict(zip(pending.keys(), vectors))
+            self._store(fresh)
+            found.update(fresh)
+
+        return [found[k] for k in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        found = self._lookup([key])
+        if key in found:
+            return found[key]
+
+        with self._lock:
+            self.misses += 1
+        with timed(EMBEDDING_SECONDS, kind="query"):
+            vector = self.inner.embed_query(text)
+        self._store({key: vector})
+        return vector
+
+    # ---- stats ----
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else None,
+            }
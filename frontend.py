@@ -1,78 +1,286 @@
-# frontend.py
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-import httpx
-
-app = FastAPI(title="Clinic AI Frontend")
-
-# ⭐ FIX: SERVE STATIC FILES
-app.mount("/static", StaticFiles(directory="static"), name="static")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-templates = Jinja2Templates(directory="templates")
-
-BACKEND_URL = "http://127.0.0.1:8000/chat"
-chat_history = []
-
-
-def format_bot_message(text: str) -> str:
-    text = (
-        text.replace("- Name:", "<br><b>Name:</b>")
-            .replace("- Email:", "<br><b>Email:</b>")
-            .replace("- Phone:", "<br><b>Phone:</b>")
-            .replace("- Date of Birth:", "<br><b>Date of Birth:</b>")
-            .replace("- Reason:", "<br><b>Reason:</b>")
-            .replace("- Date:", "<br><b>Date:</b>")
-            .replace("- Time:", "<br><b>Time:</b>")
-            .replace("- Notes:", "<br><b>Notes:</b>")
-    )
-    return text.strip()
-
-
-@app.get("/", response_class=HTMLResponse)
-async def home(request: Request):
-    return templates.TemplateResponse("chat.html", {
-        "request": request,
-        "messages": chat_history
-    })
-
-
-@app.post("/send")
-async def send_message(request: Request):
-    data = await request.json()
-    message = data.get("message")
-    thread_id = data.get("thread_id") or "frontend-session-001"
-
-    chat_history.append({"sender": "user", "text": message})
-
-    try:
-        async with httpx.AsyncClient(timeout=40.0) as client:
-            backend_response = await client.post(
-                BACKEND_URL,
-                json={"question": message, "thread_id": thread_id}
-            )
-
-        if backend_response.status_code != 200:
-            bot_reply = "Sorry, something went wrong with the server."
-        else:
-            bot_reply = backend_response.json().get("answer", "")
-
-    except Exception as e:
-        bot_reply = f"Server error: {str(e)}"
-
-    bot_reply = format_bot_message(bot_reply)
-    chat_history.append({"sender": "bot", "text": bot_reply})
-
-    return JSONResponse({
-        "answer": bot_reply,
-        "thread_id": thread_id
-    })
+# frontend.py
+import asyncio
+import itertools
+import os
+import uuid
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse
+from fastapi.templating import Jinja2Templates
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
+import httpx
+import json
+
+from chat_history import CHAT_HISTORY_TTL_SECONDS, get_history_store
+
+# Comma-separated backend replicas, e.g. "http://10.0.0.5:8000,http://10.0.0.6:8000"
+BACKEND_URLS = os.getenv("BACKEND_URLS", "http://127.0.0.1:8000").split(",")
+BACKEND_TIMEOUT = float(os.getenv("BACKEND_TIMEOUT", "40"))
+# Concurrent chat requests allowed per replica; excess waits briefly, then is shed
+BACKEND_MAX_IN_FLIGHT = int(os.getenv("BACKEND_MAX_IN_FLIGHT", "32"))
+BACKEND_QUEUE_TIMEOUT = float(os.getenv("BACKEND_QUEUE_TIMEOUT", "0.5"))
+RETRY_AFTER_SECONDS = 2
+# Clinic this chat UI belongs to (tenants.json id on the backend); empty = the backend's default
+CLINIC_ID = os.getenv("CLINIC_ID") or None
+
+BUSY_REPLY = "We're helping a lot of patients right now. Please try again in a moment."
+
+
+class Backend:
+    def __init__(self, base_url: str, max_in_flight: int):
+        self.base_url = base_url.strip().rstrip("/")
+        self.chat_url = f"{self.base_url}/chat"
+        self.stream_url = f"{self.base_url}/chat/stream"
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.in_flight = 0
+
+
+class BackendPool:
+    """
+    Spreads chat turns over the backend replicas (fewest in flight first)
+    and sheds load when every replica is at its limit.
+    """
+
+    def __init__(self, urls, max_in_flight: int):
+        self.backends = [Backend(url, max_in_flight) for url in urls if url.strip()]
+        self._rotation = itertools.cycle(range(len(self.backends)))
+
+    async def acquire(self, timeout: float):
+        """
+        Reserve a slot on the least busy replica; None if none frees up in time.
+        """
+        start = next(self._rotation)
+        ordered = self.backends[start:] + self.backends[:start]
+        backend = min(ordered, key=lambda b: b.in_flight)
+        try:
+            await asyncio.wait_for(backend.semaphore.acquire(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        backend.in_flight += 1
+        return backend
+
+    def release(self, backend: Backend) -> None:
+        backend.in_flight -= 1
+        backend.semaphore.release()
+
+
+class Lease:
+    """
+    One acquired backend slot. release() is idempotent, so every path that
+    can end a request may call it.
+    """
+
+    def __init__(self, pool: BackendPool, backend: Backend):
+        self.pool = pool
+        self.backend = backend
+        self.released = False
+
+    def release(self) -> None:
+        if not self.released:
+            self.released = True
+            self.pool.release(self.backend)
+
+
+class LeasedStreamingResponse(StreamingResponse):
+    """
+    Gives the backend slot back however the response ends, including a
+    client that disconnects before the body (and so the generator) starts.
+    """
+
+    def __init__(self, content, lease: Lease, **kwargs):
+        super().__init__(content, **kwargs)
+        self.lease = lease
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.lease.release()
+
+
+backend_pool = BackendPool(BACKEND_URLS, BACKEND_MAX_IN_FLIGHT)
+http_client = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled keep-alive client for all backend calls
+    global http_client
+    http_client = httpx.AsyncClient(
+        timeout=httpx.Timeout(BACKEND_TIMEOUT, connect=5.0),
+        limits=httpx.Limits(
+            max_connections=BACKEND_MAX_IN_FLIGHT * len(backend_pool.backends),
+            max_keepalive_connections=BACKEND_MAX_IN_FLIGHT * len(backend_pool.backends),
+        ),
+    )
+    yield
+    await http_client.aclose()
+
+
+app = FastAPI(title="Clinic AI Frontend", lifespan=lifespan)
+
+# ⭐ FIX: SERVE STATIC FILES
+app.mount("/static", StaticFiles(directory="static"), name="static")
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+templates = Jinja2Templates(directory="templates")
+
+# Transcript per browser session (cookie), never shared between visitors
+SESSION_COOKIE = "vena_session"
+history_store = get_history_store()
+
+
+# Booking card rows: (BookingSummary key, label); the page renders these, the text answer isn't parsed
+BOOKING_FIELDS = [
+    ("name", "Name"),
+    ("email", "Email"),
+    ("phone", "Phone"),
+    ("date_of_birth", "Date of Birth"),
+    ("reason", "Reason for Visit"),
+    ("date", "Date"),
+    ("time", "Time"),
+    ("notes", "Notes for the Doctor"),
+    ("provider", "Doctor"),
+    ("booking_id", "Booking Reference"),
+]
+
+
+def reply_parts(payload: dict) -> dict:
+    # Structured parts of a backend ChatResponse that the page renders, kept with the bot message.
+    # Sources (document paths) are for API clients, not patients.
+    return {key: payload[key] for key in ("booking", "emergency") if payload.get(key)}
+
+
+def set_session_cookie(response, session_id: str) -> None:
+    response.set_cookie(
+        SESSION_COOKIE,
+        session_id,
+        max_age=CHAT_HISTORY_TTL_SECONDS,
+        httponly=True,
+        samesite="lax",
+    )
+
+
+@app.get("/", response_class=HTMLResponse)
+async def home(request: Request):
+    session_id = request.cookies.get(SESSION_COOKIE) or uuid.uuid4().hex
+
+    response = templates.TemplateResponse(request, "chat.html", {
+        "messages": history_store.get(session_id),
+        "booking_fields": BOOKING_FIELDS,
+    })
+    set_session_cookie(response, session_id)
+    return response
+
+
+@app.post("/send")
+async def send_message(request: Request):
+    data = await request.json()
+    message = data.get("message")
+    # The conversation is the server-issued session: never an id from the request body
+    session_id = request.cookies.get(SESSION_COOKIE) or uuid.uuid4().hex
+
+    history_store.append(session_id, "user", message)
+
+    backend = await backend_pool.acquire(BACKEND_QUEUE_TIMEOUT)
+    if backend is None:
+        # Every replica is saturated -> fail fast instead of queueing
+        response = JSONResponse(
+            {"answer": BUSY_REPLY},
+            status_code=503,
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)},
+        )
+        set_session_cookie(response, session_id)
+        return response
+    lease = Lease(backend_pool, backend)
+
+    if data.get("stream"):
+        response = LeasedStreamingResponse(
+            stream_reply(lease, session_id, message),
+            lease,
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        set_session_cookie(response, session_id)
+        return response
+
+    parts = {}
+    try:
+        backend_response = await http_client.post(
+            backend.chat_url,
+            json={"question": message, "thread_id": session_id, "clinic_id": CLINIC_ID}
+        )
+
+        if backend_response.status_code != 200:
+            bot_reply = "Sorry, something went wrong with the server."
+        else:
+            payload = backend_response.json()
+            bot_reply = payload.get("answer", "")
+            parts = reply_parts(payload)
+
+    except Exception as e:
+        bot_reply = f"Server error: {str(e)}"
+
+    finally:
+        lease.release()
+
+    history_store.append(session_id, "bot", bot_reply, parts)
+
+    response = JSONResponse({"answer": bot_reply, **parts})
+    set_session_cookie(response, session_id)
+    return response
+
+
+async def stream_reply(lease: Lease, session_id: str, message: str):
+    """
+    Relay the backend's SSE token stream to the browser as it arrives.
+
+    Token events pass through untouched; the final event carries the full
+    answer and its structured parts (booking card, emergency flag).
+    The backend slot is held until the backend's stream ends.
+    """
+    bot_reply = ""
+    parts = {}
+
+    try:
+        async with http_client.stream(
+            "POST",
+            lease.backend.stream_url,
+            json={"question": message, "thread_id": session_id, "clinic_id": CLINIC_ID},
+        ) as backend_response:
+
+            if backend_response.status_code != 200:
+                bot_reply = "Sorry, something went wrong with the server."
+            else:
+                async for line in backend_response.aiter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    event = json.loads(line[len("data: "):])
+
+                    if "token" in event:
+                        bot_reply += event["token"]
+                        yield f"{line}\n\n"
+                    elif event.get("done"):
+                        bot_reply = event.get("answer", bot_reply)
+                        parts = reply_parts(event)
+                    elif "error" in event:
+                        bot_reply = f"Server error: {event['error']}"
+
+    except Exception as e:
+        bot_reply = f"Server error: {str(e)}"
+
+    finally:
+        lease.release()
+
+    history_store.append(session_id, "bot", bot_reply, parts)
+
+    done = {"done": True, "answer": bot_reply, **parts}
+    yield f"data: {json.dumps(done)}\n\n"
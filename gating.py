@@ -0,0 +1,102 @@
+# gating.py  (per-turn "does this need retrieval?" + standalone query for follow-ups)
+
+import os
+import re
+from typing import Optional, Sequence, Tuple
+
+from langchain_core.messages import BaseMessage, HumanMessage
+
+from triage import MEDICAL_RE
+
+
+# Optional sklearn-style pipeline (joblib file) predicting "retrieve" / "skip",
+# consulted only when the rules below don't decide
+RETRIEVAL_GATE_MODEL = os.getenv("RETRIEVAL_GATE_MODEL")
+
+RETRIEVE = "retrieve"
+CONDENSED = "condensed"
+SKIP = "skip"
+
+# Turns made only of these words carry nothing worth searching for
+SMALL_TALK = {
+    "yes", "yeah", "yep", "yup", "no", "nope", "nah", "ok", "okay", "sure", "please", "thanks", "thank",
+    "you", "great", "cool", "got", "it", "alright", "fine", "perfect", "sounds", "good", "hi", "hello",
+    "hey", "morning", "afternoon", "evening", "bye", "goodbye", "that", "works", "correct", "right",
+    "will", "do", "i", "a", "lot", "much", "so", "very", "and", "oh", "hmm", "understood", "noted",
+}
+
+# Booking-style answers: emails, phone numbers, dates, times
+DATA_RE = re.compile(
+    r"[\w.+-]+@[\w-]+(\.[\w-]+)+"
+    r"|\+?\d[\d\s().-]{6,}\d"
+    r"|\b\d{1,4}[/-]\d{1,2}([/-]\d{2,4})?\b"
+    r"|\b\d{1,2}(:\d{2})?\s*(am|pm)?\b"
+    r"|\b(mon|tues|wednes|thurs|fri|satur|sun)day\b|\b(today|tomorrow|next|week|at|on|the)\b",
+    re.IGNORECASE,
+)
+WORD_RE = re.compile(r"[a-z']+")
+
+# Follow-ups that only make sense with the previous turn ("is it safe?", "what about kids?")
+FOLLOW_UP_RE = re.compile(
+    r"^\s*(and|also|what about|how about|what if|is it|are they|can i|should i|does it|do they|how long|how much|how often)\b"
+    r"|\b(it|its|that|this|those|these|they|them|the same)\b",
+    re.IGNORECASE,
+)
+FOLLOW_UP_MAX_WORDS = 12
+CONDENSED_MAX_CHARS = 400
+
+
+def _words(text: str):
+    return WORD_RE.findall(text.lower())
+
+
+def _previous_topic(history: Sequence[BaseMessage]) -> Optional[str]:
+    # Most recent earlier patient message that mentions something medical
+    for msg in reversed(history):
+        if isinstance(msg, HumanMessage) and MEDICAL_RE.search(msg.content):
+            return msg.content
+    return None
+
+
+class RetrievalGate:
+    """
+    Local rules first; an optional model only when they are inconclusive.
+    """
+
+    def __init__(self, model=None):
+        self.model = model
+
+    def decide(self, text: str, history: Sequence[BaseMessage]) -> Tuple[str, str]:
+        """
+        Returns (decision, search query). `history` is the conversation
+        before this turn.
+        """
+        words = _words(text)
+        leftover = _words(DATA_RE.sub(" ", text))
+
+        if not words or all(w in SMALL_TALK for w in words):
+            return SKIP, ""
+        if not any(w not in SMALL_TALK for w in leftover) and not MEDICAL_RE.search(text):
+            return SKIP, ""
+
+        # "Is it safe for kids?" names no condition itself -> borrow the earlier one
+        if len(words) <= FOLLOW_UP_MAX_WORDS and FOLLOW_UP_RE.search(text) and not MEDICAL_RE.search(text):
+            topic = _previous_topic(history)
+            if topic:
+                return CONDENSED, f"{topic.strip()} {text.strip()}"[-CONDENSED_MAX_CHARS:]
+
+        if self.model is not None and not MEDICAL_RE.search(text):
+            if str(self.model.predict([text])[0]) == SKIP:
+                return SKIP, ""
+        return RETRIEVE, text
+
+
+def get_retrieval_gate() -> RetrievalGate:
+    if not RETRIEVAL_GATE_MODEL:
+        return RetrievalGate()
+    try:
+        import joblib
+    except ImportError as e:
+        raise ImportError("RETRIEVAL_GATE_MODEL needs joblib: pip install joblib scikit-learn") from e
+    print(f"[RAG] Loading retrieval gate model from: {RETRIEVAL_GATE_MODEL}")
+    return RetrievalGate(model=joblib.load(RETRIEVAL_GATE_MODEL))
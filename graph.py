@@ -1,236 +1,803 @@
-# graph.py
-
-import os
-from pathlib import Path
-from typing import List, TypedDict
-
-from dotenv import load_dotenv
-
-from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader
-from langchain_community.vectorstores import Chroma
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_core.documents import Document
-
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-
-from langgraph.graph import StateGraph, END
-from typing import Annotated, Sequence, TypedDict
-
-from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage
-from langgraph.graph.message import add_messages
-# from extra_prompts import system_prompt
-from prompts import system_prompt
-
-
-
-
-# ------------------------
-#   PATHS & CONFIG
-# ------------------------
-
-BASE_DIR = Path(__file__).resolve().parent
-DATA_DIR = BASE_DIR / "Data"                 # D:\Upwork_projects\01_RAG_HealthCare\Data
-VECTORSTORE_DIR = BASE_DIR / "vectorstore"   # created automatically
-GRAPH_DIAGRAM_DIR = BASE_DIR / "graph-diagram"  # D:\Upwork_projects\01_RAG_HealthCare\graph-diagram
-
-CHUNK_SIZE = 1000
-CHUNK_OVERLAP = 150
-
-
-# ------------------------
-#   LANGGRAPH STATE
-# ------------------------
-class AgentState(TypedDict):
-    messages: Annotated[Sequence[BaseMessage], add_messages]
-
-
-
-# ------------------------
-#   ENV & MODELS
-# ------------------------
-
-load_dotenv()  # reads .env in project root
-
-
-def get_llm() -> ChatOpenAI:
-    return ChatOpenAI(
-        model="gpt-4o-mini",
-        temperature=0,
-    )
-
-
-def get_embeddings() -> OpenAIEmbeddings:
-    return OpenAIEmbeddings(model="text-embedding-3-large")
-
-
-# ------------------------
-#   DATA INGEST + VECTORSTORE
-# ------------------------
-
-def load_pdfs() -> List[Document]:
-    """
-    Load all PDFs from the Data/ directory.
-    """
-    if not DATA_DIR.exists():
-        raise FileNotFoundError(f"Data directory not found: {DATA_DIR}")
-
-    loader = DirectoryLoader(
-        str(DATA_DIR),
-        glob="*.pdf",
-        loader_cls=PyPDFLoader,
-        show_progress=True,
-    )
-    docs = loader.load()
-    return docs
-
-
-def chunk_documents(docs: List[Document]) -> List[Document]:
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-        separators=["\n\n", "\n", ".", " ", ""],
-    )
-    return splitter.split_documents(docs)
-
-
-def build_vectorstore() -> Chroma:
-    """
-    Build and persist a Chroma vector store from PDFs in Data/.
-    """
-    print(f"[RAG] Loading PDFs from: {DATA_DIR}")
-    docs = load_pdfs()
-    print(f"[RAG] Loaded {len(docs)} pages. Chunking...")
-    chunks = chunk_documents(docs)
-    print(f"[RAG] Split into {len(chunks)} chunks. Creating embeddings…")
-
-    embeddings = get_embeddings()
-    VECTORSTORE_DIR.mkdir(parents=True, exist_ok=True)
-
-    vectordb = Chroma.from_documents(
-        documents=chunks,
-        embedding=embeddings,
-        persist_directory=str(VECTORSTORE_DIR),
-    )
-    vectordb.persist()
-    print(f"[RAG] Vector store created at: {VECTORSTORE_DIR}")
-    return vectordb
-
-
-def get_or_create_vectorstore() -> Chroma:
-    """
-    Load existing vector store if present, otherwise build it.
-    """
-    if VECTORSTORE_DIR.exists() and any(VECTORSTORE_DIR.iterdir()):
-        print(f"[RAG] Loading existing vector store from: {VECTORSTORE_DIR}")
-        embeddings = get_embeddings()
-        vectordb = Chroma(
-            embedding_function=embeddings,
-            persist_directory=str(VECTORSTORE_DIR),
-        )
-        return vectordb
-
-    return build_vectorstore()
-
-
-# ------------------------
-#   LANGGRAPH NODES
-# ------------------------
-
-def make_retriever_node(retriever):
-    def retrieve(state: AgentState):
-        # Last user message
-        last_message = state["messages"][-1]
-        question = last_message.content
-
-        docs = retriever.invoke(question)
-
-        context_text = "\n\n".join([d.page_content for d in docs])
-
-        rag_msg = AIMessage(
-            content=f"[RAG CONTEXT START]\n{context_text}\n[RAG CONTEXT END]"
-        )
-
-        return {"messages": [rag_msg]}
-    return retrieve
-
-
-
-def make_generate_node(llm: ChatOpenAI):
-    def generate(state: AgentState):
-
-        # All messages so far
-        msgs = [SYSTEM] + list(state["messages"])
-
-        response = llm.invoke(msgs)
-
-        return {"messages": [AIMessage(content=response.content)]}
-
-    return generate
-
-SYSTEM = SystemMessage(content=system_prompt())
-
-# ------------------------
-#   BUILD LANGGRAPH
-# ------------------------
-def build_graph(retriever, llm):
-    graph = StateGraph(AgentState)
-
-    graph.add_node("retrieve", make_retriever_node(retriever))
-    graph.add_node("generate", make_generate_node(llm))
-
-    graph.set_entry_point("retrieve")
-    graph.add_edge("retrieve", "generate")
-    graph.add_edge("generate", END)
-
-    from langgraph.checkpoint.memory import MemorySaver
-    checkpointer = MemorySaver()
-
-    return graph.compile(checkpointer=checkpointer)
-
-
-
-def save_mermaid_diagram(app) -> None:
-    """
-    Save a Mermaid diagram of the graph under graph-diagram/.
-    """
-    try:
-        GRAPH_DIAGRAM_DIR.mkdir(parents=True, exist_ok=True)
-        mermaid_str = app.get_graph().draw_mermaid()
-        out_path = GRAPH_DIAGRAM_DIR / "healthcare_rag_graph.mmd"
-        out_path.write_text(mermaid_str, encoding="utf-8")
-        print(f"[RAG] Mermaid diagram saved to: {out_path}")
-    except Exception as e:
-        print(f"[RAG] Could not save Mermaid diagram: {e}")
-
-
-# ------------------------
-#   SIMPLE CLI (Q/A)
-# ------------------------
-def main():
-    vectordb = get_or_create_vectorstore()
-    retriever = vectordb.as_retriever(search_kwargs={"k": 4})
-    llm = get_llm()
-
-    app = build_graph(retriever, llm)
-
-    print("\n=== Medical RAG Agent (Reducer Version) ===\n")
-
-    config = {"configurable": {"thread_id": "cli-session-001"}}
-
-    while True:
-        user_q = input("You: ").strip()
-        if user_q.lower() in {"exit", "quit"}:
-            print("Assistant: Goodbye!")
-            break
-
-        result = app.invoke(
-            {"messages": [HumanMessage(content=user_q)]},
-            config=config,
-        )
-
-        final_message = result["messages"][-1]
-        print(f"Assistant: {final_message.content}\n")
-
-
-if __name__ == "__main__":
-    main()
+# graph.py
+
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Annotated, List, Optional, Sequence, TypedDict
+
+from dotenv import load_dotenv
+
+from langchain_community.vectorstores import Chroma
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from langchain_openai import ChatOpenAI
+
+from langgraph.graph import StateGraph, END
+
+from langchain_core.messages import BaseMessage, SystemMessage, HumanMessage, AIMessage, RemoveMessage
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
+from langgraph.graph.message import add_messages
+# from extra_prompts import system_prompt
+from prompts import system_prompt
+from rerank import CONTEXT_SEPARATOR, approx_tokens, drop_near_duplicates, get_reranker, pack_context
+from response_cache import SemanticResponseCache, is_cacheable
+from metrics import (
+    CACHED_PROMPT_TOKENS, COMPLETION_TOKENS, CONTEXT_BYTES, PREFIX_RATIO, PROMPT_TOKENS, RETRIEVAL_GATE,
+    RETRIEVED_CHUNKS, timed_node,
+)
+from gating import SKIP, get_retrieval_gate
+from triage import BOOKING, MEDICAL, OFF_TOPIC, canned_reply, get_triage_classifier
+from booking import Booking, BookingFlow, BookingSummary, is_active, wants_to_book
+from slots import CLINIC_PROVIDERS, SCHEDULE_DB, SlotSchedule, get_schedule, make_slot_tools
+from tenants import Tenant
+from scheduler import URGENT, ScheduledChatOpenAI, ScheduledOpenAIEmbeddings, call_lane
+
+
+
+
+# ------------------------
+#   PATHS & CONFIG
+# ------------------------
+
+BASE_DIR = Path(__file__).resolve().parent
+DATA_DIR = BASE_DIR / "Data"                 # D:\Upwork_projects\01_RAG_HealthCare\Data
+VECTORSTORE_DIR = BASE_DIR / "vectorstore"   # created automatically
+CACHE_DIR = BASE_DIR / "cache"               # created automatically
+MANIFEST_PATH = VECTORSTORE_DIR / "manifest.json"  # written by ingest.py
+BM25_DIR = VECTORSTORE_DIR / "bm25"                 # written by ingest.py
+REPORTS_DIR = BASE_DIR / "reports"              # replay reports (python graph.py --replay ...)
+GRAPH_DIAGRAM_DIR = BASE_DIR / "graph-diagram"  # D:\Upwork_projects\01_RAG_HealthCare\graph-diagram
+
+EMBEDDING_MODEL = "text-embedding-3-large"
+
+# "chroma" (default) or "quantized": memory-mapped NumPy matrix of truncated,
+# int8/float16 vectors (quantized_store.py), rescored on full vectors
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+QUANTIZED_DIR = VECTORSTORE_DIR / "quantized"
+QUANT_DIM = int(os.getenv("QUANT_DIM", "256"))          # Matryoshka dims kept (<= 3072)
+QUANT_DTYPE = os.getenv("QUANT_DTYPE", "int8")          # "int8" or "float16"
+QUANT_RESCORE = os.getenv("QUANT_RESCORE", "1") == "1"  # exact rescoring of 4*k candidates
+EMBED_CACHE = os.getenv("EMBED_CACHE", "1") == "1"
+EMBED_CACHE_PATH = CACHE_DIR / "embeddings.sqlite"
+EMBED_CACHE_MEMORY_ITEMS = int(os.getenv("EMBED_CACHE_MEMORY_ITEMS", "4096"))
+
+# Semantic answer cache for first-turn questions (off unless RESPONSE_CACHE=1)
+RESPONSE_CACHE = os.getenv("RESPONSE_CACHE", "0") == "1"
+RESPONSE_CACHE_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95"))
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+
+# Retrieval: dense Chroma search fused with the local BM25 index
+# Candidates fetched per turn; the rerank node keeps at most RERANK_TOP_K of them
+RETRIEVER_K = int(os.getenv("RETRIEVER_K", "12"))
+HYBRID_RETRIEVAL = os.getenv("HYBRID_RETRIEVAL", "1") == "1"
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20"))
+DENSE_TIMEOUT_SECONDS = float(os.getenv("DENSE_TIMEOUT_SECONDS", "2.0"))
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 150
+
+# Skip retrieval on turns like "yes" / "Tuesday at 10:30"; condense follow-ups
+RETRIEVAL_GATE_ENABLED = os.getenv("RETRIEVAL_GATE", "1") == "1"
+
+# Rerank + packing of retrieved chunks into the prompt
+RERANK_TOP_K = int(os.getenv("RERANK_TOP_K", "4"))
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))
+
+# Sync work (Chroma search, PDF parsing) runs here instead of on the event loop
+WORKER_THREADS = int(os.getenv("RAG_WORKER_THREADS", "8"))
+
+# Older conversation turns are dropped once history exceeds this many tokens
+HISTORY_TOKEN_BUDGET = int(os.getenv("RAG_HISTORY_TOKENS", "3000"))
+# ...and trimmed down to this share of the budget, so the prefix stays stable for a while
+HISTORY_TRIM_TO = float(os.getenv("RAG_HISTORY_TRIM_TO", "0.6"))
+
+# Appointment booking
+CLINIC_NAME = os.getenv("CLINIC_NAME", "Riverside Wellness Clinic")
+CLINIC_TIMEZONE = os.getenv("CLINIC_TIMEZONE", "UTC")
+
+# The single-clinic layout above; more clinics come from tenants.json (tenants.py)
+DEFAULT_CLINIC = Tenant(
+    "default", CLINIC_NAME, CLINIC_TIMEZONE,
+    data_dir=DATA_DIR, vectorstore_dir=VECTORSTORE_DIR, schedule_db=SCHEDULE_DB,
+)
+
+
+# ------------------------
+#   LANGGRAPH STATE
+# ------------------------
+class AgentState(TypedDict):
+    messages: Annotated[Sequence[BaseMessage], add_messages]
+    # Filled by retrieve (candidates) and rerank (final chunks) for the current turn
+    documents: List[Document]
+    sources: List[str]
+    # Packed RAG context for the current turn; goes at the end of the prompt, never into messages
+    context: str
+    # Set by the gate node: search query for this turn, or retrieval skipped
+    retrieval_query: str
+    retrieval_skipped: bool
+    # Size of the prompt sent to the LLM this turn (approximate tokens)
+    prompt_tokens: int
+    # Triage decision for the current turn: "emergency", "off_topic", "booking" or "medical"
+    route: str
+    # Appointment being collected by the booking node (persists across turns)
+    booking: Booking
+    # Structured booking details shown with this turn's reply (None on turns that don't show them)
+    booking_summary: Optional[BookingSummary]
+    # Response cache bookkeeping for the current turn
+    cache_hit: bool
+    cacheable: bool
+
+
+
+# ------------------------
+#   ENV & MODELS
+# ------------------------
+
+load_dotenv()  # reads .env in project root
+
+
+def get_llm() -> ChatOpenAI:
+    # Rate limits and retries are the scheduler's job (scheduler.py), not the client's
+    return ScheduledChatOpenAI(
+        model="gpt-4o-mini",
+        temperature=0,
+        stream_usage=True,   # token usage for /metrics on streamed turns too
+        max_retries=0,
+    )
+
+
+@lru_cache(maxsize=1)
+def get_embeddings() -> Embeddings:
+    """
+    Shared embeddings client; wrapped in the on-disk cache unless EMBED_CACHE=0.
+    """
+    embeddings = ScheduledOpenAIEmbeddings(model=EMBEDDING_MODEL, max_retries=0)
+    if not EMBED_CACHE:
+        return embeddings
+
+    from embedding_cache import CachedEmbeddings
+    return CachedEmbeddings(
+        embeddings,
+        model=EMBEDDING_MODEL,
+        path=EMBED_CACHE_PATH,
+        memory_items=EMBED_CACHE_MEMORY_ITEMS,
+    )
+
+
+# ------------------------
+#   WORKER POOL
+# ------------------------
+
+_executor = ThreadPoolExecutor(max_workers=WORKER_THREADS, thread_name_prefix="rag-worker")
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run a blocking call on the bounded worker pool so the event loop stays free.
+    """
+    # Copy the context so the caller's scheduler lane follows the call into the thread
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_executor, partial(context.run, func, *args, **kwargs))
+
+
+# ------------------------
+#   DATA INGEST + VECTORSTORE
+# ------------------------
+
+def chunk_documents(docs: List[Document]) -> List[Document]:
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=["\n\n", "\n", ".", " ", ""],
+    )
+    return splitter.split_documents(docs)
+
+
+def open_vectorstore(clinic: Tenant = DEFAULT_CLINIC, fresh: bool = False):
+    # `fresh` (quantized only): start empty; the first persist() replaces the live version
+    if VECTOR_BACKEND == "quantized":
+        from quantized_store import QuantizedVectorStore
+        return QuantizedVectorStore(
+            clinic.quantized_dir, get_embeddings(), dim=QUANT_DIM, dtype=QUANT_DTYPE, rescore=QUANT_RESCORE,
+            fresh=fresh,
+        )
+    if VECTOR_BACKEND == "chroma":
+        return Chroma(
+            embedding_function=get_embeddings(),
+            persist_directory=str(clinic.vectorstore_dir),
+        )
+    raise ValueError(f"Unknown VECTOR_BACKEND: {VECTOR_BACKEND!r}")
+
+
+def close_vectorstore(vectordb) -> None:
+    """
+    Release what a store holds outside its own object. chromadb caches one
+    System per persist directory at class level (SharedSystemClient), so a
+    dropped Chroma store stays in memory until its client is closed.
+    """
+    client = getattr(vectordb, "_client", None)
+    if client is not None and hasattr(client, "close"):
+        client.close()
+
+
+def vectorstore_exists(clinic: Tenant = DEFAULT_CLINIC) -> bool:
+    if VECTOR_BACKEND == "quantized":
+        from quantized_store import QuantizedVectorStore
+        return QuantizedVectorStore.exists(clinic.quantized_dir)
+    return (clinic.vectorstore_dir / "chroma.sqlite3").exists()
+
+
+def build_vectorstore(clinic: Tenant = DEFAULT_CLINIC):
+    """
+    Build and persist a Chroma vector store from the clinic's PDFs (Data/).
+    Later changes to Data/ are picked up incrementally with `python ingest.py`.
+    """
+    from ingest import sync_vectorstore
+    vectordb = sync_vectorstore(rebuild=True, clinic=clinic)
+    print(f"[RAG] Vector store created at: {clinic.vectorstore_dir}")
+    return vectordb
+
+
+def vectorstore_version(clinic: Tenant = DEFAULT_CLINIC):
+    """
+    Changes whenever ingest.py rewrites the manifest (sync or rebuild).
+    """
+    try:
+        return clinic.manifest_path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def get_or_create_vectorstore(clinic: Tenant = DEFAULT_CLINIC):
+    """
+    Load existing vector store if present, otherwise build it.
+    """
+    if vectorstore_exists(clinic):
+        print(f"[RAG] Loading existing vector store from: {clinic.vectorstore_dir}")
+        return open_vectorstore(clinic)
+
+    return build_vectorstore(clinic)
+
+
+def get_retriever(vectordb, clinic: Tenant = DEFAULT_CLINIC):
+    """
+    Hybrid (dense + BM25) retriever when the lexical index exists, else plain dense.
+    """
+    from bm25 import BM25Index, HybridRetriever, ReloadingBM25Index
+
+    if HYBRID_RETRIEVAL and BM25Index.exists(clinic.bm25_dir):
+        print(f"[RAG] Loading BM25 index from: {clinic.bm25_dir}")
+        return HybridRetriever(
+            vectorstore=vectordb,
+            bm25=ReloadingBM25Index(clinic.bm25_dir),
+            k=RETRIEVER_K,
+            fetch_k=HYBRID_FETCH_K,
+            dense_timeout=DENSE_TIMEOUT_SECONDS,
+        )
+    return vectordb.as_retriever(search_kwargs={"k": RETRIEVER_K})
+
+
+# ------------------------
+#   LANGGRAPH NODES
+# ------------------------
+
+def extract_sources(docs: List[Document]) -> List[str]:
+    sources = []
+    for d in docs:
+        meta = d.metadata or {}
+        filename = meta.get("source", "unknown")
+        page = meta.get("page", "?")
+        sources.append(f"{filename} (page {page})")
+    return sources
+
+
+def make_gate_node(gate):
+    """
+    Decide whether this turn needs retrieval at all, and for follow-ups
+    build a standalone search query from the earlier turn.
+    """
+    async def gate_retrieval(state: AgentState):
+        messages = state["messages"]
+        decision, query = gate.decide(messages[-1].content, messages[:-1])
+        RETRIEVAL_GATE.inc(decision=decision)
+
+        if decision == SKIP:
+            print("[RAG] Retrieval skipped for this turn")
+            return {
+                "retrieval_query": "",
+                "retrieval_skipped": True,
+                "context": "",
+                "documents": [],
+                "sources": [],
+            }
+        return {"retrieval_query": query, "retrieval_skipped": False}
+    return gate_retrieval
+
+
+def make_retriever_node(retriever):
+    async def retrieve(state: AgentState):
+        # Standalone query from the gate, else the last user message
+        question = state.get("retrieval_query") or state["messages"][-1].content
+
+        # Chroma has no native async search -> run it on the worker pool
+        docs = await run_blocking(retriever.invoke, question)
+        RETRIEVED_CHUNKS.observe(len(docs), stage="retrieve")
+
+        # Over-fetched candidates; the rerank node picks what goes in the prompt
+        return {"documents": docs}
+    return retrieve
+
+
+def make_rerank_node(reranker, max_chunks: int = RERANK_TOP_K, token_budget: int = CONTEXT_TOKEN_BUDGET):
+    """
+    Dedupe the over-fetched candidates, score them with `reranker`, and pack
+    the best into `token_budget` as this turn's RAG context.
+    """
+    def select(question: str, candidates: List[Document]) -> List[Document]:
+        unique = drop_near_duplicates(candidates)
+        scores = reranker.score(question, unique)
+        ranked = sorted(zip(unique, scores), key=lambda pair: pair[1], reverse=True)
+        return pack_context(ranked, max_chunks, token_budget, CHUNK_OVERLAP)
+
+    async def rerank(state: AgentState):
+        question = state.get("retrieval_query") or state["messages"][-1].content
+        candidates = state.get("documents", [])
+
+        docs = await run_blocking(select, question, candidates)
+
+        context_text = CONTEXT_SEPARATOR.join([d.page_content for d in docs])
+        RETRIEVED_CHUNKS.observe(len(docs), stage="rerank")
+        CONTEXT_BYTES.observe(len(context_text.encode("utf-8")))
+        print(
+            f"[RAG] Rerank: {len(candidates)} candidates -> {len(docs)} chunks, "
+            f"~{approx_tokens(context_text)} context tokens"
+        )
+
+        return {
+            "context": context_text,
+            "documents": docs,
+            "sources": extract_sources(docs),
+        }
+    return rerank
+
+
+def is_rag_context(msg: BaseMessage) -> bool:
+    # RAG context used to be stored as an AIMessage; older checkpoints still have them
+    return isinstance(msg, AIMessage) and msg.content.startswith("[RAG CONTEXT START]")
+
+
+# ------------------------
+#   PROMPT ASSEMBLY
+# ------------------------
+
+def assemble_prompt(history: Sequence[BaseMessage], question: BaseMessage, context: str = "",
+                    system: SystemMessage = None):
+    """
+    Prefix-stable layout for provider prompt caching:
+
+        [static system prompt] + [earlier turns] | [RAG context] + [question]
+
+    Everything before "|" is byte-identical to the previous turn's prompt
+    (plus that turn's answer), so only the volatile tail is uncached.
+    Returns the messages and the number of leading messages that are stable.
+    """
+    messages = [system or SYSTEM] + list(history)
+    stable = len(messages)
+    if context:
+        messages.append(SystemMessage(content=f"[RAG CONTEXT START]\n{context}\n[RAG CONTEXT END]"))
+    messages.append(question)
+    return messages, stable
+
+
+def make_context_node(max_tokens: int = HISTORY_TOKEN_BUDGET, trim_to: float = HISTORY_TRIM_TO,
+                      system: SystemMessage = None):
+    """
+    Keep the persisted conversation small: no stored system or RAG messages,
+    and older turns trimmed once history exceeds `max_tokens`.
+
+    Trimming goes down to `trim_to` of the budget rather than just under it,
+    so the history prefix then stays unchanged (and cacheable) for several
+    turns instead of shifting by one turn every time.
+    """
+    async def manage_context(state: AgentState):
+        removals = []
+        history = []
+        for msg in state["messages"]:
+            if isinstance(msg, SystemMessage) or is_rag_context(msg):
+                removals.append(RemoveMessage(id=msg.id))
+            else:
+                history.append(msg)
+
+        kept = history
+        if count_tokens_approximately(history) > max_tokens:
+            kept = trim_messages(
+                history,
+                max_tokens=int(max_tokens * trim_to),
+                token_counter=count_tokens_approximately,
+                strategy="last",
+                start_on="human",
+            )
+            # Never drop the question being answered, however long it is
+            if not kept:
+                kept = history[-1:]
+
+        kept_ids = {m.id for m in kept}
+        removals += [RemoveMessage(id=m.id) for m in history if m.id not in kept_ids]
+
+        prompt, _ = assemble_prompt(kept[:-1], kept[-1], state.get("context", ""), system)
+        prompt_tokens = count_tokens_approximately(prompt)
+        print(f"[RAG] Prompt tokens this turn: {prompt_tokens} ({len(kept)} history messages)")
+
+        return {"messages": removals, "prompt_tokens": prompt_tokens}
+    return manage_context
+
+
+def make_generate_node(llm: ChatOpenAI, system: SystemMessage = None):
+    async def generate(state: AgentState):
+        messages = list(state["messages"])
+        msgs, stable = assemble_prompt(messages[:-1], messages[-1], state.get("context", ""), system)
+
+        # Share of the prompt that can come from the provider's prefix cache
+        prefix_tokens = count_tokens_approximately(msgs[:stable])
+        PREFIX_RATIO.observe(prefix_tokens / max(1, count_tokens_approximately(msgs)))
+
+        response = await llm.ainvoke(msgs)
+
+        # Real counts from the API when it reports them, else the estimate
+        usage = getattr(response, "usage_metadata", None) or {}
+        PROMPT_TOKENS.observe(usage.get("input_tokens") or state.get("prompt_tokens", 0), node="generate")
+        COMPLETION_TOKENS.observe(
+            usage.get("output_tokens") or count_tokens_approximately([response]), node="generate"
+        )
+        CACHED_PROMPT_TOKENS.observe((usage.get("input_token_details") or {}).get("cache_read", 0))
+
+        return {"messages": [AIMessage(content=response.content)]}
+
+    return generate
+
+SYSTEM = DEFAULT_CLINIC.system_message
+
+
+def last_assistant_text(messages: Sequence[BaseMessage]):
+    for msg in reversed(messages[:-1]):
+        if isinstance(msg, AIMessage) and not is_rag_context(msg):
+            return msg.content
+    return None
+
+
+def make_triage_node(classifier):
+    """
+    Emergencies and off-topic questions get the system prompt's fixed
+    replies straight away, without retrieval or an LLM call. Turns that
+    start or continue a booking go to the booking node.
+    """
+    async def triage(state: AgentState):
+        messages = state["messages"]
+        text = messages[-1].content
+        booking_active = is_active(state.get("booking"))
+
+        # A model-backed classifier's calls jump the OpenAI queue
+        with call_lane(URGENT):
+            route = classifier.classify(text)
+        # Names and emails trip the off-topic patterns ("Carter", "...@hotel.com")
+        if route == OFF_TOPIC and booking_active:
+            route = MEDICAL
+        if route == MEDICAL and (booking_active or wants_to_book(text, last_assistant_text(messages))):
+            return {"route": BOOKING}
+
+        reply = canned_reply(route)
+        if reply is None:
+            return {"route": MEDICAL, "booking_summary": None}
+
+        print(f"[RAG] Triage fast path: {route}")
+        return {
+            "messages": [AIMessage(content=reply)],
+            "documents": [],
+            "sources": [],
+            "route": route,
+            "booking_summary": None,
+        }
+    return triage
+
+
+def make_date_interpreter(llm: ChatOpenAI):
+    """
+    LLM fallback for dates the booking flow's local parser can't read
+    ("the monday after next", "first week of december").
+    """
+    def interpret(text: str, today):
+        prompt = (
+            f"Today is {today.isoformat()} ({today:%A}). Convert the date the user means into "
+            "YYYY-MM-DD. Reply with the date only, or UNKNOWN.\n\n"
+            f"User: {text}"
+        )
+        reply = llm.invoke([HumanMessage(content=prompt)]).content.strip()
+        try:
+            return date.fromisoformat(reply[:10])
+        except ValueError:
+            return None
+    return interpret
+
+
+def make_booking_node(flow: BookingFlow):
+    """
+    Deterministic appointment flow: one field per turn, validated locally,
+    no retrieval and no LLM call except to read free-form dates.
+    """
+    async def booking(state: AgentState):
+        current = state.get("booking")
+        if is_active(current):
+            updated, reply = await run_blocking(flow.handle, current, state["messages"][-1].content)
+        else:
+            updated, reply = flow.start()
+
+        print(f"[RAG] Booking: step={updated.get('step')} status={updated.get('status')}")
+        return {
+            "messages": [AIMessage(content=reply)],
+            "booking": updated,
+            "booking_summary": flow.summary_card(updated),
+            "documents": [],
+            "sources": [],
+            "prompt_tokens": 0,
+        }
+    return booking
+
+
+def make_cache_lookup_node(cache):
+    async def cache_lookup(state: AgentState):
+        messages = state["messages"]
+        if not is_cacheable(messages):
+            return {"cache_hit": False, "cacheable": False}
+
+        hit = await run_blocking(cache.lookup, messages[-1].content)
+        if hit is None:
+            return {"cache_hit": False, "cacheable": True}
+
+        print(f"[RAG] Response cache hit ({cache.stats()})")
+        return {
+            "messages": [AIMessage(content=hit["answer"])],
+            "documents": [],
+            "sources": hit["sources"],
+            "cache_hit": True,
+            "cacheable": False,
+        }
+    return cache_lookup
+
+
+def make_cache_store_node(cache):
+    async def cache_store(state: AgentState):
+        if not state.get("cacheable"):
+            return {}
+
+        question = next(m.content for m in reversed(state["messages"]) if isinstance(m, HumanMessage))
+        answer = state["messages"][-1].content
+        await run_blocking(cache.store, question, answer, state.get("sources", []))
+        return {"cacheable": False}
+    return cache_store
+
+
+def get_response_cache(embeddings: Embeddings = None, clinic: Tenant = DEFAULT_CLINIC):
+    """
+    Semantic response cache from config, or None when RESPONSE_CACHE is off.
+    One per clinic: answers depend on the clinic's documents.
+    """
+    if not RESPONSE_CACHE:
+        return None
+    return SemanticResponseCache(
+        embeddings or get_embeddings(),
+        threshold=RESPONSE_CACHE_THRESHOLD,
+        ttl=RESPONSE_CACHE_TTL,
+        max_entries=RESPONSE_CACHE_MAX_ENTRIES,
+        version_fn=partial(vectorstore_version, clinic),
+    )
+
+# ------------------------
+#   BUILD LANGGRAPH
+# ------------------------
+def build_graph(retriever, llm, checkpointer=None, response_cache=None, schedule=None,
+                clinic: Tenant = DEFAULT_CLINIC):
+    graph = StateGraph(AgentState)
+
+    def add_node(name, node):
+        # Every node reports its wall time (rag_node_seconds + Server-Timing)
+        graph.add_node(name, timed_node(name, node))
+
+    if response_cache is None:
+        response_cache = get_response_cache(clinic=clinic)
+    if schedule is None:
+        schedule = get_schedule()
+
+    add_node("triage", make_triage_node(get_triage_classifier()))
+    add_node("retrieve", make_retriever_node(retriever))
+    add_node("rerank", make_rerank_node(get_reranker()))
+    add_node("context", make_context_node(system=clinic.system_message))
+    add_node("generate", make_generate_node(llm, clinic.system_message))
+    add_node("booking", make_booking_node(BookingFlow(
+        clinic.name,
+        clinic.timezone,
+        interpret_date=make_date_interpreter(llm),
+        slot_tools=make_slot_tools(schedule),
+    )))
+
+    if RETRIEVAL_GATE_ENABLED:
+        add_node("gate", make_gate_node(get_retrieval_gate()))
+        graph.add_conditional_edges(
+            "gate",
+            lambda state: "skip" if state.get("retrieval_skipped") else "retrieve",
+            {"skip": "context", "retrieve": "retrieve"},
+        )
+        retrieval_step = "gate"
+    else:
+        retrieval_step = "retrieve"
+
+    if response_cache is not None:
+        add_node("cache_lookup", make_cache_lookup_node(response_cache))
+        add_node("cache_store", make_cache_store_node(response_cache))
+
+        next_step = "cache_lookup"
+        graph.add_conditional_edges(
+            "cache_lookup",
+            lambda state: "hit" if state.get("cache_hit") else "miss",
+            {"hit": END, "miss": retrieval_step},
+        )
+        graph.add_edge("generate", "cache_store")
+        graph.add_edge("cache_store", END)
+    else:
+        next_step = retrieval_step
+        graph.add_edge("generate", END)
+
+    graph.set_entry_point("triage")
+    graph.add_conditional_edges(
+        "triage",
+        lambda state: {MEDICAL: "answer", BOOKING: "booking"}.get(state.get("route"), "canned"),
+        {"answer": next_step, "booking": "booking", "canned": END},
+    )
+    graph.add_edge("booking", END)
+
+    graph.add_edge("retrieve", "rerank")
+    graph.add_edge("rerank", "context")
+    graph.add_edge("context", "generate")
+
+    if checkpointer is None:
+        from checkpoint import get_checkpointer
+        checkpointer = get_checkpointer()
+
+    return graph.compile(checkpointer=checkpointer)
+
+
+
+def load_clinic(clinic: Tenant):
+    """
+    Everything one clinic's requests need: its vector store, retriever,
+    appointment book and compiled graph. Returns (graph, close) for the
+    tenant registry.
+    """
+    vectordb = get_or_create_vectorstore(clinic)
+    retriever = get_retriever(vectordb, clinic)
+    schedule = SlotSchedule(clinic.schedule_db, clinic.providers or CLINIC_PROVIDERS)
+    app = build_graph(retriever, get_llm(), schedule=schedule, clinic=clinic)
+
+    def close() -> None:
+        schedule.close()
+        close_vectorstore(vectordb)
+
+    return app, close
+
+
+def save_mermaid_diagram(app) -> None:
+    """
+    Save a Mermaid diagram of the graph under graph-diagram/.
+    """
+    try:
+        GRAPH_DIAGRAM_DIR.mkdir(parents=True, exist_ok=True)
+        mermaid_str = app.get_graph().draw_mermaid()
+        out_path = GRAPH_DIAGRAM_DIR / "healthcare_rag_graph.mmd"
+        out_path.write_text(mermaid_str, encoding="utf-8")
+        print(f"[RAG] Mermaid diagram saved to: {out_path}")
+    except Exception as e:
+        print(f"[RAG] Could not save Mermaid diagram: {e}")
+
+
+# ------------------------
+#   REPLAY (bulk conversations -> JSONL report)
+# ------------------------
+def replay(path: Path, report: Path, concurrency: int, offline: bool) -> None:
+    """
+    Run every conversation in `path` through the graph, `concurrency` at a
+    time, and write one JSONL record per turn to `report`.
+    With `offline`, the LLM and embeddings are local stand-ins (no API calls).
+    """
+    from checkpoint import BoundedMemorySaver
+    from replay import (
+        OfflineChatModel, load_conversations, offline_embeddings, offline_retriever,
+        run_conversations, summarize, write_report,
+    )
+
+    if offline:
+        embeddings = offline_embeddings()
+        retriever = offline_retriever(embeddings)
+        llm = OfflineChatModel()
+        response_cache = get_response_cache(embeddings)
+    else:
+        retriever = get_retriever(get_or_create_vectorstore())
+        llm = get_llm()
+        response_cache = None
+
+    conversations = load_conversations(path)
+    print(f"[RAG] Replaying {len(conversations)} conversations ({concurrency} at a time, offline={offline})")
+
+    # Replays never touch the real thread checkpoints or appointment book
+    with tempfile.TemporaryDirectory() as tmp:
+        schedule = SlotSchedule(Path(tmp) / "slots.sqlite")
+        app = build_graph(
+            retriever, llm,
+            checkpointer=BoundedMemorySaver(),
+            response_cache=response_cache,
+            schedule=schedule,
+        )
+        started = time.perf_counter()
+        records = asyncio.run(run_conversations(app, conversations, concurrency))
+        summary = summarize(records, time.perf_counter() - started)
+        schedule.close()
+
+    write_report(records, report)
+    print(f"[RAG] Replay report written to: {report}")
+    print(json.dumps(summary, indent=2))
+
+
+# ------------------------
+#   SIMPLE CLI (Q/A)
+# ------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Medical RAG agent: interactive chat or bulk replay.")
+    parser.add_argument("--replay", type=Path, help="JSONL of conversations (or a Patient/Assistant transcript)")
+    parser.add_argument("--report", type=Path, help="Where to write the per-turn JSONL report")
+    parser.add_argument("--concurrency", type=int, default=8, help="Conversations replayed at once")
+    parser.add_argument("--offline", action="store_true", help="Use local LLM/embedding stand-ins")
+    args = parser.parse_args()
+
+    if args.replay:
+        report = args.report or REPORTS_DIR / f"replay-{time.strftime('%Y%m%d-%H%M%S')}.jsonl"
+        replay(args.replay, report, args.concurrency, args.offline)
+        return
+
+    vectordb = get_or_create_vectorstore()
+    retriever = get_retriever(vectordb)
+    llm = get_llm()
+
+    app = build_graph(retriever, llm)
+
+    print("\n=== Medical RAG Agent (Reducer Version) ===\n")
+
+    config = {"configurable": {"thread_id": "cli-session-001"}}
+
+    while True:
+        user_q = input("You: ").strip()
+        if user_q.lower() in {"exit", "quit"}:
+            print("Assistant: Goodbye!")
+            break
+
+        # Nodes are async -> drive the graph through ainvoke
+        result = asyncio.run(app.ainvoke(
+            {"messages": [HumanMessage(content=user_q)]},
+            config=config,
+        ))
+
+        final_message = result["messages"][-1]
+        print(f"Assistant: {final_message.content}\n")
+
+
+if __name__ == "__main__":
+    main()
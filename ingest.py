@@ -0,0 +1,331 @@
+# ingest.py  (incremental vector store sync for Data/)
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterator, List, Tuple
+
+from langchain_community.document_loaders import PyPDFLoader
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+
+from bm25 import BM25Index
+from graph import (
+    DEFAULT_CLINIC,
+    VECTOR_BACKEND,
+    chunk_documents,
+    get_embeddings,
+    open_vectorstore,
+    vectorstore_exists,
+)
+from scheduler import BULK, call_lane
+from tenants import Tenant, load_tenants
+
+
+# ------------------------
+#   CONFIG
+# ------------------------
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(os.cpu_count() or 1)))  # PDF parsing processes
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))      # texts per embedding request
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "4"))     # embedding requests in flight
+WRITE_BATCH_SIZE = 1000                                          # rows per vector store upsert
+
+
+# ------------------------
+#   MANIFEST
+# ------------------------
+
+# One entry per PDF in the clinic's manifest.json: {"sha256": <file hash>, "chunks": [<chunk id>, ...]}
+
+def load_manifest(path: Path) -> Dict[str, dict]:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_manifest(manifest: Dict[str, dict], path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(json.dumps(manifest, indent=2, sort_keys=True), encoding="utf-8")
+    tmp_path.replace(path)
+
+
+# ------------------------
+#   HASHING
+# ------------------------
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(chunk: Document) -> str:
+    """
+    Content-addressed id: an unchanged chunk keeps its id (and its embedding)
+    across syncs, an edited one gets a new id.
+    """
+    meta = chunk.metadata or {}
+    key = f"{meta.get('source', '')}|{meta.get('page', '')}|{chunk.page_content}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+# ------------------------
+#   PARSING (process pool)
+# ------------------------
+
+def iter_pdf_chunks(path: Path) -> Iterator[Document]:
+    """
+    Stream chunks page by page instead of holding the whole PDF's text.
+    """
+    for page in PyPDFLoader(str(path)).lazy_load():
+        yield from chunk_documents([page])
+
+
+def load_pdf_chunks(path: Path) -> Dict[str, Document]:
+    """
+    Parse + chunk a single PDF, keyed by chunk id (duplicates collapse).
+    Top-level so it can run in a worker process.
+    """
+    return {chunk_id(c): c for c in iter_pdf_chunks(path)}
+
+
+def iter_parsed(paths: List[Path], workers: int) -> Iterator[Tuple[Path, Dict[str, Document]]]:
+    """
+    Yield (path, chunks) as each PDF finishes parsing, so only a few files'
+    chunks are in memory at any time: at most `workers * 2` files are
+    submitted or waiting to be taken, and the next is submitted only as
+    one is handed over.
+    """
+    if workers <= 1 or len(paths) <= 1:
+        for path in paths:
+            yield path, load_pdf_chunks(path)
+        return
+
+    pending = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = {pool.submit(load_pdf_chunks, path): path for path in islice(pending, workers * 2)}
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            while done:
+                # Popped from both sets, so a file's chunks are dropped once the consumer is done with them
+                future = done.pop()
+                path, chunks = in_flight.pop(future), future.result()
+                del future
+                yield path, chunks
+                # Refill only once the consumer has taken this file
+                for path in islice(pending, 1):
+                    in_flight[pool.submit(load_pdf_chunks, path)] = path
+
+
+# ------------------------
+#   EMBEDDING + WRITES (thread pool)
+# ------------------------
+
+def embed_batch(embeddings, texts: List[str]) -> List[List[float]]:
+    # Rate limits and retries are handled by the shared scheduler;
+    # re-indexing queues behind live chat traffic
+    with call_lane(BULK):
+        return embeddings.embed_documents(texts)
+
+
+def write_batch(vectordb, ids: List[str], docs: List[Document], vectors: List[List[float]]) -> None:
+    # Vectors are computed here, so write straight to the store
+    # instead of letting add_documents() embed again
+    if not isinstance(vectordb, Chroma):
+        vectordb.upsert_vectors(ids, docs, vectors)
+        return
+    for start in range(0, len(ids), WRITE_BATCH_SIZE):
+        end = start + WRITE_BATCH_SIZE
+        vectordb._collection.upsert(
+            ids=ids[start:end],
+            embeddings=vectors[start:end],
+            documents=[d.page_content for d in docs[start:end]],
+            metadatas=[d.metadata or {} for d in docs[start:end]],
+        )
+
+
+def submit_embeddings(embeddings, embed_pool: ThreadPoolExecutor,
+                      chunks: Dict[str, Document], ids: List[str]) -> List[Tuple[List[str], Future]]:
+    """
+    Queue `ids` for embedding in batches of EMBED_BATCH_SIZE; the pool keeps
+    at most EMBED_CONCURRENCY requests in flight. Returns (batch, future) pairs.
+    """
+    batches = [ids[i:i + EMBED_BATCH_SIZE] for i in range(0, len(ids), EMBED_BATCH_SIZE)]
+    return [
+        (batch, embed_pool.submit(embed_batch, embeddings, [chunks[cid].page_content for cid in batch]))
+        for batch in batches
+    ]
+
+
+# ------------------------
+#   LEXICAL INDEX
+# ------------------------
+
+def build_bm25_index(vectordb, bm25_dir: Path) -> None:
+    """
+    Rebuild the BM25 index from everything currently in the vector store.
+    Purely local, so a full rebuild is cheap compared to embedding.
+    """
+    stored = vectordb.get(include=["documents", "metadatas"])
+    docs = [
+        Document(page_content=text, metadata=meta or {})
+        for text, meta in zip(stored["documents"], stored["metadatas"])
+    ]
+    BM25Index.build(docs).save(bm25_dir)
+    print(f"[RAG] BM25 index: {len(docs)} chunks at {bm25_dir}")
+
+
+# ------------------------
+#   SYNC
+# ------------------------
+
+def sync_vectorstore(rebuild: bool = False, workers: int = INGEST_WORKERS, clinic: Tenant = DEFAULT_CLINIC):
+    """
+    Bring the clinic's vector store in line with its Data/: embed only new
+    or changed chunks, delete chunks of edited or removed PDFs.
+    """
+    data_dir, vectorstore_dir, manifest_path = clinic.data_dir, clinic.vectorstore_dir, clinic.manifest_path
+    if not data_dir.exists():
+        raise FileNotFoundError(f"Data directory not found: {data_dir}")
+
+    manifest = load_manifest(manifest_path)
+
+    # A store built before the manifest existed has no chunk ids to diff against
+    if not manifest and vectorstore_dir.exists() and any(vectorstore_dir.iterdir()):
+        rebuild = True
+    # ...and one written for the other VECTOR_BACKEND has nothing in this one
+    if manifest and not vectorstore_exists(clinic):
+        rebuild = True
+
+    if rebuild and vectorstore_dir.exists():
+        print(f"[RAG] Rebuilding vector store from scratch: {vectorstore_dir}")
+        manifest = {}
+        # The quantized store builds the new copy as its next version and switches
+        # CURRENT when it's done, so running workers answer from the old one meanwhile.
+        # Chroma has no versions and is rebuilt in place.
+        if VECTOR_BACKEND != "quantized":
+            shutil.rmtree(vectorstore_dir)
+
+    vectorstore_dir.mkdir(parents=True, exist_ok=True)
+    vectordb = open_vectorstore(clinic, fresh=rebuild)
+    embeddings = get_embeddings()
+    # A buffering store (quantized) writes nothing until persist(), so the manifest
+    # may only record files once that succeeds; otherwise a crash would mark
+    # unwritten chunks as synced and later runs would skip them for good.
+    buffered = getattr(vectordb, "buffers_writes", False)
+
+    pdf_paths = {p.name: p for p in sorted(data_dir.glob("*.pdf"))}
+    added = removed = 0
+    started = time.perf_counter()
+
+    # Files that disappeared from Data/
+    for name in sorted(set(manifest) - set(pdf_paths)):
+        stale_ids = manifest.pop(name)["chunks"]
+        if stale_ids:
+            vectordb.delete(ids=stale_ids)
+        removed += len(stale_ids)
+        print(f"[RAG] Removed {name} ({len(stale_ids)} chunks)")
+        if not buffered:
+            save_manifest(manifest, manifest_path)
+
+    # Only files whose bytes changed get parsed at all
+    hashes = {name: file_sha256(path) for name, path in pdf_paths.items()}
+    changed = [
+        path for name, path in pdf_paths.items()
+        if manifest.get(name, {}).get("sha256") != hashes[name]
+    ]
+    print(f"[RAG] {len(changed)} of {len(pdf_paths)} PDFs changed; parsing with {workers} workers")
+
+    # Files whose embeddings are still in flight, oldest first. The next PDF
+    # parses meanwhile; each file is written and recorded once its batches are back.
+    in_flight = deque()
+    done = 0
+
+    def finish(job) -> None:
+        nonlocal added, removed, done
+        name, chunks, batches, stale_ids = job
+        for batch, future in batches:
+            write_batch(vectordb, batch, [chunks[cid] for cid in batch], future.result())
+        if stale_ids:
+            vectordb.delete(ids=stale_ids)
+
+        done += 1
+        added += sum(len(batch) for batch, _ in batches)
+        removed += len(stale_ids)
+        rate = added / max(time.perf_counter() - started, 1e-9)
+        print(
+            f"[RAG] [{done}/{len(changed)}] Synced {name}: "
+            f"+{sum(len(batch) for batch, _ in batches)} / -{len(stale_ids)} chunks ({rate:.1f} chunks/s)"
+        )
+
+        manifest[name] = {"sha256": hashes[name], "chunks": sorted(chunks)}
+        if not buffered:
+            save_manifest(manifest, manifest_path)
+
+    with ThreadPoolExecutor(max_workers=EMBED_CONCURRENCY, thread_name_prefix="embed") as embed_pool:
+        for path, chunks in iter_parsed(changed, workers):
+            entry = manifest.get(path.name)
+            old_ids = set(entry["chunks"]) if entry else set()
+
+            new_ids = [cid for cid in chunks if cid not in old_ids]
+            stale_ids = sorted(old_ids - set(chunks))
+            in_flight.append((path.name, chunks, submit_embeddings(embeddings, embed_pool, chunks, new_ids), stale_ids))
+
+            # At most two rounds of batches queued, so parsed chunks don't pile up in memory
+            while len(in_flight) > 1 and sum(len(job[2]) for job in in_flight) > 2 * EMBED_CONCURRENCY:
+                finish(in_flight.popleft())
+        while in_flight:
+            finish(in_flight.popleft())
+
+    # Persist first: the BM25 rebuild reads back what the store holds
+    vectordb.persist()
+    save_manifest(manifest, manifest_path)
+    if added or removed or not BM25Index.exists(clinic.bm25_dir):
+        build_bm25_index(vectordb, clinic.bm25_dir)
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"[RAG] Sync done in {elapsed:.1f}s: {added} chunks embedded, {removed} removed, "
+        f"{len(pdf_paths) - len(changed)} unchanged files skipped"
+    )
+    if hasattr(embeddings, "stats"):
+        print(f"[RAG] Embedding cache: {embeddings.stats()}")
+    return vectordb
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync the Data/ PDFs into the vector store.")
+    parser.add_argument("--rebuild", action="store_true", help="drop the store and re-embed everything")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS, help="PDF parsing processes")
+    parser.add_argument("--clinic", help="clinic id from tenants.json (default: the single-clinic Data/)")
+    parser.add_argument("--all-clinics", action="store_true", help="sync every clinic in tenants.json")
+    args = parser.parse_args()
+
+    clinics = load_tenants(DEFAULT_CLINIC)
+    if args.all_clinics:
+        selected = list(clinics.values())
+    elif args.clinic:
+        if args.clinic not in clinics:
+            raise SystemExit(f"Unknown clinic {args.clinic!r}; known: {', '.join(clinics)}")
+        selected = [clinics[args.clinic]]
+    else:
+        selected = [DEFAULT_CLINIC]
+
+    for clinic in selected:
+        print(f"[RAG] Syncing clinic {clinic.id!r} ({clinic.name}) from {clinic.data_dir}")
+        sync_vectorstore(rebuild=args.rebuild, workers=args.workers, clinic=clinic)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,107 +1,362 @@
-# main.py (FastAPI Server)
-
-from fastapi import FastAPI
-from pydantic import BaseModel
-from fastapi.middleware.cors import CORSMiddleware
-
-from langchain_core.messages import HumanMessage, SystemMessage
-
-from graph import (
-    get_or_create_vectorstore,
-    get_llm,
-    build_graph,
-    system_prompt
-)
-
-# ---------------------------------------------------
-# FastAPI Setup
-# ---------------------------------------------------
-
-app = FastAPI(title="Clinic Self-RAG Assistant")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-
-class ChatRequest(BaseModel):
-    question: str
-    thread_id: str = "default-session"
-
-
-class ChatResponse(BaseModel):
-    answer: str
-    sources: list[str]
-
-
-# ---------------------------------------------------
-# Load LLM + Vectorstore + App
-# ---------------------------------------------------
-
-vectordb = get_or_create_vectorstore()
-retriever = vectordb.as_retriever(search_kwargs={"k": 4})
-
-llm = get_llm()
-
-# Build LangGraph RAG Agent
-app_graph = build_graph(retriever, llm)
-
-# System prompt message
-SYSTEM = SystemMessage(content=system_prompt())
-
-
-# ---------------------------------------------------
-# Helpers
-# ---------------------------------------------------
-
-def extract_sources(docs):
-    sources = []
-    for d in docs:
-        meta = d.metadata or {}
-        filename = meta.get("source", "unknown")
-        page = meta.get("page", "?")
-        sources.append(f"{filename} (page {page})")
-    return sources
-
-
-# ---------------------------------------------------
-# API Routes
-# ---------------------------------------------------
-
-@app.get("/")
-def root():
-    return {"message": "Clinic Self-RAG Assistant is running. POST /chat"}
-
-
-@app.post("/chat", response_model=ChatResponse)
-async def chat(req: ChatRequest):
-    question = req.question
-    thread_id = req.thread_id
-
-    # LangGraph config -> thread-level memory
-    config = {"configurable": {"thread_id": thread_id}}
-
-    # Call LangGraph pipeline
-    result = app_graph.invoke(
-        {"messages": [SYSTEM, HumanMessage(content=question)]},
-        config=config
-    )
-
-    # Final bot message
-    bot_msg = result["messages"][-1].content
-
-    # Extract RAG context (PDF chunks)
-    rag_docs = []
-    for msg in result["messages"]:
-        if msg.content.startswith("[RAG CONTEXT START]"):
-            # nothing to store, but signal rag was used
-            pass
-
-    # Vectorstore retriever output for sources
-    docs = retriever.invoke(question)
-    sources = extract_sources(docs)
-
-    return ChatResponse(answer=bot_msg, sources=sources)
+# main.py (FastAPI Server)
+
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from fastapi.middleware.cors import CORSMiddleware
+
+from metrics import REQUEST_SECONDS, render as render_metrics, request_timings, server_timing_header
+
+# langchain / chromadb / langgraph are imported by the warm-up task, not here,
+# so uvicorn binds its port (and answers health checks) immediately.
+
+# 1 = start warm-up when the server starts, 0 = on the first chat request
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
+# How long a chat request waits for warm-up before getting a 503
+READY_TIMEOUT_SECONDS = float(os.getenv("READY_TIMEOUT_SECONDS", "30"))
+# /chat/batch limits
+BATCH_MAX_CONVERSATIONS = int(os.getenv("BATCH_MAX_CONVERSATIONS", "200"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+# 1 = add a Server-Timing header (per-node ms) to every response;
+# otherwise only to requests that send "X-Timing: 1"
+TIMING_HEADER = os.getenv("TIMING_HEADER", "0") == "1"
+
+
+# ---------------------------------------------------
+# Lazy Components (LLM + Vectorstore + Graph)
+# ---------------------------------------------------
+
+class Components:
+    clinics = None      # tenants.TenantRegistry: per-clinic graphs, loaded on demand
+    warmup_task = None
+    error = None
+    timings = {}
+
+
+def load_registry():
+    """
+    Heavy imports + the clinic registry. Runs in a worker thread.
+    """
+    from graph import DEFAULT_CLINIC, load_clinic
+    from tenants import TenantRegistry, load_tenants
+
+    return TenantRegistry(load_tenants(DEFAULT_CLINIC), load_clinic)
+
+
+async def warm_up() -> None:
+    try:
+        started = time.perf_counter()
+        clinics = await asyncio.to_thread(load_registry)
+        imported = time.perf_counter()
+
+        # The default clinic (vector store + LLM + graph) now, the others on first request
+        await clinics.get(None)
+        finished = time.perf_counter()
+
+        Components.timings = {
+            "import_seconds": round(imported - started, 3),
+            "init_seconds": round(finished - imported, 3),
+            "total_seconds": round(finished - started, 3),
+        }
+        Components.clinics = clinics
+        print(f"[RAG] Backend ready: {Components.timings}")
+    except Exception as e:
+        Components.error = e
+        print(f"[RAG] Warm-up failed: {e}")
+        raise
+
+
+def start_warm_up() -> asyncio.Task:
+    if Components.warmup_task is None or Components.error is not None:
+        Components.error = None
+        Components.warmup_task = asyncio.create_task(warm_up())
+    return Components.warmup_task
+
+
+async def get_clinics():
+    """
+    Wait (bounded) for warm-up; 503 while the backend is still starting.
+    """
+    if Components.clinics is not None:
+        return Components.clinics
+
+    task = start_warm_up()
+    try:
+        await asyncio.wait_for(asyncio.shield(task), READY_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Assistant is starting up", headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Assistant failed to start: {e}")
+    return Components.clinics
+
+
+async def open_clinic(clinic_id):
+    """
+    The clinic's registry entry, loaded; 404 for unknown clinics and 503
+    while one is still loading.
+    """
+    from tenants import UnknownTenant
+
+    clinics = await get_clinics()
+    try:
+        clinic = clinics.tenant(clinic_id)
+    except UnknownTenant:
+        raise HTTPException(status_code=404, detail=f"Unknown clinic: {clinic_id}")
+    try:
+        await asyncio.wait_for(clinics.get(clinic.id), READY_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=503, detail="Clinic is loading", headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Clinic failed to load: {e}")
+    return clinics, clinic
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ON_STARTUP:
+        start_warm_up()
+    yield
+    if Components.clinics is not None:
+        Components.clinics.close()
+
+
+# ---------------------------------------------------
+# FastAPI Setup
+# ---------------------------------------------------
+
+app = FastAPI(title="Clinic Self-RAG Assistant", lifespan=lifespan)
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["Server-Timing"],
+)
+
+
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """
+    Collect node timings for this request and record its wall time.
+    Streaming responses are timed up to their first byte.
+    """
+    timings = []
+    token = request_timings.set(timings)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        request_timings.reset(token)
+    elapsed = time.perf_counter() - started
+
+    # Route template, not the raw path, so unknown URLs don't add series
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(elapsed, path=getattr(route, "path", "unmatched"))
+
+    if TIMING_HEADER or request.headers.get("x-timing") == "1":
+        response.headers["Server-Timing"] = server_timing_header(timings + [("total", elapsed)])
+    return response
+
+
+class ChatRequest(BaseModel):
+    question: str
+    thread_id: str = "default-session"
+    clinic_id: str | None = None    # tenants.json id; None = DEFAULT_TENANT
+
+
+class BookingSummary(BaseModel):
+    # booking.BookingSummary: display-ready, rendered by the chat UI as is
+    status: str                     # "pending" (awaiting confirmation) | "confirmed"
+    name: str
+    email: str
+    phone: str
+    date_of_birth: str
+    reason: str
+    date: str
+    time: str
+    notes: str
+    provider: str | None = None
+    booking_id: str | None = None
+
+
+class ChatResponse(BaseModel):
+    answer: str
+    sources: list[str]
+    booking: BookingSummary | None = None   # set when the reply shows the appointment details
+    emergency: bool = False                 # the triage emergency reply
+
+
+class BatchConversation(BaseModel):
+    id: str | None = None
+    turns: list[str]
+
+
+class BatchRequest(BaseModel):
+    conversations: list[BatchConversation]
+    concurrency: int = 4
+    clinic_id: str | None = None
+
+
+class BatchResponse(BaseModel):
+    summary: dict
+    turns: list[dict]
+
+
+# ---------------------------------------------------
+# Helpers
+# ---------------------------------------------------
+
+def sse_event(payload: dict) -> str:
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def response_parts(state: dict) -> dict:
+    """
+    ChatResponse fields from the graph's final state, shared by /chat and
+    the stream's done event.
+    """
+    from triage import EMERGENCY
+
+    messages = state.get("messages", [])
+    return {
+        "answer": messages[-1].content if messages else "",
+        # Sources come from the graph's own retrieval -> one vector search per turn
+        "sources": state.get("sources", []),
+        "booking": state.get("booking_summary"),
+        "emergency": state.get("route") == EMERGENCY,
+    }
+
+
+# ---------------------------------------------------
+# API Routes
+# ---------------------------------------------------
+
+@app.get("/")
+def root():
+    return {"message": "Clinic Self-RAG Assistant is running. POST /chat"}
+
+
+@app.get("/healthz")
+def healthz():
+    # Liveness: the process is up and serving, regardless of warm-up
+    return {"status": "alive"}
+
+
+@app.get("/metrics")
+def metrics():
+    # Prometheus text format: node latency, tokens, chunk counts, context size
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/readyz")
+def readyz():
+    # Readiness: the default clinic's vector store, LLM and graph are loaded
+    if Components.clinics is not None:
+        return {"status": "ready", "startup": Components.timings, "clinics": Components.clinics.stats()}
+    if Components.error is not None:
+        return JSONResponse({"status": "failed", "error": str(Components.error)}, status_code=503)
+    status = "warming_up" if Components.warmup_task is not None else "idle"
+    return JSONResponse({"status": status}, status_code=503)
+
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(req: ChatRequest):
+    from langchain_core.messages import HumanMessage
+
+    clinics, clinic = await open_clinic(req.clinic_id)
+    question = req.question
+
+    # LangGraph config -> thread-level memory (per clinic)
+    config = {"configurable": {"thread_id": clinic.thread_key(req.thread_id)}}
+
+    # Call LangGraph pipeline
+    async with clinics.use(clinic.id) as app_graph:
+        result = await app_graph.ainvoke(
+            # The generate node adds the system prompt; only the question is persisted
+            {"messages": [HumanMessage(content=question)]},
+            config=config
+        )
+
+    return ChatResponse(**response_parts(result))
+
+
+@app.post("/chat/batch", response_model=BatchResponse)
+async def chat_batch(req: BatchRequest):
+    """
+    Replay many conversations through the live graph, a bounded number at a
+    time, and report per-turn latency, token counts and sources.
+    Each conversation runs on its own fresh thread in the clinic's namespace,
+    removed from the checkpointer once the conversation is done.
+    """
+    from replay import run_conversations, summarize
+    from scheduler import BULK, call_lane
+
+    if len(req.conversations) > BATCH_MAX_CONVERSATIONS:
+        raise HTTPException(status_code=413, detail=f"At most {BATCH_MAX_CONVERSATIONS} conversations per batch")
+
+    clinics, clinic = await open_clinic(req.clinic_id)
+    conversations = [
+        {"id": c.id or str(n), "turns": c.turns}
+        for n, c in enumerate(req.conversations)
+    ]
+    concurrency = max(1, min(req.concurrency, BATCH_MAX_CONCURRENCY))
+
+    started = time.perf_counter()
+    # Batch turns queue behind live chat for OpenAI capacity
+    with call_lane(BULK):
+        async with clinics.use(clinic.id) as app_graph:
+            records = await run_conversations(app_graph, conversations, concurrency, clinic.thread_key)
+    return BatchResponse(summary=summarize(records, time.perf_counter() - started), turns=records)
+
+
+@app.post("/chat/stream")
+async def chat_stream(req: ChatRequest):
+    """
+    Same pipeline as /chat, but streams generate-node tokens as Server-Sent Events.
+
+    Events: {"token": "..."} per chunk, then {"done": true, ...ChatResponse fields}.
+    """
+    from langchain_core.messages import AIMessageChunk, HumanMessage
+
+    clinics, clinic = await open_clinic(req.clinic_id)
+    config = {"configurable": {"thread_id": clinic.thread_key(req.thread_id)}}
+    inputs = {"messages": [HumanMessage(content=req.question)]}
+
+    async def event_stream():
+        final_state = {}
+        try:
+            # Held until the stream ends, so an LRU eviction can't close the clinic mid-answer
+            async with clinics.use(clinic.id) as app_graph:
+                async for mode, payload in app_graph.astream(
+                    inputs,
+                    config=config,
+                    stream_mode=["messages", "values"],
+                ):
+                    if mode == "values":
+                        final_state = payload
+                        continue
+
+                    chunk, meta = payload
+                    if meta.get("langgraph_node") != "generate":
+                        continue
+                    if isinstance(chunk, AIMessageChunk) and chunk.content:
+                        yield sse_event({"token": chunk.content})
+
+        except Exception as e:
+            yield sse_event({"error": str(e)})
+            return
+
+        yield sse_event({"done": True, **response_parts(final_state)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
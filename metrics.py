@@ -0,0 +1,232 @@
+# metrics.py  (in-process Prometheus-style metrics + per-request node timings)
+
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+# 0 disables all recording (the /metrics endpoint then stays empty)
+METRICS_ENABLED = os.getenv("METRICS", "1") == "1"
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64)
+BYTES_BUCKETS = (256, 1024, 2048, 4096, 8192, 16384, 32768, 65536)
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with optional labels, rendered in the
+    Prometheus text exposition format.
+    """
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets)
+        self.labelnames = tuple(labelnames)
+        # label values -> [bucket counts..., +Inf count], sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = [(key, list(counts), total[0]) for key, (counts, total) in self._series.items()]
+        for key, counts, total in sorted(series):
+            base = [f'{n}="{v}"' for n, v in zip(self.labelnames, key)]
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = ",".join(base + [f'le="{le}"'])
+                lines.append(f"{self.name}_bucket{{{labels}}} {cumulative}")
+            label_str = "{" + ",".join(base) + "}" if base else ""
+            lines.append(f"{self.name}_sum{label_str} {total}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+
+class Counter:
+    """
+    Monotonic counter with optional labels.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            labels = ",".join(f'{n}="{v}"' for n, v in zip(self.labelnames, key))
+            lines.append(f"{self.name}{{{labels}}} {value}" if labels else f"{self.name} {value}")
+        return lines
+
+
+class Gauge:
+    """
+    Value that goes up and down, with optional labels.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        if not METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            labels = ",".join(f'{n}="{v}"' for n, v in zip(self.labelnames, key))
+            lines.append(f"{self.name}{{{labels}}} {value}" if labels else f"{self.name} {value}")
+        return lines
+
+
+REGISTRY: list = []
+
+
+def histogram(name: str, help_text: str, buckets: Sequence[float], labelnames: Sequence[str] = ()) -> Histogram:
+    metric = Histogram(name, help_text, buckets, labelnames)
+    REGISTRY.append(metric)
+    return metric
+
+
+def counter(name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+    metric = Counter(name, help_text, labelnames)
+    REGISTRY.append(metric)
+    return metric
+
+
+def gauge(name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+    metric = Gauge(name, help_text, labelnames)
+    REGISTRY.append(metric)
+    return metric
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+# ------------------------
+#   PIPELINE METRICS
+# ------------------------
+
+NODE_SECONDS = histogram("rag_node_seconds", "Wall time per graph node", SECONDS_BUCKETS, ["node"])
+EMBEDDING_SECONDS = histogram(
+    "rag_embedding_seconds", "Embedding API calls (cache misses only)", SECONDS_BUCKETS, ["kind"]
+)
+SEARCH_SECONDS = histogram("rag_search_seconds", "Hybrid retriever search time", SECONDS_BUCKETS, ["kind"])
+PROMPT_TOKENS = histogram("rag_prompt_tokens", "Prompt tokens per LLM call", TOKEN_BUCKETS, ["node"])
+COMPLETION_TOKENS = histogram("rag_completion_tokens", "Completion tokens per LLM call", TOKEN_BUCKETS, ["node"])
+CACHED_PROMPT_TOKENS = histogram(
+    "rag_cached_prompt_tokens", "Prompt tokens served from the provider's prefix cache", (0,) + TOKEN_BUCKETS
+)
+PREFIX_RATIO = histogram(
+    "rag_prompt_prefix_ratio", "Share of prompt tokens in the stable (cacheable) prefix",
+    (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0),
+)
+RETRIEVED_CHUNKS = histogram("rag_retrieved_chunks", "Chunks per turn at each stage", COUNT_BUCKETS, ["stage"])
+CONTEXT_BYTES = histogram("rag_context_bytes", "RAG context size in the prompt (UTF-8 bytes)", BYTES_BUCKETS)
+RETRIEVAL_GATE = counter(
+    "rag_retrieval_gate_total", "Per-turn retrieval decisions (retrieve, condensed, skip)", ["decision"]
+)
+OPENAI_QUEUE_DEPTH = gauge("rag_openai_queue_depth", "OpenAI calls waiting in the scheduler", ["lane"])
+OPENAI_QUEUE_SECONDS = histogram(
+    "rag_openai_queue_seconds", "Time OpenAI calls waited for a slot and rate budget", SECONDS_BUCKETS, ["lane"]
+)
+OPENAI_INFLIGHT = gauge("rag_openai_inflight", "OpenAI calls in flight")
+OPENAI_RETRIES = counter("rag_openai_retries_total", "OpenAI calls retried, by error", ["kind", "reason"])
+REQUEST_SECONDS = histogram("rag_http_request_seconds", "HTTP request wall time", SECONDS_BUCKETS, ["path"])
+
+
+# ------------------------
+#   PER-REQUEST TIMINGS
+# ------------------------
+
+# Set per request by main.py; nodes append (name, seconds) to it
+request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+def record_node(name: str, seconds: float) -> None:
+    NODE_SECONDS.observe(seconds, node=name)
+    timings = request_timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+def timed_node(name: str, node):
+    """
+    Wrap an async graph node so its wall time is recorded under `name`.
+    """
+    @wraps(node)
+    async def wrapper(state):
+        started = time.perf_counter()
+        try:
+            return await node(state)
+        finally:
+            record_node(name, time.perf_counter() - started)
+    return wrapper
+
+
+@contextmanager
+def timed(metric: Histogram, **labels):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metric.observe(time.perf_counter() - started, **labels)
+
+
+def server_timing_header(timings: Sequence[Tuple[str, float]]) -> str:
+    # Server-Timing wants milliseconds; repeated nodes are summed
+    totals: Dict[str, float] = {}
+    for name, seconds in timings:
+        totals[name] = totals.get(name, 0.0) + seconds
+    return ", ".join(f"{name};dur={seconds * 1000:.1f}" for name, seconds in totals.items())
@@ -0,0 +1,374 @@
+# quantized_store.py  (memory-mapped, quantized NumPy vector store — alternative to Chroma)
+
+import json
+import mmap
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+
+# Rows converted + scored per matrix product: small enough to stay in cache
+SCORE_BLOCK_ROWS = 1024
+# Rows copied per step when persist() writes a new version
+COPY_BLOCK_ROWS = 16384
+
+
+def truncate(vectors: np.ndarray, dim: int) -> np.ndarray:
+    """
+    Matryoshka truncation: keep the first `dim` components and re-normalize,
+    so dot products are cosine similarities again.
+    """
+    cut = np.asarray(vectors, dtype=np.float32)[..., :dim]
+    norms = np.linalg.norm(cut, axis=-1, keepdims=True)
+    return cut / np.maximum(norms, 1e-12)
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    int8: symmetric per-row scale (row ≈ codes * scale). float16: plain cast.
+    """
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    if dtype == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales = np.maximum(scales, 1e-12).astype(np.float32)
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales
+    raise ValueError(f"Unknown quantization dtype: {dtype!r}")
+
+
+class _Version:
+    """
+    One published version, mapped read-only. A search holds on to the
+    version it started with, so a reload never changes arrays under it.
+    """
+
+    def __init__(self, path: Optional[Path] = None, dim: int = 0, dtype: str = "int8", rescore: bool = False):
+        self.path = path
+        self.ids: List[str] = []
+        self.full_dim: Optional[int] = None
+        self.vectors = self.scales = self.full = self.offsets = None
+        self.docs_map = None
+        if path is None:
+            return
+
+        meta = json.loads((path / "meta.json").read_text(encoding="utf-8"))
+        if (meta["dim"], meta["dtype"]) != (dim, dtype):
+            raise ValueError(
+                f"Vector store at {path} is dim={meta['dim']} {meta['dtype']}, but config asks for "
+                f"dim={dim} {dtype}; run `python ingest.py --rebuild`."
+            )
+        self.ids = meta["ids"]
+        self.full_dim = meta.get("full_dim")
+        if not self.ids:
+            return
+
+        # Versions written before meta.json recorded it: full.npy is there iff rescoring was on
+        has_full = meta.get("rescore", (path / "full.npy").exists())
+        if rescore and not has_full:
+            raise ValueError(
+                f"Vector store at {path} was built without rescoring (no full.npy), but config asks "
+                f"for it; run `python ingest.py --rebuild` or set QUANT_RESCORE=0."
+            )
+
+        self.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        if dtype == "int8":
+            self.scales = np.load(path / "scales.npy")
+        if has_full:
+            self.full = np.load(path / "full.npy", mmap_mode="r")
+            if self.full.shape != (len(self.ids), self.full_dim):
+                raise ValueError(
+                    f"Vector store at {path} has full.npy of shape {self.full.shape}, but meta.json says "
+                    f"({len(self.ids)}, {self.full_dim}); run `python ingest.py --rebuild`."
+                )
+        self.offsets = np.load(path / "doc_offsets.npy")
+        with open(path / "docs.jsonl", "rb") as f:
+            self.docs_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        return json.loads(self.docs_map[self.offsets[i]:self.offsets[i + 1]])
+
+    def document(self, i: int) -> Document:
+        row = self.row(i)
+        return Document(page_content=row["text"], metadata=row["metadata"], id=row["id"])
+
+
+class QuantizedVectorStore(VectorStore):
+    """
+    Flat (exact-scan) vector store on memory-mapped NumPy files.
+
+    Each published version lives in `directory/v<N>/`:
+      vectors.npy     (n, dim) int8 or float16, truncated to `dim`
+      scales.npy      (n,) float32 per-row int8 scales
+      full.npy        (n, full_dim) float32, only with rescoring
+      docs.jsonl      one {"id", "text", "metadata"} per row, + doc_offsets.npy
+    and `directory/CURRENT` names the live one. Readers check CURRENT before
+    each search and switch to a newly published version; persist() keeps the
+    previous version on disk so searches still running on it can finish.
+
+    Search scores the compact matrix in blocks, takes the top candidates
+    with argpartition, and (optionally) rescores them against full.npy.
+    Writes (upsert/delete) are buffered until persist(). With `fresh`, the
+    store starts empty and its first persist() replaces the live version
+    wholesale, which is how a rebuild runs next to live readers.
+    """
+
+    # Nothing reaches disk before persist(): callers record progress only after it
+    buffers_writes = True
+
+    def __init__(self, directory: Path, embedding: Embeddings, dim: int = 256,
+                 dtype: str = "int8", rescore: bool = True, rescore_factor: int = 4, fresh: bool = False):
+        self.directory = Path(directory)
+        self.embedding = embedding
+        self.dim = dim
+        self.dtype = dtype
+        self.rescore = rescore
+        self.rescore_factor = rescore_factor
+
+        self._pending: Dict[str, Tuple[Document, np.ndarray]] = {}
+        self._deleted: set = set()
+        self._lock = threading.Lock()
+        self._fresh = fresh
+        self._load()
+
+    # ---- files ----
+
+    @classmethod
+    def exists(cls, directory: Path) -> bool:
+        return (Path(directory) / "CURRENT").exists()
+
+    def _current(self) -> Optional[Path]:
+        pointer = self.directory / "CURRENT"
+        if not pointer.exists():
+            return None
+        return self.directory / pointer.read_text(encoding="utf-8").strip()
+
+    def _pointer_stamp(self) -> Optional[Tuple[int, int]]:
+        # CURRENT is swapped in with a rename, so a new inode means a new version
+        try:
+            st = (self.directory / "CURRENT").stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def _load(self) -> None:
+        self._stamp = self._pointer_stamp()
+        # A fresh store doesn't read the live version (it may not even match the config)
+        self._version = _Version() if self._fresh else _Version(self._current(), self.dim, self.dtype, self.rescore)
+
+    def _live(self) -> _Version:
+        """
+        The version to search: reloaded first if ingest published a new one.
+        """
+        if self._pointer_stamp() != self._stamp:
+            with self._lock:
+                if self._pointer_stamp() != self._stamp:
+                    self._load()
+                    print(f"[RAG] Switched to vector store version: {self._version.path}")
+        return self._version
+
+    @property
+    def ids(self) -> List[str]:
+        return self._version.ids
+
+    # ---- search ----
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self.embedding
+
+    def _scores(self, version: _Version, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(version.ids), dtype=np.float32)
+        scratch = np.empty((SCORE_BLOCK_ROWS, self.dim), dtype=np.float32)
+        for start in range(0, len(version.ids), SCORE_BLOCK_ROWS):
+            block = version.vectors[start:start + SCORE_BLOCK_ROWS]
+            rows = scratch[:len(block)]
+            np.copyto(rows, block)
+            scores[start:start + len(block)] = rows @ query
+        if version.scales is not None:
+            scores *= version.scales
+        return scores
+
+    def search_by_vector(self, vector: List[float], k: int = 4) -> List[Tuple[Document, float]]:
+        version = self._live()
+        if not version.ids:
+            return []
+        full_query = np.asarray(vector, dtype=np.float32)
+        scores = self._scores(version, truncate(full_query, self.dim))
+
+        rescore = self.rescore and version.full is not None
+        n_candidates = min(len(version.ids), k * self.rescore_factor if rescore else k)
+        top = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+
+        if rescore:
+            # Exact cosine on the full-dimension vectors of the candidates only
+            rows = np.sort(top)
+            full_query /= max(np.linalg.norm(full_query), 1e-12)
+            candidates = version.full[rows]
+            exact = candidates @ full_query / np.maximum(np.linalg.norm(candidates, axis=1), 1e-12)
+            order = np.argsort(-exact)[:k]
+            return [(version.document(int(rows[i])), float(exact[i])) for i in order]
+
+        top = top[np.argsort(-scores[top])][:k]
+        return [(version.document(int(i)), float(scores[i])) for i in top]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs: Any) -> List[Tuple[Document, float]]:
+        return self.search_by_vector(self.embedding.embed_query(query), k)
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs: Any) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: (score + 1.0) / 2.0
+
+    # ---- writes (buffered until persist) ----
+
+    def upsert_vectors(self, ids: List[str], docs: List[Document], vectors: List[List[float]]) -> None:
+        with self._lock:
+            for cid, doc, vector in zip(ids, docs, vectors):
+                self._pending[cid] = (doc, np.asarray(vector, dtype=np.float32))
+                self._deleted.discard(cid)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None,
+                  ids: Optional[List[str]] = None, **kwargs: Any) -> List[str]:
+        texts = list(texts)
+        metadatas = metadatas or [{} for _ in texts]
+        ids = ids or [f"{len(self.ids) + len(self._pending) + i}" for i in range(len(texts))]
+        docs = [Document(page_content=t, metadata=m) for t, m in zip(texts, metadatas)]
+        self.upsert_vectors(ids, docs, self.embedding.embed_documents(texts))
+        return ids
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> None:
+        with self._lock:
+            for cid in ids or []:
+                self._pending.pop(cid, None)
+                self._deleted.add(cid)
+
+    def get(self, include: Optional[List[str]] = None) -> Dict[str, list]:
+        """
+        Chroma-style dump of the persisted rows (used to rebuild the BM25 index).
+        """
+        version = self._live()
+        rows = [version.row(i) for i in range(len(version.ids))]
+        return {
+            "ids": [r["id"] for r in rows],
+            "documents": [r["text"] for r in rows],
+            "metadatas": [r["metadata"] for r in rows],
+        }
+
+    def persist(self) -> None:
+        """
+        Write a new version with buffered upserts/deletes applied, then point
+        CURRENT at it. Copies kept rows block by block from the old mapping.
+        """
+        with self._lock:
+            old = self._current()
+            if old is not None and not self._pending and not self._deleted and not self._fresh:
+                return
+
+            base = self._version
+            replaced = self._deleted | set(self._pending)
+            keep = [i for i, cid in enumerate(base.ids) if cid not in replaced]
+            new_ids = [base.ids[i] for i in keep] + list(self._pending)
+            new_docs = [doc for doc, _ in self._pending.values()]
+            new_full = (
+                np.stack([v for _, v in self._pending.values()]) if self._pending else None
+            )
+            full_dim = new_full.shape[1] if new_full is not None else base.full_dim
+            if base.ids and base.full_dim and full_dim != base.full_dim:
+                raise ValueError(
+                    f"Vector store at {base.path} holds {base.full_dim}-dim embeddings, but the new ones "
+                    f"are {full_dim}-dim; run `python ingest.py --rebuild`."
+                )
+
+            version = self.directory / f"v{int(old.name[1:]) + 1 if old else 1}"
+            if version.exists():
+                shutil.rmtree(version)
+            version.mkdir(parents=True)
+            self._write_version(base, version, keep, new_ids, new_docs, new_full, full_dim)
+
+            tmp_pointer = self.directory / "CURRENT.tmp"
+            tmp_pointer.write_text(version.name, encoding="utf-8")
+            tmp_pointer.replace(self.directory / "CURRENT")
+
+            self._pending.clear()
+            self._deleted.clear()
+            self._fresh = False
+            self._load()
+
+        # Keep the previous version for searches still running on it (here or in other
+        # workers); anything older has been unused since that version was published.
+        # Windows can't delete files that are still mapped, hence ignore_errors.
+        for stale in self.directory.glob("v*"):
+            if stale not in (version, old):
+                shutil.rmtree(stale, ignore_errors=True)
+
+    def _write_version(self, base: _Version, version: Path, keep: List[int], new_ids: List[str],
+                       new_docs: List[Document], new_full: Optional[np.ndarray], full_dim: Optional[int]) -> None:
+        n = len(new_ids)
+        n_kept = len(keep)
+        code_dtype = np.int8 if self.dtype == "int8" else np.float16
+
+        if n:
+            vectors = np.lib.format.open_memmap(version / "vectors.npy", mode="w+", dtype=code_dtype,
+                                                shape=(n, self.dim))
+            scales = np.zeros(n, dtype=np.float32)
+            full = None
+            if self.rescore and full_dim:
+                full = np.lib.format.open_memmap(version / "full.npy", mode="w+", dtype=np.float32,
+                                                 shape=(n, full_dim))
+
+            for start in range(0, n_kept, COPY_BLOCK_ROWS):
+                rows = keep[start:start + COPY_BLOCK_ROWS]
+                vectors[start:start + len(rows)] = base.vectors[rows]
+                if base.scales is not None:
+                    scales[start:start + len(rows)] = base.scales[rows]
+                if full is not None:
+                    full[start:start + len(rows)] = base.full[rows]
+
+            if new_full is not None:
+                codes, new_scales = quantize(truncate(new_full, self.dim), self.dtype)
+                vectors[n_kept:] = codes
+                if new_scales is not None:
+                    scales[n_kept:] = new_scales
+                if full is not None:
+                    full[n_kept:] = new_full
+
+            vectors.flush()
+            del vectors
+            if full is not None:
+                full.flush()
+                del full
+            if self.dtype == "int8":
+                np.save(version / "scales.npy", scales)
+
+            offsets = np.zeros(n + 1, dtype=np.int64)
+            with open(version / "docs.jsonl", "wb") as f:
+                for j, i in enumerate(keep):
+                    line = base.docs_map[base.offsets[i]:base.offsets[i + 1]]
+                    f.write(line)
+                    offsets[j + 1] = offsets[j] + len(line)
+                for j, (cid, doc) in enumerate(zip(new_ids[n_kept:], new_docs), start=n_kept):
+                    line = (json.dumps({"id": cid, "text": doc.page_content, "metadata": doc.metadata or {}})
+                            + "\n").encode("utf-8")
+                    f.write(line)
+                    offsets[j + 1] = offsets[j] + len(line)
+            np.save(version / "doc_offsets.npy", offsets)
+
+        meta = {"dim": self.dim, "dtype": self.dtype, "full_dim": full_dim,
+                "rescore": bool(self.rescore and full_dim), "ids": new_ids}
+        (version / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None,
+                   **kwargs: Any) -> "QuantizedVectorStore":
+        store = cls(kwargs.pop("directory"), embedding, **kwargs)
+        store.add_texts(texts, metadatas)
+        store.persist()
+        return store
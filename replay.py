@@ -0,0 +1,228 @@
+# replay.py  (bulk replay of conversations through the graph + JSONL latency report)
+
+import asyncio
+import json
+import os
+import statistics
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+# Simulated API time per call for offline runs (seconds)
+OFFLINE_LLM_LATENCY = float(os.getenv("OFFLINE_LLM_LATENCY", "0.5"))
+OFFLINE_EMBED_LATENCY = float(os.getenv("OFFLINE_EMBED_LATENCY", "0.15"))
+
+
+# ------------------------
+#   OFFLINE STAND-INS
+# ------------------------
+
+class OfflineChatModel(BaseChatModel):
+    """
+    Answers without the network after `latency` seconds, so replays measure
+    the pipeline around the model rather than the OpenAI API.
+    """
+
+    latency: float = OFFLINE_LLM_LATENCY
+
+    @property
+    def _llm_type(self) -> str:
+        return "offline"
+
+    def _reply(self, messages: List[BaseMessage]) -> ChatResult:
+        question = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        text = f"[offline answer] {question[:200]}"
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._reply(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._reply(messages)
+
+
+class OfflineEmbeddings(DeterministicFakeEmbedding):
+    """
+    Deterministic vectors; queries take `latency` seconds like an API round trip.
+    Document embedding (index build) is left instant.
+    """
+
+    latency: float = OFFLINE_EMBED_LATENCY
+
+    def embed_query(self, text: str) -> List[float]:
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+
+def offline_embeddings(size: int = 256) -> OfflineEmbeddings:
+    return OfflineEmbeddings(size=size)
+
+
+def offline_retriever(embeddings):
+    """
+    Hybrid retriever over the chunks in the local BM25 index, with an
+    in-memory dense side built from the stand-in embeddings. No API calls.
+    """
+    from langchain_core.vectorstores import InMemoryVectorStore
+
+    from bm25 import BM25Index, HybridRetriever
+    from graph import BM25_DIR, HYBRID_FETCH_K, RETRIEVER_K
+
+    if not BM25Index.exists(BM25_DIR):
+        raise SystemExit(f"No BM25 index at {BM25_DIR}; run `python ingest.py` once first.")
+    bm25 = BM25Index.load(BM25_DIR)
+    vectorstore = InMemoryVectorStore(embeddings)
+    vectorstore.add_documents(bm25.docs)
+    return HybridRetriever(vectorstore=vectorstore, bm25=bm25, k=RETRIEVER_K, fetch_k=HYBRID_FETCH_K)
+
+
+# ------------------------
+#   INPUT
+# ------------------------
+
+def parse_transcript(text: str) -> List[str]:
+    """
+    Patient turns from a "Patient:" / "Assistant:" transcript such as
+    test_conservation.txt.
+    """
+    turns, current, speaker = [], [], None
+    for line in text.splitlines():
+        label = line.strip().rstrip(":").lower()
+        if line.strip().endswith(":") and label in ("patient", "assistant"):
+            if speaker == "patient" and current:
+                turns.append("\n".join(current).strip())
+            speaker, current = label, []
+        elif speaker == "patient" and line.strip():
+            current.append(line.strip())
+    if speaker == "patient" and current:
+        turns.append("\n".join(current).strip())
+    return turns
+
+
+def load_conversations(path: Path) -> List[Dict[str, Any]]:
+    """
+    JSONL with one conversation per line — {"id": ..., "turns": [...]} or a
+    single {"question": ...} — or a plain-text Patient/Assistant transcript.
+    """
+    path = Path(path)
+    text = path.read_text(encoding="utf-8")
+    if path.suffix != ".jsonl":
+        return [{"id": path.stem, "turns": parse_transcript(text)}]
+
+    conversations = []
+    for n, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        row = json.loads(line)
+        turns = row.get("turns") or [row["question"]]
+        conversations.append({"id": str(row.get("id", row.get("thread_id", n))), "turns": turns})
+    return conversations
+
+
+# ------------------------
+#   RUNNER
+# ------------------------
+
+async def run_conversation(app_graph, conversation: Dict[str, Any], run_id: str,
+                           thread_key: Callable[[str], str] = str) -> List[Dict[str, Any]]:
+    """
+    Send one conversation's turns in order on its own thread; one record per turn.
+    The thread is deleted from the graph's checkpointer afterwards.
+    """
+    thread_id = thread_key(f"replay-{run_id}-{conversation['id']}")
+    config = {"configurable": {"thread_id": thread_id}}
+    try:
+        return await _replay_turns(app_graph, conversation, thread_id, config)
+    finally:
+        if app_graph.checkpointer is not None:
+            await app_graph.checkpointer.adelete_thread(thread_id)
+
+
+async def _replay_turns(app_graph, conversation: Dict[str, Any], thread_id: str,
+                        config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    records = []
+
+    for n, question in enumerate(conversation["turns"]):
+        record = {"conversation": conversation["id"], "turn": n, "thread_id": thread_id, "question": question}
+        started = time.perf_counter()
+        try:
+            result = await app_graph.ainvoke({"messages": [HumanMessage(content=question)]}, config=config)
+        except Exception as e:
+            record.update(latency_ms=round((time.perf_counter() - started) * 1000, 1), error=str(e))
+            records.append(record)
+            break
+
+        answer = result["messages"][-1].content
+        record.update(
+            latency_ms=round((time.perf_counter() - started) * 1000, 1),
+            route=result.get("route"),
+            retrieval_skipped=bool(result.get("retrieval_skipped")) and result.get("route") == "medical",
+            cache_hit=bool(result.get("cache_hit")),
+            prompt_tokens=result.get("prompt_tokens", 0),
+            answer_tokens=count_tokens_approximately([AIMessage(content=answer)]),
+            sources=result.get("sources", []),
+            booking_step=(result.get("booking") or {}).get("step"),
+            answer=answer,
+        )
+        records.append(record)
+    return records
+
+
+async def run_conversations(app_graph, conversations: List[Dict[str, Any]], concurrency: int = 8,
+                            thread_key: Callable[[str], str] = str) -> List[Dict[str, Any]]:
+    """
+    Replay conversations with at most `concurrency` running at once.
+    `thread_key` maps replay thread ids into the caller's namespace
+    (Tenant.thread_key for a clinic's live graph).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    run_id = uuid.uuid4().hex[:8]
+
+    async def bounded(conversation):
+        async with semaphore:
+            return await run_conversation(app_graph, conversation, run_id, thread_key)
+
+    results = await asyncio.gather(*(bounded(c) for c in conversations))
+    return [record for records in results for record in records]
+
+
+def summarize(records: List[Dict[str, Any]], wall_seconds: float) -> Dict[str, Any]:
+    latencies = sorted(r["latency_ms"] for r in records if "error" not in r)
+    rag_turns = [r for r in records if r.get("route") == "medical" and not r.get("cache_hit")]
+
+    def pct(p: float) -> Optional[float]:
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] if latencies else None
+
+    return {
+        "turns": len(records),
+        "errors": sum("error" in r for r in records),
+        "wall_seconds": round(wall_seconds, 3),
+        "turns_per_second": round(len(records) / wall_seconds, 2) if wall_seconds else None,
+        "latency_ms_p50": pct(0.50),
+        "latency_ms_p95": pct(0.95),
+        "latency_ms_mean": round(statistics.fmean(latencies), 1) if latencies else None,
+        # Among turns that reached the RAG path (not triage, booking or cache hits)
+        "retrieval_skipped_share": round(
+            sum(r.get("retrieval_skipped", False) for r in rag_turns) / len(rag_turns), 3
+        ) if rag_turns else None,
+        "prompt_tokens_total": sum(r.get("prompt_tokens", 0) for r in records),
+        "answer_tokens_total": sum(r.get("answer_tokens", 0) for r in records),
+    }
+
+
+def write_report(records: List[Dict[str, Any]], path: Path) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
@@ -0,0 +1,159 @@
+# rerank.py  (candidate reranking + context packing for the retrieve stage)
+
+import os
+import re
+from typing import List, Sequence, Tuple
+
+from langchain_core.documents import Document
+
+
+# "lexical" (default, no extra deps) or "cross-encoder" (sentence-transformers)
+RERANKER = os.getenv("RERANKER", "lexical")
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+
+WORD_RE = re.compile(r"[a-z0-9]+")
+# Joins the packed chunks into the prompt's context text
+CONTEXT_SEPARATOR = "\n\n"
+
+
+def approx_tokens(text: str) -> int:
+    # Same ~4 chars/token heuristic used for the prompt budget
+    return max(1, len(text) // 4)
+
+
+def _words(text: str) -> List[str]:
+    return WORD_RE.findall(text.lower())
+
+
+# ------------------------
+#   RERANKERS
+# ------------------------
+
+class LexicalReranker:
+    """
+    Cheap default: share of query terms present in the chunk, plus a bonus
+    for query bigrams that appear verbatim.
+    """
+
+    def score(self, query: str, docs: Sequence[Document]) -> List[float]:
+        q_words = _words(query)
+        q_terms = set(q_words)
+        q_bigrams = set(zip(q_words, q_words[1:]))
+        if not q_terms:
+            return [0.0] * len(docs)
+
+        scores = []
+        for doc in docs:
+            d_words = _words(doc.page_content)
+            d_terms = set(d_words)
+            coverage = len(q_terms & d_terms) / len(q_terms)
+            phrase = len(q_bigrams & set(zip(d_words, d_words[1:]))) / len(q_bigrams) if q_bigrams else 0.0
+            scores.append(coverage + 0.5 * phrase)
+        return scores
+
+
+class CrossEncoderReranker:
+    """
+    Local cross-encoder on CPU (needs `pip install sentence-transformers`).
+    """
+
+    def __init__(self, model_name: str = RERANKER_MODEL):
+        try:
+            from sentence_transformers import CrossEncoder
+        except ImportError as e:
+            raise ImportError(
+                "RERANKER=cross-encoder needs sentence-transformers: pip install sentence-transformers"
+            ) from e
+        self.model = CrossEncoder(model_name, device="cpu")
+
+    def score(self, query: str, docs: Sequence[Document]) -> List[float]:
+        if not docs:
+            return []
+        return [float(s) for s in self.model.predict([(query, d.page_content) for d in docs])]
+
+
+def get_reranker():
+    if RERANKER == "lexical":
+        return LexicalReranker()
+    if RERANKER == "cross-encoder":
+        return CrossEncoderReranker()
+    raise ValueError(f"Unknown RERANKER: {RERANKER!r}")
+
+
+# ------------------------
+#   DEDUPE + PACKING
+# ------------------------
+
+def _shingles(text: str, n: int = 3) -> set:
+    words = _words(text)
+    return {tuple(words[i:i + n]) for i in range(max(1, len(words) - n + 1))}
+
+
+def drop_near_duplicates(docs: Sequence[Document], threshold: float = 0.8) -> List[Document]:
+    """
+    Keep the first of any group of chunks whose word 3-gram Jaccard >= threshold.
+    """
+    kept, kept_shingles = [], []
+    for doc in docs:
+        shingles = _shingles(doc.page_content)
+        if any(len(shingles & other) / len(shingles | other) >= threshold for other in kept_shingles):
+            continue
+        kept.append(doc)
+        kept_shingles.append(shingles)
+    return kept
+
+
+def strip_overlap(previous: str, text: str, max_overlap: int, min_overlap: int = 20) -> str:
+    """
+    Remove the splitter's overlap window when `text` starts where `previous` ends.
+    """
+    for n in range(min(max_overlap, len(previous), len(text)), min_overlap - 1, -1):
+        if previous.endswith(text[:n]):
+            return text[n:].lstrip()
+    return text
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut `text` to at most `max_tokens` (approx_tokens), at a word boundary when there is one.
+    """
+    limit = max_tokens * 4
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    space = cut.rfind(" ")
+    return (cut[:space] if space > limit // 2 else cut).rstrip()
+
+
+def pack_context(ranked: Sequence[Tuple[Document, float]], max_chunks: int,
+                 token_budget: int, max_overlap: int) -> List[Document]:
+    """
+    Take chunks best-first until `max_chunks` or `token_budget` is reached,
+    trimming text already covered by an adjacent chunk from the same source.
+
+    The budget covers the chunks joined with CONTEXT_SEPARATOR, as the prompt
+    sees them. A best chunk bigger than the whole budget is truncated to fit.
+    """
+    packed: List[Document] = []
+    limit = token_budget * 4  # approx_tokens is chars // 4
+    used = 0
+    for doc, _ in ranked:
+        text = doc.page_content
+        source = (doc.metadata or {}).get("source")
+        for other in packed:
+            if (other.metadata or {}).get("source") == source:
+                text = strip_overlap(other.page_content, text, max_overlap)
+        if not text.strip():
+            continue
+
+        cost = len(text) + (len(CONTEXT_SEPARATOR) if packed else 0)
+        if used + cost > limit:
+            if packed:
+                continue
+            text = truncate_to_tokens(text, token_budget)
+            cost = len(text)
+        packed.append(Document(page_content=text, metadata=doc.metadata))
+        used += cost
+        if len(packed) >= max_chunks:
+            break
+    return packed
@@ -0,0 +1,144 @@
+# response_cache.py
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+
+# Anything that looks like personal details makes a turn uncacheable.
+# Errs on the side of not caching: a missed hit costs one LLM call, a
+# false one serves a patient's details to someone else.
+PERSONAL_DETAILS = re.compile(
+    r"""
+      [\w.+-]+@[\w-]+\.[\w.-]+                      # email
+    | \+?\d[\d\s().-]{6,}\d                         # phone number
+    | \b\d{1,4}[/-]\d{1,2}[/-]\d{1,4}\b             # date
+    | \bmy\s+(name|email|phone|number|dob|date\s+of\s+birth|birthday|address|age|insurance|ssn
+               |social\s+security|patient\s+id|mrn)\b
+    | \b(i\s+am|i'?m|im)\s+(a\s+|an\s+)?\d{1,3}\b  # age: "I'm 45", "I am a 45 ..."
+    | \b\d{1,3}[\s-]*(years?|yrs?|y/?o|months?)([\s-]+old)?\b
+    | \b(i\s+was\s+born|i\s+live\s+(in|at|on)|call\s+me|this\s+is\s+\w+\s+speaking)\b
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+# Self-introductions: "I'm John", "I am Maria Lopez", "This is Dr. Patel"
+INTRODUCTION = re.compile(r"\b(?i:i\s+am|i'?m|this\s+is)\s+(?:(?i:dr|mr|mrs|ms|miss)\.?\s+)?[A-Z][a-z]+")
+
+
+def is_cacheable(messages: Sequence[BaseMessage]) -> bool:
+    """
+    Only stateless opening questions: first human turn of the thread and
+    no personal details in it.
+    """
+    human = [m for m in messages if isinstance(m, HumanMessage)]
+    if len(human) != 1 or any(isinstance(m, AIMessage) for m in messages):
+        return False
+    text = human[0].content
+    return not (PERSONAL_DETAILS.search(text) or INTRODUCTION.search(text))
+
+
+class SemanticResponseCache:
+    """
+    In-process answer cache matched on query-embedding cosine similarity.
+
+    Entries expire after `ttl` seconds, the oldest are dropped beyond
+    `max_entries`, and everything is cleared when `version_fn()` changes
+    (i.e. the vector store was rebuilt or re-synced).
+
+    A miss keeps the query vector for a while, so the store() that follows
+    the generated answer doesn't embed the question again.
+    """
+
+    PENDING_VECTORS = 256
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        threshold: float = 0.95,
+        ttl: int = 3600,
+        max_entries: int = 1000,
+        version_fn: Optional[Callable[[], object]] = None,
+    ):
+        self.embeddings = embeddings
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_fn = version_fn
+
+        self._lock = threading.Lock()
+        self._vectors = None                 # (n, dim) float32, L2-normalized rows
+        self._entries: List[Dict] = []       # answer, sources, created_at
+        self._pending: "OrderedDict[str, np.ndarray]" = OrderedDict()   # missed question -> vector
+        self._version = version_fn() if version_fn else None
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(question), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def _prune(self) -> None:
+        # Called with the lock held
+        if self.version_fn:
+            version = self.version_fn()
+            if version != self._version:
+                self._version = version
+                self._vectors, self._entries = None, []
+                return
+
+        cutoff = time.time() - self.ttl
+        keep = [i for i, e in enumerate(self._entries) if e["created_at"] >= cutoff]
+        keep = keep[-self.max_entries:]
+        if len(keep) != len(self._entries):
+            self._entries = [self._entries[i] for i in keep]
+            self._vectors = self._vectors[keep] if keep else None
+
+    def lookup(self, question: str) -> Optional[Dict]:
+        query = self._embed(question)
+        with self._lock:
+            self._prune()
+            if self._vectors is not None:
+                scores = self._vectors @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self.hits += 1
+                    return self._entries[best]
+            self.misses += 1
+            self._pending[question] = query
+            while len(self._pending) > self.PENDING_VECTORS:
+                self._pending.popitem(last=False)
+            return None
+
+    def store(self, question: str, answer: str, sources: List[str]) -> None:
+        with self._lock:
+            vector = self._pending.pop(question, None)
+        if vector is None:
+            vector = self._embed(question)
+        with self._lock:
+            self._prune()
+            entry = {"answer": answer, "sources": list(sources), "created_at": time.time()}
+            self._entries.append(entry)
+            row = vector[None, :]
+            self._vectors = row if self._vectors is None else np.vstack([self._vectors, row])
+            self._prune()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._vectors, self._entries = None, []
+            self._pending.clear()
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else None,
+            }
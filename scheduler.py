@@ -0,0 +1,439 @@
+# scheduler.py  (one queue for every OpenAI call: rate limits, concurrency, retries, priority lanes)
+
+import asyncio
+import itertools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+from metrics import OPENAI_INFLIGHT, OPENAI_QUEUE_DEPTH, OPENAI_QUEUE_SECONDS, OPENAI_RETRIES
+
+
+# Provider limits per minute (0 = no limit); chat and embeddings are limited separately
+OPENAI_CHAT_RPM = int(os.getenv("OPENAI_CHAT_RPM", "500"))
+OPENAI_CHAT_TPM = int(os.getenv("OPENAI_CHAT_TPM", "200000"))
+OPENAI_EMBED_RPM = int(os.getenv("OPENAI_EMBED_RPM", "3000"))
+OPENAI_EMBED_TPM = int(os.getenv("OPENAI_EMBED_TPM", "1000000"))
+# Calls in flight across the whole process
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "16"))
+# Retries after the first attempt; delays are full-jitter exponential, capped
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "6"))
+OPENAI_BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "0.5"))
+OPENAI_BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "30"))
+# Completion tokens charged up front for a chat call; corrected from the reported usage afterwards
+COMPLETION_ESTIMATE = int(os.getenv("OPENAI_COMPLETION_ESTIMATE", "400"))
+
+CHAT = "chat"
+EMBEDDINGS = "embeddings"
+
+# Lower number goes first; FIFO within a lane
+URGENT = "urgent"            # triage / emergency turns
+INTERACTIVE = "interactive"  # live chat (default)
+BULK = "bulk"                # ingest, replays, /chat/batch
+LANES = {URGENT: 0, INTERACTIVE: 1, BULK: 2}
+
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+_lane: ContextVar[str] = ContextVar("openai_lane", default=INTERACTIVE)
+# Set while a scheduled call runs, so the client's internal calls aren't queued twice
+_scheduled: ContextVar[bool] = ContextVar("openai_scheduled", default=False)
+
+
+@contextmanager
+def call_lane(lane: str):
+    """
+    OpenAI calls made inside this block (including in graph nodes it
+    invokes) are queued in `lane`.
+    """
+    if lane not in LANES:
+        raise ValueError(f"Unknown lane: {lane}")
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+# ------------------------
+#   LIMITS
+# ------------------------
+
+class TokenBucket:
+    """
+    Refills `per_minute` units evenly over a minute, holding at most one
+    minute's worth. The level may go negative when a call used more than
+    was charged for it.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        # A single call larger than the bucket waits for a full bucket instead of forever
+        self._refill(now)
+        missing = min(amount, self.capacity) - self.level
+        return max(0.0, missing / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, amount: float) -> None:
+        self.level = min(self.capacity, self.level - amount)
+
+
+class _Waiter:
+    __slots__ = ("kind", "lane", "tokens", "seq", "enqueued", "granted", "wake")
+
+    def __init__(self, kind: str, lane: str, tokens: int, seq: int, wake: Callable[[], None]):
+        self.kind = kind
+        self.lane = lane
+        self.tokens = tokens
+        self.seq = seq
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.wake = wake
+
+    def order(self):
+        return LANES[self.lane], self.seq
+
+
+# ------------------------
+#   SCHEDULER
+# ------------------------
+
+class CallScheduler:
+    """
+    Admits OpenAI calls in lane order once a concurrency slot and enough
+    request/token budget for their kind are free. Works from threads
+    (ingest, sync clients) and event loops alike.
+    """
+
+    def __init__(self, limits: Dict[str, tuple], max_concurrency: int = OPENAI_MAX_CONCURRENCY,
+                 max_retries: int = OPENAI_MAX_RETRIES, backoff_base: float = OPENAI_BACKOFF_BASE,
+                 backoff_max: float = OPENAI_BACKOFF_MAX):
+        # limits: kind -> (requests per minute, tokens per minute)
+        self.buckets = {
+            kind: tuple(TokenBucket(n) if n > 0 else None for n in (rpm, tpm))
+            for kind, (rpm, tpm) in limits.items()
+        }
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._lock = threading.Lock()
+        self._queue: List[_Waiter] = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._paused_until = {kind: 0.0 for kind in limits}
+        self._timer: Optional[threading.Timer] = None
+        self._timer_at = float("inf")
+
+    # -- admission --
+
+    def _costs(self, waiter: _Waiter):
+        # (bucket, amount) for the kind's request and token buckets
+        buckets = self.buckets.get(waiter.kind, (None, None))
+        return [(bucket, amount) for bucket, amount in zip(buckets, (1, waiter.tokens)) if bucket]
+
+    def _dispatch(self) -> None:
+        # Lock held. Grant queued calls in lane order; a kind that is out of
+        # budget blocks only its own later calls.
+        now = time.monotonic()
+        blocked, retry_in = set(), float("inf")
+        for waiter in sorted(self._queue, key=_Waiter.order):
+            if self._active >= self.max_concurrency:
+                break
+            if waiter.kind in blocked:
+                continue
+            costs = self._costs(waiter)
+            delay = max(
+                [self._paused_until.get(waiter.kind, 0.0) - now]
+                + [bucket.wait_time(amount, now) for bucket, amount in costs]
+            )
+            if delay > 0:
+                blocked.add(waiter.kind)
+                retry_in = min(retry_in, delay)
+                continue
+            for bucket, amount in costs:
+                bucket.take(amount)
+            self._queue.remove(waiter)
+            self._active += 1
+            waiter.granted = True
+            OPENAI_QUEUE_DEPTH.dec(lane=waiter.lane)
+            OPENAI_QUEUE_SECONDS.observe(now - waiter.enqueued, lane=waiter.lane)
+            waiter.wake()
+
+        OPENAI_INFLIGHT.set(self._active)
+        if self._queue and retry_in != float("inf"):
+            self._schedule_dispatch(now + retry_in)
+
+    def _schedule_dispatch(self, at: float) -> None:
+        if self._timer is not None and self._timer_at <= at:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer_at = at
+        self._timer = threading.Timer(max(0.0, at - time.monotonic()) + 0.001, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer, self._timer_at = None, float("inf")
+            self._dispatch()
+
+    def _enqueue(self, kind: str, tokens: int, wake: Callable[[], None]) -> _Waiter:
+        waiter = _Waiter(kind, _lane.get(), tokens, next(self._seq), wake)
+        with self._lock:
+            self._queue.append(waiter)
+            OPENAI_QUEUE_DEPTH.inc(lane=waiter.lane)
+            self._dispatch()
+        return waiter
+
+    def _withdraw(self, waiter: _Waiter) -> None:
+        # Caller gave up (cancelled); free its slot if it was granted meanwhile
+        with self._lock:
+            if waiter in self._queue:
+                self._queue.remove(waiter)
+                OPENAI_QUEUE_DEPTH.dec(lane=waiter.lane)
+                return
+        if waiter.granted:
+            self.release(waiter)
+
+    def acquire(self, kind: str, tokens: int) -> _Waiter:
+        # Blocks the thread: run sync callers on their own pool, not the event
+        # loop's default executor, which async calls need for DNS lookups
+        event = threading.Event()
+        waiter = self._enqueue(kind, tokens, event.set)
+        event.wait()
+        return waiter
+
+    async def aacquire(self, kind: str, tokens: int) -> _Waiter:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: future.done() or future.set_result(None))
+
+        waiter = self._enqueue(kind, tokens, wake)
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._withdraw(waiter)
+            raise
+        return waiter
+
+    def release(self, waiter: _Waiter, used_tokens: Optional[int] = None) -> None:
+        with self._lock:
+            self._active -= 1
+            tokens = self.buckets.get(waiter.kind, (None, None))[1]
+            if used_tokens is not None and tokens is not None:
+                tokens.adjust(used_tokens - waiter.tokens)
+            self._dispatch()
+
+    # -- retries --
+
+    def retry_delay(self, kind: str, error: Exception, attempt: int) -> Optional[float]:
+        """
+        Seconds to wait before retrying after `error`, or None to give up.
+        A 429 pauses every call of this kind, not just the one that hit it.
+        """
+        status = getattr(error, "status_code", None)
+        if attempt >= self.max_retries or not _is_retryable(error, status):
+            return None
+        delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        retry_after = _retry_after(error)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_max))
+        OPENAI_RETRIES.inc(kind=kind, reason=str(status or type(error).__name__))
+        if status == 429:
+            with self._lock:
+                self._paused_until[kind] = max(self._paused_until.get(kind, 0.0), time.monotonic() + delay)
+        return delay
+
+    def call(self, kind: str, func: Callable[[], Any], tokens: int,
+             usage: Callable[[Any], Optional[int]] = lambda result: None) -> Any:
+        if _scheduled.get():
+            return func()
+        for attempt in itertools.count():
+            waiter = self.acquire(kind, tokens)
+            token, used = _scheduled.set(True), None
+            try:
+                result = func()
+                used = usage(result)
+                return result
+            except Exception as e:
+                delay = self.retry_delay(kind, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                _scheduled.reset(token)
+                self.release(waiter, used)
+            time.sleep(delay)
+
+    async def acall(self, kind: str, func: Callable[[], Any], tokens: int,
+                    usage: Callable[[Any], Optional[int]] = lambda result: None) -> Any:
+        if _scheduled.get():
+            return await func()
+        for attempt in itertools.count():
+            waiter = await self.aacquire(kind, tokens)
+            token, used = _scheduled.set(True), None
+            try:
+                result = await func()
+                used = usage(result)
+                return result
+            except Exception as e:
+                delay = self.retry_delay(kind, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                _scheduled.reset(token)
+                self.release(waiter, used)
+            await asyncio.sleep(delay)
+
+
+def _is_retryable(error: Exception, status: Optional[int]) -> bool:
+    import openai
+
+    if isinstance(error, (openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return status in RETRY_STATUS
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+@lru_cache(maxsize=1)
+def get_scheduler() -> CallScheduler:
+    return CallScheduler({
+        CHAT: (OPENAI_CHAT_RPM, OPENAI_CHAT_TPM),
+        EMBEDDINGS: (OPENAI_EMBED_RPM, OPENAI_EMBED_TPM),
+    })
+
+
+# ------------------------
+#   SCHEDULED CLIENTS
+# ------------------------
+
+def _chat_tokens(messages) -> int:
+    return count_tokens_approximately(messages) + COMPLETION_ESTIMATE
+
+
+def _chat_usage(result) -> Optional[int]:
+    usage = getattr(result.generations[0].message, "usage_metadata", None) if result.generations else None
+    return usage.get("total_tokens") if usage else None
+
+
+def _embed_tokens(texts: List[str]) -> int:
+    return sum(len(text) for text in texts) // 4 + len(texts)
+
+
+class ScheduledChatOpenAI(ChatOpenAI):
+    """
+    ChatOpenAI whose requests wait their turn in the shared scheduler.
+    Streams are retried only if they fail before the first chunk.
+    """
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        call = partial(super()._generate, messages, stop=stop, run_manager=run_manager, **kwargs)
+        return get_scheduler().call(CHAT, call, _chat_tokens(messages), _chat_usage)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        call = partial(super()._agenerate, messages, stop=stop, run_manager=run_manager, **kwargs)
+        return await get_scheduler().acall(CHAT, call, _chat_tokens(messages), _chat_usage)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        stream = partial(super()._stream, messages, stop=stop, run_manager=run_manager, **kwargs)
+        if _scheduled.get():
+            yield from stream()
+            return
+        scheduler, tokens = get_scheduler(), _chat_tokens(messages)
+        for attempt in itertools.count():
+            waiter, used, started = scheduler.acquire(CHAT, tokens), None, False
+            try:
+                for chunk in stream():
+                    started = True
+                    used = (chunk.message.usage_metadata or {}).get("total_tokens", used)
+                    yield chunk
+                return
+            except Exception as e:
+                delay = None if started else scheduler.retry_delay(CHAT, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                scheduler.release(waiter, used)
+            time.sleep(delay)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        stream = partial(super()._astream, messages, stop=stop, run_manager=run_manager, **kwargs)
+        if _scheduled.get():
+            async for chunk in stream():
+                yield chunk
+            return
+        scheduler, tokens = get_scheduler(), _chat_tokens(messages)
+        for attempt in itertools.count():
+            waiter, used, started = await scheduler.aacquire(CHAT, tokens), None, False
+            try:
+                async for chunk in stream():
+                    started = True
+                    used = (chunk.message.usage_metadata or {}).get("total_tokens", used)
+                    yield chunk
+                return
+            except Exception as e:
+                delay = None if started else scheduler.retry_delay(CHAT, e, attempt)
+                if delay is None:
+                    raise
+            finally:
+                scheduler.release(waiter, used)
+            await asyncio.sleep(delay)
+
+
+class ScheduledOpenAIEmbeddings(OpenAIEmbeddings):
+    """
+    OpenAIEmbeddings whose requests (one per `chunk_size` texts) wait their
+    turn in the shared scheduler.
+    """
+
+    def embed_documents(self, texts: List[str], chunk_size: Optional[int] = None, **kwargs) -> List[List[float]]:
+        step = chunk_size or self.chunk_size
+        vectors = []
+        for start in range(0, len(texts), step):
+            batch = texts[start:start + step]
+            call = partial(super().embed_documents, batch, chunk_size=step, **kwargs)
+            vectors.extend(get_scheduler().call(EMBEDDINGS, call, _embed_tokens(batch)))
+        return vectors
+
+    async def aembed_documents(self, texts: List[str], chunk_size: Optional[int] = None,
+                               **kwargs) -> List[List[float]]:
+        step = chunk_size or self.chunk_size
+        vectors = []
+        for start in range(0, len(texts), step):
+            batch = texts[start:start + step]
+            call = partial(super().aembed_documents, batch, chunk_size=step, **kwargs)
+            vectors.extend(await get_scheduler().acall(EMBEDDINGS, call, _embed_tokens(batch)))
+        return vectors
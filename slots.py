@@ -0,0 +1,239 @@
+# slots.py  (clinic slot availability: per-provider day bitmaps persisted in SQLite)
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.tools import StructuredTool
+
+
+BASE_DIR = Path(__file__).resolve().parent
+
+SCHEDULE_DB = Path(os.getenv("SCHEDULE_DB", str(BASE_DIR / "schedule" / "schedule.sqlite")))
+# Comma-separated provider names; each has its own calendar
+CLINIC_PROVIDERS = [p.strip() for p in os.getenv("CLINIC_PROVIDERS", "the doctor on duty").split(",") if p.strip()]
+
+OPEN_HOUR, CLOSE_HOUR = 9, 17          # Mon–Fri, clinic timezone
+SLOT_MINUTES = 30
+SLOTS_PER_DAY = (CLOSE_HOUR - OPEN_HOUR) * 60 // SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+NOON_INDEX = (12 - OPEN_HOUR) * 60 // SLOT_MINUTES
+
+# Bit masks for the parts of the day patients ask for
+DAY_PARTS = {
+    None: FULL_DAY,
+    "morning": (1 << NOON_INDEX) - 1,
+    "afternoon": FULL_DAY & ~((1 << NOON_INDEX) - 1),
+}
+
+
+def slot_index(hhmm: str) -> Optional[int]:
+    hour, minute = map(int, hhmm.split(":"))
+    offset = (hour - OPEN_HOUR) * 60 + minute
+    if offset < 0 or offset % SLOT_MINUTES or offset // SLOT_MINUTES >= SLOTS_PER_DAY:
+        return None
+    return offset // SLOT_MINUTES
+
+
+def slot_time(index: int) -> str:
+    minutes = OPEN_HOUR * 60 + index * SLOT_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def _bits(mask: int):
+    # Set bits, lowest (earliest slot) first
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class SlotSchedule:
+    """
+    Booked slots per (provider, day) as a bitmap of half-hour slots.
+
+    The bitmaps answer availability queries in memory; reservations go
+    through SQLite, whose primary key on (provider, day, slot) makes a
+    double booking impossible even across processes. A reserve that loses
+    that race refreshes the day from disk and reports the slot as taken.
+    Bookings and releases made by other workers are picked up through
+    SQLite's data_version before each query.
+    """
+
+    def __init__(self, path: Path = SCHEDULE_DB, providers: List[str] = CLINIC_PROVIDERS):
+        self.providers = list(providers)
+        self._booked: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, timeout=30.0)
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS reservations (
+                provider TEXT NOT NULL,
+                day TEXT NOT NULL,
+                slot INTEGER NOT NULL,
+                booking_id TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (provider, day, slot)
+            );
+            """
+        )
+        self._data_version = None
+        with self._lock:
+            self._sync()
+
+    def _sync(self) -> None:
+        # Called with the lock held. data_version only moves when another
+        # connection (another worker) commits, so this is one PRAGMA per query.
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._data_version:
+            return
+        booked: Dict[Tuple[str, str], int] = {}
+        for provider, day, slot in self._conn.execute("SELECT provider, day, slot FROM reservations"):
+            key = (provider, day)
+            booked[key] = booked.get(key, 0) | (1 << slot)
+        self._booked = booked
+        self._data_version = version
+
+    # ---- queries ----
+
+    def free_mask(self, day: date, provider: str) -> int:
+        if day.weekday() >= 5:
+            return 0
+        return FULL_DAY & ~self._booked.get((provider, day.isoformat()), 0)
+
+    def free_slots(self, day: date, part: Optional[str] = None, limit: int = 3) -> List[Dict[str, str]]:
+        """
+        Earliest free slots on `day` (any provider), at most `limit`.
+        """
+        with self._lock:
+            self._sync()
+        found: Dict[int, str] = {}
+        for provider in self.providers:
+            # The overall earliest `limit` are among each provider's earliest `limit`
+            for n, index in enumerate(_bits(self.free_mask(day, provider) & DAY_PARTS[part])):
+                if n >= limit:
+                    break
+                found.setdefault(index, provider)
+        return [
+            {"date": day.isoformat(), "time": slot_time(i), "provider": found[i]}
+            for i in sorted(found)[:limit]
+        ]
+
+    def next_free(self, start: date, days: int = 7, part: Optional[str] = None,
+                  limit: int = 3) -> List[Dict[str, str]]:
+        """
+        First `limit` free slots from `start` over the next `days` days.
+        """
+        slots: List[Dict[str, str]] = []
+        for offset in range(days):
+            slots += self.free_slots(start + timedelta(days=offset), part, limit - len(slots))
+            if len(slots) >= limit:
+                break
+        return slots
+
+    def is_free(self, day: date, hhmm: str) -> bool:
+        index = slot_index(hhmm)
+        with self._lock:
+            self._sync()
+        return index is not None and any(self.free_mask(day, p) >> index & 1 for p in self.providers)
+
+    # ---- reserve / release ----
+
+    def reserve(self, day: date, hhmm: str, booking_id: Optional[str] = None,
+                provider: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """
+        Atomically book the slot with `provider` (or the first provider who
+        is free). Returns the reservation, or None if it is taken.
+        """
+        index = slot_index(hhmm)
+        if index is None or day.weekday() >= 5:
+            return None
+        booking_id = booking_id or uuid.uuid4().hex
+        key_day = day.isoformat()
+
+        with self._lock:
+            self._sync()
+            for candidate in ([provider] if provider else self.providers):
+                if not self.free_mask(day, candidate) >> index & 1:
+                    continue
+                try:
+                    with self._conn:
+                        self._conn.execute(
+                            "INSERT INTO reservations (provider, day, slot, booking_id, created_at) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            (candidate, key_day, index, booking_id, time.time()),
+                        )
+                except sqlite3.IntegrityError:
+                    # Booked by another process since we loaded the day
+                    self._refresh(candidate, key_day)
+                    continue
+                key = (candidate, key_day)
+                self._booked[key] = self._booked.get(key, 0) | (1 << index)
+                return {"date": key_day, "time": hhmm, "provider": candidate, "booking_id": booking_id}
+        return None
+
+    def release(self, booking_id: str) -> bool:
+        with self._lock:
+            with self._conn:
+                rows = self._conn.execute(
+                    "DELETE FROM reservations WHERE booking_id = ? RETURNING provider, day, slot",
+                    (booking_id,),
+                ).fetchall()
+            for provider, day, slot in rows:
+                key = (provider, day)
+                self._booked[key] = self._booked.get(key, 0) & ~(1 << slot)
+        return bool(rows)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _refresh(self, provider: str, day: str) -> None:
+        # Called with the lock held
+        mask = 0
+        for (slot,) in self._conn.execute(
+            "SELECT slot FROM reservations WHERE provider = ? AND day = ?", (provider, day)
+        ):
+            mask |= 1 << slot
+        self._booked[(provider, day)] = mask
+
+
+# ------------------------
+#   GRAPH TOOLS
+# ------------------------
+
+def make_slot_tools(schedule: SlotSchedule) -> Dict[str, StructuredTool]:
+    """
+    The schedule as LangChain tools, keyed by name, for the booking node
+    (and any model bound to them).
+    """
+    def check_availability(day: str, part: Optional[str] = None, days: int = 1,
+                           limit: int = 3) -> List[Dict[str, str]]:
+        """List the earliest free appointment slots from `day` (YYYY-MM-DD) over `days` days.
+        `part` is "morning", "afternoon" or empty for the whole day."""
+        return schedule.next_free(date.fromisoformat(day), days=days, part=part or None, limit=limit)
+
+    def reserve_slot(day: str, time: str, booking_id: Optional[str] = None) -> Optional[Dict[str, str]]:
+        """Reserve the slot at `time` (HH:MM) on `day` (YYYY-MM-DD). Returns null if it is taken."""
+        return schedule.reserve(date.fromisoformat(day), time, booking_id)
+
+    def release_slot(booking_id: str) -> bool:
+        """Cancel the reservation made under `booking_id`."""
+        return schedule.release(booking_id)
+
+    tools = [StructuredTool.from_function(f) for f in (check_availability, reserve_slot, release_slot)]
+    return {t.name: t for t in tools}
+
+
+@lru_cache(maxsize=1)
+def get_schedule() -> SlotSchedule:
+    return SlotSchedule()
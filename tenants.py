@@ -0,0 +1,249 @@
+# tenants.py  (clinic registry: per-clinic prompt, index and graph, loaded lazily, LRU-evicted)
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain_core.messages import SystemMessage
+
+from prompts import system_prompt
+
+
+BASE_DIR = Path(__file__).resolve().parent
+
+# {"<clinic id>": {"name": ..., "timezone": ..., "providers": [...]}, ...}
+TENANTS_FILE = Path(os.getenv("TENANTS_FILE", str(BASE_DIR / "tenants.json")))
+TENANTS_DIR = BASE_DIR / "tenants"   # tenants/<id>/Data, tenants/<id>/vectorstore, ...
+# Clinic served when a request doesn't name one; "default" is the single-clinic layout (Data/, vectorstore/)
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+
+# Loaded clinics are evicted least-recently-used beyond either cap
+TENANT_MAX_LOADED = int(os.getenv("TENANT_MAX_LOADED", "32"))
+TENANT_MEMORY_MB = int(os.getenv("TENANT_MEMORY_MB", "2048"))
+# Graph, caches and clients of a loaded clinic, on top of its index files
+TENANT_BASE_BYTES = 16 * 1024 * 1024
+
+TENANT_ID_RE = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+
+
+class UnknownTenant(KeyError):
+    pass
+
+
+class Tenant:
+    """
+    One clinic's settings and where its files live. Everything derived from
+    them (prompt, directories) is fixed for the life of the process.
+    """
+
+    def __init__(self, tenant_id: str, name: str, timezone: str, data_dir: Path, vectorstore_dir: Path,
+                 schedule_db: Path, providers: Optional[list] = None):
+        self.id = tenant_id
+        self.name = name
+        self.timezone = timezone
+        self.data_dir = Path(data_dir)
+        self.vectorstore_dir = Path(vectorstore_dir)
+        self.schedule_db = Path(schedule_db)
+        self.providers = providers
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.vectorstore_dir / "manifest.json"
+
+    @property
+    def bm25_dir(self) -> Path:
+        return self.vectorstore_dir / "bm25"
+
+    @property
+    def quantized_dir(self) -> Path:
+        return self.vectorstore_dir / "quantized"
+
+    @cached_property
+    def system_message(self) -> SystemMessage:
+        # Rendered once per clinic: the same bytes lead every prompt, which is what prefix caching keys on
+        return SystemMessage(content=system_prompt(self.name, self.timezone))
+
+    def thread_key(self, thread_id: str) -> str:
+        # Clinics share the checkpointer. Every clinic is prefixed, the default too,
+        # or a client-chosen "northside:x" sent to the default would land in northside's thread.
+        return f"{self.id}:{thread_id}"
+
+    def index_bytes(self) -> int:
+        if not self.vectorstore_dir.exists():
+            return 0
+        return sum(p.stat().st_size for p in self.vectorstore_dir.rglob("*") if p.is_file())
+
+
+def load_tenants(default: Tenant, path: Path = TENANTS_FILE) -> Dict[str, Tenant]:
+    """
+    `default` (the single-clinic layout) plus every clinic in `path`, if it
+    exists. A clinic's files default to tenants/<id>/.
+    """
+    tenants = {default.id: default}
+    if not path.exists():
+        return tenants
+
+    for tenant_id, cfg in json.loads(path.read_text(encoding="utf-8")).items():
+        if not TENANT_ID_RE.match(tenant_id):
+            raise ValueError(f"Invalid clinic id {tenant_id!r} in {path}: use lowercase letters, digits, - and _")
+        root = TENANTS_DIR / tenant_id
+        tenants[tenant_id] = Tenant(
+            tenant_id,
+            cfg["name"],
+            cfg.get("timezone", "UTC"),
+            data_dir=BASE_DIR / cfg.get("data_dir", root / "Data"),
+            vectorstore_dir=BASE_DIR / cfg.get("vectorstore_dir", root / "vectorstore"),
+            schedule_db=BASE_DIR / cfg.get("schedule_db", root / "schedule.sqlite"),
+            providers=cfg.get("providers"),
+        )
+    return tenants
+
+
+# ------------------------
+#   REGISTRY
+# ------------------------
+
+class _Loaded:
+    __slots__ = ("resources", "close", "size", "users", "evicted")
+
+    def __init__(self, resources, close: Callable[[], None], size: int):
+        self.resources = resources
+        self.close = close
+        self.size = size
+        self.users = 0
+        self.evicted = False
+
+
+class TenantRegistry:
+    """
+    Loads a clinic's resources with `loader(tenant)` on its first request
+    and keeps them until they are the least recently used beyond
+    `max_loaded` clinics or `memory_bytes` of estimated footprint.
+
+    `loader` returns (resources, close). An evicted clinic is closed once
+    the last request using it (see use()) has finished.
+    """
+
+    def __init__(self, tenants: Dict[str, Tenant], loader: Callable[[Tenant], Tuple[Any, Callable[[], None]]],
+                 max_loaded: int = TENANT_MAX_LOADED, memory_bytes: int = TENANT_MEMORY_MB * 1024 * 1024):
+        self.tenants = tenants
+        self.loader = loader
+        self.max_loaded = max_loaded
+        self.memory_bytes = memory_bytes
+
+        self._loaded: "OrderedDict[str, _Loaded]" = OrderedDict()
+        self._loading: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.loads = self.evictions = 0
+
+    def tenant(self, tenant_id: Optional[str]) -> Tenant:
+        tenant_id = tenant_id or DEFAULT_TENANT
+        try:
+            return self.tenants[tenant_id]
+        except KeyError:
+            raise UnknownTenant(tenant_id) from None
+
+    async def get(self, tenant_id: Optional[str]):
+        """
+        Load the clinic if needed. For a request, prefer use(), which also
+        keeps the resources open until the request is done.
+        """
+        entry = await self._acquire(self.tenant(tenant_id))
+        self._release(entry)
+        return entry.resources
+
+    @asynccontextmanager
+    async def use(self, tenant_id: Optional[str]):
+        entry = await self._acquire(self.tenant(tenant_id))
+        try:
+            yield entry.resources
+        finally:
+            self._release(entry)
+
+    async def _acquire(self, tenant: Tenant) -> _Loaded:
+        while True:
+            with self._lock:
+                entry = self._loaded.get(tenant.id)
+                if entry is not None:
+                    self._loaded.move_to_end(tenant.id)
+                    entry.users += 1
+                    return entry
+
+            # One load per clinic, however many requests are waiting on it
+            future = self._loading.get(tenant.id)
+            if future is None:
+                future = asyncio.ensure_future(self._load(tenant))
+                self._loading[tenant.id] = future
+                future.add_done_callback(lambda _: self._loading.pop(tenant.id, None))
+            await asyncio.shield(future)
+            # ...then take it from _loaded as usual (another load may have evicted it already)
+
+    def _release(self, entry: _Loaded) -> None:
+        with self._lock:
+            entry.users -= 1
+            closing = entry.evicted and entry.users == 0
+        if closing:
+            self._close(entry)
+
+    async def _load(self, tenant: Tenant) -> None:
+        started = time.perf_counter()
+        resources, close = await asyncio.to_thread(self.loader, tenant)
+        entry = _Loaded(resources, close, TENANT_BASE_BYTES + tenant.index_bytes())
+        with self._lock:
+            self._loaded[tenant.id] = entry
+            self.loads += 1
+            evicted = self._evict(keep=tenant.id)
+            # Ones still in use are closed by their last request (_release)
+            idle = [old for _, old in evicted if old.users == 0]
+        for tenant_id, _ in evicted:
+            print(f"[RAG] Unloaded clinic {tenant_id!r} (least recently used)")
+        for old in idle:
+            self._close(old)
+        print(f"[RAG] Loaded clinic {tenant.id!r} in {time.perf_counter() - started:.2f}s (~{entry.size >> 20} MB)")
+
+    @staticmethod
+    def _close(entry: _Loaded) -> None:
+        entry.close()
+        # Drop the graph too, so its retriever, BM25 arrays and store can be freed
+        entry.resources = None
+
+    def _evict(self, keep: str):
+        # Lock held. Oldest first; the clinic just loaded always stays.
+        evicted = []
+        while len(self._loaded) > 1 and (
+            len(self._loaded) > self.max_loaded or self.used_bytes() > self.memory_bytes
+        ):
+            tenant_id = next(iter(self._loaded))
+            if tenant_id == keep:
+                break
+            entry = self._loaded.pop(tenant_id)
+            entry.evicted = True
+            self.evictions += 1
+            evicted.append((tenant_id, entry))
+        return evicted
+
+    def used_bytes(self) -> int:
+        return sum(entry.size for entry in self._loaded.values())
+
+    def close(self) -> None:
+        with self._lock:
+            entries, self._loaded = list(self._loaded.values()), OrderedDict()
+        for entry in entries:
+            self._close(entry)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "clinics": len(self.tenants),
+            "loaded": list(self._loaded),
+            "estimated_mb": round(self.used_bytes() / (1 << 20), 1),
+            "loads": self.loads,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,43 @@
+# tests/conftest.py  (offline defaults: no OpenAI key, no files outside tmp_path)
+
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("CHECKPOINTER", "memory")
+os.environ.setdefault("EMBED_CACHE", "0")
+os.environ.setdefault("RESPONSE_CACHE", "0")
+os.environ.setdefault("WARMUP_ON_STARTUP", "0")
+
+
+@pytest.fixture
+def serve():
+    """
+    serve(app_graph) -> TestClient for main.app with `app_graph` as the
+    default clinic's graph (no warm-up, no vector store on disk).
+    """
+    from fastapi.testclient import TestClient
+
+    import main
+    from graph import DEFAULT_CLINIC
+    from tenants import TenantRegistry
+
+    clients = []
+
+    def start(app_graph):
+        main.Components.clinics = TenantRegistry(
+            {DEFAULT_CLINIC.id: DEFAULT_CLINIC}, lambda _: (app_graph, lambda: None)
+        )
+        client = TestClient(main.app)
+        clients.append(client)
+        return client
+
+    yield start
+    for client in clients:
+        client.close()
+    main.Components.clinics = None
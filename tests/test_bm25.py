@@ -0,0 +1,65 @@
+# tests/test_bm25.py  (hybrid retriever: index reload after re-ingest, bounded dense searches)
+
+import os
+import threading
+
+from langchain_core.documents import Document
+
+import bm25
+from bm25 import BM25Index, HybridRetriever, ReloadingBM25Index
+
+
+def docs(*texts):
+    return [Document(page_content=text, metadata={"source": f"d{i}.pdf", "page": 0}) for i, text in enumerate(texts)]
+
+
+def test_reloads_when_ingestion_rewrites_the_index(tmp_path):
+    BM25Index.build(docs("Amoxicillin dosing for children", "Clinic parking")).save(tmp_path)
+    index = ReloadingBM25Index(tmp_path)
+    assert index.search("ibuprofen") == []
+
+    BM25Index.build(docs("Ibuprofen with food", "Clinic parking")).save(tmp_path)
+    stat = (tmp_path / "postings.npz").stat()
+    os.utime(tmp_path / "postings.npz", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))  # coarse-mtime filesystems
+
+    assert [d.page_content for d, _ in index.search("ibuprofen")] == ["Ibuprofen with food"]
+
+
+def test_keeps_the_previous_index_when_files_disagree(tmp_path):
+    BM25Index.build(docs("Amoxicillin dosing")).save(tmp_path)
+    index = ReloadingBM25Index(tmp_path)
+
+    (tmp_path / "docs.jsonl").write_text("", encoding="utf-8")  # a half-written rebuild
+    stat = (tmp_path / "postings.npz").stat()
+    os.utime(tmp_path / "postings.npz", ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+
+    assert [d.page_content for d, _ in index.search("amoxicillin")] == ["Amoxicillin dosing"]
+
+
+class StuckStore:
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+
+    def similarity_search(self, query, k=4):
+        self.calls += 1
+        self.release.wait(5)
+        return []
+
+
+def test_timed_out_dense_searches_do_not_queue_up(tmp_path):
+    store = StuckStore()
+    retriever = HybridRetriever(
+        vectorstore=store,
+        bm25=BM25Index.build(docs("Amoxicillin dosing", "Clinic parking")),
+        k=1,
+        dense_timeout=0.01,
+    )
+    try:
+        for _ in range(bm25.DENSE_WORKERS * 3):
+            assert [d.page_content for d in retriever.invoke("amoxicillin")] == ["Amoxicillin dosing"]
+        # Nothing waits behind the stuck embedding calls
+        assert store.calls <= bm25.DENSE_WORKERS
+        assert bm25._dense_executor._work_queue.qsize() == 0
+    finally:
+        store.release.set()
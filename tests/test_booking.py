@@ -0,0 +1,95 @@
+# tests/test_booking.py  (booking intent, cancellation and confirmation wording)
+
+from datetime import date, timedelta
+
+import pytest
+
+from booking import BookingFlow, parse_time, wants_to_book
+from slots import SlotSchedule, make_slot_tools
+
+
+def next_weekday() -> date:
+    day = date.today() + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+@pytest.fixture
+def flow(tmp_path):
+    return BookingFlow("Test Clinic", "UTC", slot_tools=make_slot_tools(SlotSchedule(tmp_path / "slots.sqlite")))
+
+
+@pytest.fixture
+def at_confirm():
+    return {
+        "status": "collecting", "step": "confirm", "reason": "Sore throat",
+        "date": next_weekday().isoformat(), "time": "10:00", "name": "Ana Lee",
+        "email": "ana@example.com", "phone": "(555) 123-4567", "dob": "1990-01-01", "notes": "",
+    }
+
+
+@pytest.mark.parametrize("text", [
+    "I'd like to book an appointment",
+    "I want to book a visit",
+    "I need to schedule a check-up",
+    "Can I book an appointment?",
+    "Book me in for tomorrow",
+])
+def test_booking_intent(text):
+    assert wants_to_book(text, None)
+
+
+@pytest.mark.parametrize("text", [
+    "Do I need an appointment for a flu shot?",
+    "Do I need to book an appointment for a flu shot?",
+    "What should I bring to my appointment?",
+    "Should I make an appointment for this rash?",
+])
+def test_questions_about_appointments_are_not_intent(text):
+    assert not wants_to_book(text, None)
+
+
+def test_reason_that_mentions_stop_does_not_cancel(flow):
+    booking, _ = flow.start()
+    booking, _ = flow.handle(booking, "I have a cough that will not stop")
+
+    assert booking["status"] == "collecting"
+    assert booking["reason"] == "I have a cough that will not stop"
+    assert booking["step"] == "date"
+
+
+@pytest.mark.parametrize("text", ["cancel", "Stop", "never mind", "Please cancel my booking", "I want to cancel"])
+def test_cancel(flow, text):
+    booking, _ = flow.start()
+    booking, _ = flow.handle(booking, text)
+    assert booking["status"] == "cancelled"
+
+
+@pytest.mark.parametrize("text", ["Right, but can you change the time?", "ok, but the email is wrong", "Yes, but"])
+def test_qualified_yes_does_not_confirm(flow, at_confirm, text):
+    booking, _ = flow.handle(at_confirm, text)
+
+    assert booking["status"] == "collecting"
+    assert "booking_id" not in booking
+
+
+def test_qualified_yes_edits_the_named_field(flow, at_confirm):
+    booking, _ = flow.handle(at_confirm, "Right, but can you change the time?")
+    assert booking["step"] == "time" and booking["editing"]
+
+
+def test_plain_yes_confirms(flow, at_confirm):
+    booking, _ = flow.handle(at_confirm, "Yes, that's correct")
+    assert booking["status"] == "confirmed"
+    assert booking["booking_id"]
+
+
+@pytest.mark.parametrize("text", ["in 2 weeks", "10 mg", "3 times a day", "10/20"])
+def test_counts_and_dates_are_not_times(text):
+    assert parse_time(text) is None
+
+
+@pytest.mark.parametrize("text, expected", [("at 3", "15:00"), ("9:30am", "09:30"), ("10:30", "10:30"), ("noon", "12:00")])
+def test_times(text, expected):
+    assert parse_time(text).strftime("%H:%M") == expected
@@ -0,0 +1,83 @@
+# tests/test_frontend.py  (session-scoped threads and backend slot release in the chat UI server)
+
+import asyncio
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+@pytest.fixture
+def frontend(monkeypatch):
+    monkeypatch.chdir(ROOT)  # StaticFiles / templates resolve from the repo root
+    import frontend
+
+    seen = []
+
+    def backend(request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        seen.append(body)
+        if request.url.path.endswith("/stream"):
+            events = [{"token": "Hi"}, {"done": True, "answer": "Hi"}]
+            text = "".join(f"data: {json.dumps(e)}\n\n" for e in events)
+            return httpx.Response(200, text=text, headers={"content-type": "text/event-stream"})
+        return httpx.Response(200, json={"answer": "Hi", "sources": []})
+
+    monkeypatch.setattr(frontend, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(backend)))
+    frontend.seen = seen
+    return frontend
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_thread_comes_from_the_session_cookie_only(frontend, stream):
+    client = TestClient(frontend.app)
+    client.get("/")
+    session = client.cookies.get(frontend.SESSION_COOKIE)
+
+    r = client.post("/send", json={"message": "hello", "thread_id": "someone-else", "stream": stream})
+
+    assert r.status_code == 200
+    assert frontend.seen[-1]["thread_id"] == session
+    assert "thread_id" not in r.text
+
+
+def test_send_without_a_cookie_issues_one(frontend):
+    client = TestClient(frontend.app)
+    r = client.post("/send", json={"message": "hello"})
+
+    assert frontend.seen[-1]["thread_id"] == r.cookies.get(frontend.SESSION_COOKIE)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_backend_slot_is_released(frontend, stream):
+    client = TestClient(frontend.app)
+    for _ in range(3):
+        client.post("/send", json={"message": "hello", "stream": stream})
+
+    assert all(b.in_flight == 0 for b in frontend.backend_pool.backends)
+
+
+def test_slot_released_when_the_stream_never_starts(frontend):
+    backend = asyncio.run(frontend.backend_pool.acquire(1))
+    lease = frontend.Lease(frontend.backend_pool, backend)
+    response = frontend.LeasedStreamingResponse(
+        frontend.stream_reply(lease, "s1", "hello"), lease, media_type="text/event-stream"
+    )
+
+    async def receive():
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        raise OSError("client went away")
+
+    scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+    with pytest.raises(Exception):
+        asyncio.run(response(scope, receive, send))
+
+    assert backend.in_flight == 0
+    lease.release()  # idempotent
+    assert backend.in_flight == 0
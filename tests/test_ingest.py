@@ -0,0 +1,34 @@
+# tests/test_ingest.py  (PDF parsing keeps a bounded window of files in flight)
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from langchain_core.documents import Document
+
+import ingest
+
+
+def test_iter_parsed_submits_a_bounded_window(monkeypatch):
+    submitted = []
+
+    class CountingPool(ThreadPoolExecutor):
+        # Threads instead of processes, so the patched parser below is used
+        def submit(self, fn, *args, **kwargs):
+            submitted.append(args[0])
+            return super().submit(fn, *args, **kwargs)
+
+    monkeypatch.setattr(ingest, "ProcessPoolExecutor", CountingPool)
+    monkeypatch.setattr(ingest, "load_pdf_chunks", lambda path: {path.stem: Document(page_content=path.stem)})
+    paths = [Path(f"doc-{i:02d}.pdf") for i in range(20)]
+
+    taken = []
+    for path, chunks in ingest.iter_parsed(paths, workers=2):
+        # The file being handed over plus at most workers * 2 - 1 others
+        assert len(submitted) - len(taken) <= 4
+        assert list(chunks) == [path.stem]
+        taken.append(path)
+        time.sleep(0.005)   # a consumer slower than the parsers, like ingest's embedding backpressure
+
+    assert sorted(taken) == paths
+    assert len(submitted) == len(paths)
@@ -0,0 +1,68 @@
+# tests/test_prompt_prefix.py  (each turn's prompt starts with the previous turn's prompt, byte for byte)
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import HumanMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from checkpoint import BoundedMemorySaver
+from graph import DEFAULT_CLINIC, build_graph
+from replay import OfflineChatModel
+from slots import SlotSchedule
+
+QUESTIONS = [
+    "What helps a sore throat?",
+    "How long does a sore throat usually last?",
+    "Can I take ibuprofen for a sore throat?",
+    "When should I see a doctor about a sore throat?",
+]
+
+
+class RecordingChatModel(OfflineChatModel):
+    prompts: list = []
+
+    def _reply(self, messages):
+        self.prompts.append([(m.type, m.content) for m in messages])
+        return super()._reply(messages)
+
+
+def common_prefix(a, b):
+    n = 0
+    while n < min(len(a), len(b)) and a[n] == b[n]:
+        n += 1
+    return n
+
+
+def test_prompt_prefix_is_stable_across_turns(serve, tmp_path):
+    store = InMemoryVectorStore(DeterministicFakeEmbedding(size=64))
+    store.add_documents([
+        Document(page_content=f"Sore throat guidance {i}: rest, fluids, lozenges, and see a doctor after a week.",
+                 metadata={"source": "Data/throat.pdf", "page": i})
+        for i in range(8)
+    ])
+    llm = RecordingChatModel(latency=0, prompts=[])
+    app_graph = build_graph(store.as_retriever(search_kwargs={"k": 4}), llm,
+                            checkpointer=BoundedMemorySaver(), response_cache=None,
+                            schedule=SlotSchedule(tmp_path / "slots.sqlite"))
+    client = serve(app_graph)
+
+    for question in QUESTIONS:
+        assert client.post("/chat", json={"question": question, "thread_id": "prefix"}).status_code == 200
+
+    prompts = llm.prompts
+    assert len(prompts) == len(QUESTIONS)
+    # The clinic's system prompt leads every prompt, rendered once
+    assert all(p[0] == ("system", DEFAULT_CLINIC.system_message.content) for p in prompts)
+
+    ratios = []
+    for previous, current in zip(prompts, prompts[1:]):
+        # Everything but the previous turn's volatile tail (RAG context + question) is reused
+        stable = len(previous) - (2 if previous[-2][1].startswith("[RAG CONTEXT START]") else 1)
+        assert current[:stable] == previous[:stable]
+        shared = common_prefix(previous, current)
+        ratios.append(count_tokens_approximately([HumanMessage(c) for _, c in current[:shared]])
+                      / count_tokens_approximately([HumanMessage(c) for _, c in current]))
+
+    print(f"cacheable-prefix ratio per turn: {', '.join(f'{r:.0%}' for r in ratios)}")
+    assert min(ratios) > 0.5
@@ -0,0 +1,131 @@
+# tests/test_quantized_store.py  (readers follow newly published versions; the manifest waits for persist)
+
+import pytest
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+import ingest
+from quantized_store import QuantizedVectorStore
+from tenants import Tenant
+
+
+def open_store(directory, rescore=True, size=64):
+    return QuantizedVectorStore(directory, DeterministicFakeEmbedding(size=size), dim=16, rescore=rescore)
+
+
+def docs(prefix, n):
+    return [Document(page_content=f"{prefix} chunk {i}", metadata={"source": f"{prefix}.pdf"}) for i in range(n)]
+
+
+def test_reader_switches_to_a_newly_published_version(tmp_path):
+    writer = open_store(tmp_path)
+    writer.add_documents(docs("first", 3), ids=["a0", "a1", "a2"])
+    writer.persist()
+
+    reader = open_store(tmp_path)
+    assert reader.similarity_search("first chunk 1", k=1)[0].id == "a1"
+
+    writer.add_documents(docs("second", 2), ids=["b0", "b1"])
+    writer.delete(ids=["a0"])
+    writer.persist()
+
+    assert sorted(reader.get()["ids"]) == ["a1", "a2", "b0", "b1"]
+    assert reader.similarity_search("second chunk 0", k=1)[0].id == "b0"
+
+
+def test_persist_keeps_the_previous_version(tmp_path):
+    store = open_store(tmp_path)
+    for n in range(3):
+        store.add_documents(docs(f"round{n}", 1), ids=[f"r{n}"])
+        store.persist()
+
+    # A search that started on v2 can still read it; v1 is gone
+    assert sorted(p.name for p in tmp_path.glob("v*")) == ["v2", "v3"]
+    assert (tmp_path / "CURRENT").read_text(encoding="utf-8").strip() == "v3"
+
+
+def test_turning_rescoring_on_needs_a_rebuild(tmp_path):
+    store = open_store(tmp_path, rescore=False)
+    store.add_documents(docs("plain", 2), ids=["p0", "p1"])
+    store.persist()
+
+    with pytest.raises(ValueError, match="without rescoring"):
+        open_store(tmp_path, rescore=True)
+
+    # Turning it off again is fine: the next version just has no full.npy
+    store = open_store(tmp_path, rescore=False)
+    store.add_documents(docs("more", 1), ids=["m0"])
+    store.persist()
+    assert sorted(store.get()["ids"]) == ["m0", "p0", "p1"]
+
+
+def test_new_embedding_size_needs_a_rebuild(tmp_path):
+    store = open_store(tmp_path)
+    store.add_documents(docs("small", 2), ids=["s0", "s1"])
+    store.persist()
+
+    store = open_store(tmp_path, size=96)
+    store.add_documents(docs("large", 1), ids=["l0"])
+    with pytest.raises(ValueError, match="64-dim embeddings"):
+        store.persist()
+
+
+@pytest.fixture
+def clinic(tmp_path, monkeypatch):
+    """
+    A clinic with a.pdf and b.pdf, synced by ingest into a quantized store
+    with offline parsing and embeddings.
+    """
+    clinic = Tenant("test", "Test Clinic", "UTC", tmp_path / "Data", tmp_path / "vectorstore", tmp_path / "slots.sqlite")
+    clinic.data_dir.mkdir()
+    for name in ("a.pdf", "b.pdf"):
+        (clinic.data_dir / name).write_bytes(name.encode())
+
+    def parsed(paths, workers):
+        for path in paths:
+            yield path, {f"{path.stem}-{i}": doc for i, doc in enumerate(docs(path.stem, 2))}
+
+    embeddings = DeterministicFakeEmbedding(size=64)
+    monkeypatch.setattr(ingest, "VECTOR_BACKEND", "quantized")
+    monkeypatch.setattr(ingest, "iter_parsed", parsed)
+    monkeypatch.setattr(ingest, "get_embeddings", lambda: embeddings)
+    monkeypatch.setattr(ingest, "open_vectorstore",
+                        lambda c, fresh=False: QuantizedVectorStore(c.quantized_dir, embeddings, dim=16, fresh=fresh))
+    return clinic
+
+
+def failing_persist(self):
+    raise OSError("disk full")
+
+
+def test_manifest_is_written_only_after_persist(clinic, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(QuantizedVectorStore, "persist", failing_persist)
+        with pytest.raises(OSError):
+            ingest.sync_vectorstore(clinic=clinic, workers=1)
+    # Nothing reached the store, so nothing may be recorded as synced
+    assert ingest.load_manifest(clinic.manifest_path) == {}
+
+    ingest.sync_vectorstore(clinic=clinic, workers=1)
+
+    assert sorted(ingest.load_manifest(clinic.manifest_path)) == ["a.pdf", "b.pdf"]
+    assert sorted(open_store(clinic.quantized_dir).get()["ids"]) == ["a-0", "a-1", "b-0", "b-1"]
+
+
+def test_rebuild_keeps_serving_the_old_version_until_it_switches(clinic, monkeypatch):
+    ingest.sync_vectorstore(clinic=clinic, workers=1)
+    reader = open_store(clinic.quantized_dir)
+    (clinic.data_dir / "b.pdf").unlink()
+
+    with monkeypatch.context() as patch:
+        patch.setattr(QuantizedVectorStore, "persist", failing_persist)
+        with pytest.raises(OSError):
+            ingest.sync_vectorstore(rebuild=True, clinic=clinic, workers=1)
+    # Mid-rebuild (or after a failed one) the live store and manifest are untouched
+    assert len(reader.similarity_search("b chunk 0", k=4)) == 4
+    assert sorted(ingest.load_manifest(clinic.manifest_path)) == ["a.pdf", "b.pdf"]
+
+    ingest.sync_vectorstore(rebuild=True, clinic=clinic, workers=1)
+
+    assert sorted(reader.get()["ids"]) == ["a-0", "a-1"]
+    assert sorted(ingest.load_manifest(clinic.manifest_path)) == ["a.pdf"]
@@ -0,0 +1,53 @@
+# tests/test_replay.py  (replayed conversations stay in the clinic's namespace and leave no threads behind)
+
+import asyncio
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from checkpoint import BoundedMemorySaver
+from graph import build_graph
+from replay import OfflineChatModel, run_conversations
+from slots import SlotSchedule
+
+CONVERSATIONS = [
+    {"id": "a", "turns": ["What helps a sore throat?", "And for a cough?"]},
+    {"id": "b", "turns": ["What are your opening hours?"]},
+]
+
+
+def offline_graph(tmp_path, checkpointer):
+    store = InMemoryVectorStore(DeterministicFakeEmbedding(size=64))
+    store.add_documents([Document(page_content="Rest and fluids help a sore throat.",
+                                  metadata={"source": "Data/throat.pdf", "page": 0})])
+    return build_graph(
+        store.as_retriever(search_kwargs={"k": 2}),
+        OfflineChatModel(latency=0),
+        checkpointer=checkpointer,
+        response_cache=None,
+        schedule=SlotSchedule(tmp_path / "slots.sqlite"),
+    )
+
+
+def test_replay_threads_are_prefixed_and_deleted(tmp_path):
+    checkpointer = BoundedMemorySaver()
+    app_graph = offline_graph(tmp_path, checkpointer)
+
+    records = asyncio.run(run_conversations(app_graph, CONVERSATIONS, 2, lambda t: f"northside:{t}"))
+
+    assert len(records) == 3 and not any("error" in r for r in records)
+    assert all(r["thread_id"].startswith("northside:replay-") for r in records)
+    assert not checkpointer.storage
+    assert not checkpointer._last_seen
+
+
+def test_chat_batch_leaves_no_threads(serve, tmp_path):
+    checkpointer = BoundedMemorySaver()
+    client = serve(offline_graph(tmp_path, checkpointer))
+
+    response = client.post("/chat/batch", json={"conversations": [{"turns": c["turns"]} for c in CONVERSATIONS]})
+
+    assert response.status_code == 200
+    assert response.json()["summary"]["turns"] == 3
+    assert not checkpointer.storage
@@ -0,0 +1,33 @@
+# tests/test_rerank.py  (context packing stays inside the token budget)
+
+import random
+
+import pytest
+from langchain_core.documents import Document
+
+from rerank import CONTEXT_SEPARATOR, approx_tokens, pack_context
+
+
+def chunk(text, source="a.pdf"):
+    return Document(page_content=text, metadata={"source": source, "page": 0})
+
+
+def test_oversized_first_chunk_is_truncated():
+    big = chunk("word " * 1200)  # ~1500 tokens
+    packed = pack_context([(big, 1.0), (chunk("small", "b.pdf"), 0.5)], 4, 1200, 150)
+
+    assert len(packed) == 1
+    assert approx_tokens(packed[0].page_content) <= 1200
+    assert packed[0].page_content.endswith("word")
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_joined_context_never_exceeds_the_budget(seed):
+    rng = random.Random(seed)
+    ranked = [(chunk("x" * rng.randint(1, 2500), f"{i}.pdf"), 1.0) for i in range(10)]
+    budget = rng.randint(50, 1500)
+
+    packed = pack_context(ranked, 6, budget, 150)
+
+    assert packed
+    assert approx_tokens(CONTEXT_SEPARATOR.join(d.page_content for d in packed)) <= budget
@@ -0,0 +1,57 @@
+# Semantic response cache: what may be cached, and one embedding per missed turn.
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.messages import AIMessage, HumanMessage
+
+from response_cache import SemanticResponseCache, is_cacheable
+
+
+@pytest.mark.parametrize("question", [
+    "I'm John, what helps a sore throat?",
+    "Hi, I am Maria Lopez. Is the clinic open on Saturday?",
+    "My name is Sam and I have a cough",
+    "I am a 45 year old man with back pain",
+    "I'm 45, should I get a flu shot?",
+    "My 3-year-old has a fever",
+    "This is Dr. Patel, what are your hours?",
+    "my email is sam@example.com",
+    "Call me at +1 512 555 0100",
+])
+def test_personal_details_are_not_cached(question):
+    assert not is_cacheable([HumanMessage(content=question)])
+
+
+@pytest.mark.parametrize("question", [
+    "What are the clinic's opening hours?",
+    "How do I book an appointment?",
+    "What helps a sore throat?",
+    "I have a cough, what should I do?",
+])
+def test_generic_opening_questions_are_cached(question):
+    assert is_cacheable([HumanMessage(content=question)])
+
+
+def test_follow_up_turns_are_not_cached():
+    messages = [HumanMessage(content="What helps a cold?"), AIMessage(content="Rest."), HumanMessage(content="Thanks")]
+    assert not is_cacheable(messages)
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    queries: int = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+
+def test_store_after_miss_reuses_the_lookup_vector():
+    embeddings = CountingEmbeddings(size=32)
+    cache = SemanticResponseCache(embeddings, threshold=0.99)
+
+    assert cache.lookup("What are your hours?") is None
+    cache.store("What are your hours?", "9 to 5, Monday to Friday.", [])
+    assert embeddings.queries == 1
+
+    assert cache.lookup("What are your hours?")["answer"] == "9 to 5, Monday to Friday."
+    assert embeddings.queries == 2
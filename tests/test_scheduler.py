@@ -0,0 +1,133 @@
+# tests/test_scheduler.py  (a 429 pauses its kind in every lane, then the call is retried)
+
+import threading
+import time
+
+import httpx
+import openai
+import pytest
+from langchain_core.messages import HumanMessage
+
+from scheduler import BULK, CHAT, EMBEDDINGS, URGENT, CallScheduler, ScheduledChatOpenAI, call_lane
+
+URL = "https://api.openai.test/v1/chat/completions"
+
+
+def rate_limited(retry_after_ms: int) -> openai.RateLimitError:
+    response = httpx.Response(429, headers={"retry-after-ms": str(retry_after_ms)}, request=httpx.Request("POST", URL))
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+
+class FakeProvider:
+    """
+    Answers 429 with a Retry-After for its first `failures` calls, then echoes
+    the label it was called with. Records when each call arrived.
+    """
+
+    def __init__(self, failures: int = 0, retry_after_ms: int = 300):
+        self.failures = failures
+        self.retry_after_ms = retry_after_ms
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, label: str) -> str:
+        with self._lock:
+            self.calls.append((label, time.monotonic()))
+            if self.failures:
+                self.failures -= 1
+                raise rate_limited(self.retry_after_ms)
+        return label
+
+
+def scheduler(**kwargs) -> CallScheduler:
+    kwargs = {"max_concurrency": 4, "max_retries": 3, "backoff_base": 0.01, "backoff_max": 5.0, **kwargs}
+    return CallScheduler({CHAT: (0, 0), EMBEDDINGS: (0, 0)}, **kwargs)
+
+
+def in_thread(lane, func, *args) -> threading.Thread:
+    def run():
+        with call_lane(lane):
+            func(*args)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def wait_until(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_429_is_retried_after_retry_after():
+    provider = FakeProvider(failures=1, retry_after_ms=200)
+
+    assert scheduler().call(CHAT, lambda: provider("ask"), tokens=10) == "ask"
+
+    (_, failed_at), (_, retried_at) = provider.calls
+    assert retried_at - failed_at >= 0.2
+
+
+def test_429_gives_up_after_max_retries():
+    provider = FakeProvider(failures=10, retry_after_ms=10)
+
+    with pytest.raises(openai.RateLimitError):
+        scheduler(max_retries=2).call(CHAT, lambda: provider("ask"), tokens=10)
+    assert len(provider.calls) == 3
+
+
+def test_429_pauses_every_lane_of_its_kind_only():
+    calls = scheduler()
+    provider = FakeProvider()
+    hit_at = time.monotonic()
+    calls.retry_delay(CHAT, rate_limited(300), attempt=0)
+
+    urgent = in_thread(URGENT, calls.call, CHAT, lambda: provider("urgent chat"), 10)
+    embed = in_thread(BULK, calls.call, EMBEDDINGS, lambda: provider("embeddings"), 10)
+    for thread in (urgent, embed):
+        thread.join(timeout=5)
+
+    arrived = dict(provider.calls)
+    assert arrived["embeddings"] - hit_at < 0.2
+    assert arrived["urgent chat"] - hit_at >= 0.3
+
+
+def test_paused_lanes_resume_in_priority_order():
+    calls = scheduler(max_concurrency=1)
+    provider = FakeProvider()
+    calls.retry_delay(CHAT, rate_limited(300), attempt=0)
+
+    # Bulk queues first, urgent second; once the pause ends urgent still goes first
+    bulk = in_thread(BULK, calls.call, CHAT, lambda: provider("bulk"), 10)
+    wait_until(lambda: len(calls._queue) == 1)
+    urgent = in_thread(URGENT, calls.call, CHAT, lambda: provider("urgent"), 10)
+    wait_until(lambda: len(calls._queue) == 2)
+    for thread in (bulk, urgent):
+        thread.join(timeout=5)
+
+    assert [label for label, _ in provider.calls] == ["urgent", "bulk"]
+
+
+def test_scheduled_chat_model_retries_a_429_from_the_api():
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(time.monotonic())
+        if len(requests) == 1:
+            return httpx.Response(429, headers={"retry-after-ms": "100"},
+                                  json={"error": {"message": "Rate limit reached", "type": "requests"}})
+        return httpx.Response(200, json={
+            "id": "chatcmpl-test", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": "Rest and fluids."}}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 3, "total_tokens": 8},
+        })
+
+    llm = ScheduledChatOpenAI(model="gpt-4o-mini", api_key="test", base_url="https://api.openai.test/v1",
+                              max_retries=0, http_client=httpx.Client(transport=httpx.MockTransport(handler)))
+
+    assert llm.invoke([HumanMessage("What helps a sore throat?")]).content == "Rest and fluids."
+    assert len(requests) == 2
+    assert requests[1] - requests[0] >= 0.1
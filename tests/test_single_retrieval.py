@@ -0,0 +1,53 @@
+# One /chat turn = one query embedding + one vector search, and the
+# response's sources come from that search.
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.vectorstores import InMemoryVectorStore
+
+from checkpoint import BoundedMemorySaver
+from graph import build_graph
+from replay import OfflineChatModel
+from slots import SlotSchedule
+
+
+class CountingEmbeddings(DeterministicFakeEmbedding):
+    queries: int = 0
+
+    def embed_query(self, text):
+        self.queries += 1
+        return super().embed_query(text)
+
+
+class CountingStore(InMemoryVectorStore):
+    searches = 0
+
+    def similarity_search(self, query, k=4, **kwargs):
+        self.searches += 1
+        return super().similarity_search(query, k=k, **kwargs)
+
+
+def test_chat_turn_searches_once(serve, tmp_path):
+    embeddings = CountingEmbeddings(size=64)
+    store = CountingStore(embeddings)
+    store.add_documents([
+        Document(page_content=f"Sore throat care, part {i}: rest, fluids and lozenges.",
+                 metadata={"source": "Data/throat.pdf", "page": i})
+        for i in range(6)
+    ])
+    app_graph = build_graph(
+        store.as_retriever(search_kwargs={"k": 4}),
+        OfflineChatModel(latency=0),
+        checkpointer=BoundedMemorySaver(),
+        response_cache=None,
+        schedule=SlotSchedule(tmp_path / "slots.sqlite"),
+    )
+    client = serve(app_graph)
+
+    response = client.post("/chat", json={"question": "What helps a sore throat?", "thread_id": "t1"})
+
+    assert response.status_code == 200
+    assert embeddings.queries == 1
+    assert store.searches == 1
+    sources = response.json()["sources"]
+    assert sources and all(s.startswith("Data/throat.pdf (page ") for s in sources)
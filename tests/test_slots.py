@@ -0,0 +1,48 @@
+# tests/test_slots.py  (one slot, many workers: exactly one reservation wins, and everyone sees it)
+
+import threading
+from datetime import date, timedelta
+
+from slots import SlotSchedule
+
+
+def next_weekday() -> date:
+    day = date.today() + timedelta(days=1)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+def test_parallel_reservations_of_one_slot(tmp_path):
+    # Four "workers", each with its own connection and bitmap, eight threads each
+    schedules = [SlotSchedule(tmp_path / "slots.sqlite", ["Dr. A"]) for _ in range(4)]
+    day = next_weekday()
+    start = threading.Barrier(32)
+    results = []
+
+    def book(schedule, n):
+        start.wait()
+        results.append(schedule.reserve(day, "10:00", booking_id=f"b{n}"))
+
+    threads = [threading.Thread(target=book, args=(schedules[n % 4], n)) for n in range(32)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len([r for r in results if r]) == 1
+    assert all(not s.is_free(day, "10:00") for s in schedules)
+
+
+def test_other_workers_bookings_and_releases_are_seen(tmp_path):
+    a = SlotSchedule(tmp_path / "slots.sqlite", ["Dr. A"])
+    b = SlotSchedule(tmp_path / "slots.sqlite", ["Dr. A"])
+    day = next_weekday()
+    assert b.is_free(day, "09:00")
+
+    booked = a.reserve(day, "09:00")
+    assert not b.is_free(day, "09:00")
+    assert "09:00" not in [s["time"] for s in b.free_slots(day, limit=16)]
+
+    a.release(booked["booking_id"])
+    assert b.is_free(day, "09:00")
@@ -0,0 +1,56 @@
+# tests/test_tenants.py  (clinic thread namespaces; evicted clinics give their memory back)
+
+import asyncio
+import gc
+import weakref
+
+from chromadb.api.shared_system_client import SharedSystemClient
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+import graph
+from replay import OfflineChatModel
+from tenants import Tenant, TenantRegistry
+
+
+def clinic(tmp_path, tenant_id: str) -> Tenant:
+    root = tmp_path / tenant_id
+    return Tenant(tenant_id, f"Clinic {tenant_id}", "UTC", root / "Data", root / "vectorstore", root / "schedule.sqlite")
+
+
+def test_every_clinic_has_its_own_thread_namespace(tmp_path):
+    default, northside = clinic(tmp_path, "default"), clinic(tmp_path, "northside")
+
+    assert default.thread_key("x") == "default:x"
+    assert default.thread_key("northside:x") != northside.thread_key("x")
+
+
+def test_evicted_clinics_release_their_chroma_system_and_graph(tmp_path, monkeypatch):
+    embeddings = DeterministicFakeEmbedding(size=64)
+    monkeypatch.setattr(graph, "VECTOR_BACKEND", "chroma")
+    monkeypatch.setattr(graph, "get_embeddings", lambda: embeddings)
+    monkeypatch.setattr(graph, "get_llm", lambda: OfflineChatModel(latency=0))
+
+    clinics = {c.id: c for c in (clinic(tmp_path, name) for name in ("a", "b", "c"))}
+    for c in clinics.values():
+        store = graph.open_vectorstore(c)
+        store.add_texts([f"{c.name} opens at nine."])
+        graph.close_vectorstore(store)
+
+    registry = TenantRegistry(clinics, graph.load_clinic, max_loaded=1)
+    graphs = {}
+
+    async def load_all():
+        for tenant_id in clinics:
+            graphs[tenant_id] = weakref.ref(await registry.get(tenant_id))
+
+    asyncio.run(load_all())
+    gc.collect()
+
+    assert registry.evictions == 2
+    live = [path for path in SharedSystemClient._identifier_to_system if path.startswith(str(tmp_path))]
+    assert live == [str(clinics["c"].vectorstore_dir)]
+    assert graphs["a"]() is None and graphs["b"]() is None
+    assert graphs["c"]() is not None
+
+    registry.close()
+    assert not [path for path in SharedSystemClient._identifier_to_system if path.startswith(str(tmp_path))]
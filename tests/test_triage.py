@@ -0,0 +1,26 @@
+# tests/test_triage.py  (labeled triage cases: every case routed right, in well under a millisecond)
+
+import json
+import time
+from pathlib import Path
+
+import pytest
+
+from triage import TriageClassifier
+
+CASES = [json.loads(line) for line in open(Path(__file__).parent / "fixtures" / "triage_cases.jsonl", encoding="utf-8")]
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case["text"][:40] for case in CASES])
+def test_case(case):
+    assert TriageClassifier().classify(case["text"]) == case["label"]
+
+
+def test_rules_take_well_under_a_millisecond():
+    classifier = TriageClassifier()
+    started = time.perf_counter()
+    for _ in range(20):
+        for case in CASES:
+            classifier.classify(case["text"])
+    per_message = (time.perf_counter() - started) / (20 * len(CASES))
+    assert per_message < 0.001
@@ -0,0 +1,212 @@
+# triage.py  (deterministic emergency / off-topic routing at the graph entry)
+
+import os
+import re
+from typing import Optional
+
+
+# Canned replies, word for word from prompts.system_prompt()
+EMERGENCY_REPLY = (
+    "Your symptoms could be serious. Please seek emergency medical care immediately "
+    "or call your local emergency number."
+)
+OFF_TOPIC_REPLY = (
+    "I’m here to help with medical and clinic-related topics only. Please ask me a "
+    "medical question or something related to visiting the clinic."
+)
+
+EMERGENCY = "emergency"
+OFF_TOPIC = "off_topic"
+MEDICAL = "medical"
+BOOKING = "booking"     # set by the graph when the booking flow owns the turn
+
+# Optional sklearn-style pipeline (joblib file) consulted when no pattern fires
+TRIAGE_MODEL = os.getenv("TRIAGE_MODEL")
+
+
+EMERGENCY_RE = re.compile(
+    r"""
+      chest\s+(pain|pressure|tightness)
+    | (can'?t|cannot|unable\s+to|hard\s+to|struggling\s+to|trouble)\s+breath(e|ing)
+    | short(ness)?\s+of\s+breath
+    | not\s+breathing | stopped\s+breathing | choking
+    | (having|had)\s+(a\s+)?(heart\s+attack|stroke|seizure)
+    | face\s+(is\s+)?droop\w* | slurred\s+speech
+    | (one\s+side|left\s+side|right\s+side)\s+(of\s+my\s+body\s+)?(is\s+)?(numb|weak)
+    | unconscious | passed\s+out | fainted | unresponsive
+    | seizing | convulsing
+    | anaphyla\w* | throat\s+(is\s+)?(closing|swelling)
+    | (severe|heavy|uncontrolled|won'?t\s+stop)\s+bleeding | bleeding\s+(heavily|won'?t\s+stop)
+    | vomiting\s+blood | coughing\s+(up\s+)?blood
+    | overdosed | took\s+too\s+many | poisoned
+    | swallowed\s+(a\s+|an\s+|some\s+)?(button\s+)?(batter(y|ies)|magnets?|bleach|poison|detergent|chemicals?)
+    | suicid\w* | kill\s+myself | end\s+my\s+life | self[-\s]?harm
+    | want\s+to\s+die(?!\s+(of|from)\s+(boredom|embarrassment|shame|laugh\w*))
+    | worst\s+headache\s+of\s+my\s+life
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+SELF_HARM_RE = re.compile(r"suicid\w*|kill\s+myself|end\s+my\s+life|self[-\s]?harm|want\s+to\s+die", re.IGNORECASE)
+
+# Only the clause an emergency phrase sits in can negate it: "I'm not sure, but I have chest pain" is not negated
+CLAUSE_BREAK_RE = re.compile(r"[.,;:!?]|\b(but|however|although|though|yet|now)\b", re.IGNORECASE)
+
+# The negation must end right before the phrase, with at most a few filler words in between:
+# "no chest pain", "I don't have any shortness of breath", "denies chest pain", ...
+NEGATION_RE = re.compile(
+    r"""
+    \b(no|not|never|without|den(y|ies|ied)|(do|does|did|have|has|had|is|was|am|are)n'?t)
+    (\s+(any|a|an|have|has|had|having|experienc\w+|feel\w*|felt|got|get\w*|been|signs?\s+of|history\s+of))*
+    \s*$
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# "no chest pain or shortness of breath": the second phrase shares the first one's negation
+LIST_JOIN_RE = re.compile(r"^\s*(,|,?\s*(or|and|nor))\s*(any\s+)?$", re.IGNORECASE)
+
+# Asking about a symptom is not having it: "What causes chest pain?" gets an answer...
+INFO_QUESTION_RE = re.compile(
+    r"""
+      \b(what|which)\s+(causes?|is|are|does|do|can\s+cause|might\s+cause|are\s+the\s+(signs?|symptoms?|causes?))\b
+    | \bwhy\s+(do|does|did|would|might|can|is|are|am)\b
+    | \bhow\s+(do|does|can|common|serious|long)\b
+    | \bis\s+(it|that|this)\b
+    | \b(signs?|symptoms?|causes?|risk\s+factors?)\s+of\b
+    | \b(explain|tell\s+me\s+about|difference\s+between)\b
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# ...unless the message also says it is happening to someone now: "I have chest pain, what causes it?"
+ACUTE_RE = re.compile(
+    r"""
+      \b(now|right\s+now|currently|at\s+the\s+moment|just|suddenly|today|tonight
+      | this\s+(morning|afternoon|evening)|minutes?\s+ago|an?\s+hour\s+ago
+      | help|ambulance|911|999|112)\b
+    | \b(i'?m|i\s+am|i\s+have|i'?ve|i\s+can'?t|i\s+cannot|he'?s|she'?s|they'?re|we'?re)\b
+    | \b(he|she|it|they|my\s+\w+|his\s+\w+|her\s+\w+)\s+(is|are|has|have|can'?t|cannot|isn'?t|won'?t|keeps?)\b
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+OFF_TOPIC_RE = re.compile(
+    r"""
+      \b(weather|forecast|football|soccer|basketball|cricket|nba|nfl|world\s+cup
+      | stock(s|\s+market)? | crypto\w* | bitcoin | forex
+      | recipe | cook(ing)? | bake | restaurant
+      | movie | film | netflix | song | lyrics | music | celebrity
+      | python | javascript | programming | code | coding | sql
+      | poem | joke | riddle | essay | homework | translate
+      | capital\s+of | president\s+of | election | politics
+      | travel | flight | hotel | vacation
+      | car | iphone | laptop | video\s+game)\b
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+# Medical is the default: a message is refused as off-topic only when it hits OFF_TOPIC_RE
+# and none of these symptom, condition, medication, body or care words. Wrongly refusing a
+# patient is worse than answering a stray question, so this list errs wide.
+MEDICAL_RE = re.compile(
+    r"""
+      \b(pain\w*|ache\w*|sore|hurt\w*|sick\w*|ill|illness|unwell|fever\w*|temperature|chills|shiver\w*
+      | cough\w*|cold|colds|flu|sneez\w*|congest\w*|runny|wheez\w*|breath\w*|tired\w*|fatigue\w*|exhaust\w*
+      | weak\w*|numb\w*|tingl\w*|cramp\w*|spasm\w*|stiff\w*|lump\w*|rash\w*|hives|itch\w*|spots|acne|pimples?
+      | blisters?|swell\w*|swollen|vomit\w*|nause\w*|threw\s+up|throw\w*\s+up|puk\w*|diarrh\w*|constipat\w*
+      | bloat\w*|heartburn|indigestion|reflux|dizz\w*|faint\w*|vertigo|migraines?|insomnia|snor\w*
+      | flare\w*|attacks?|symptom\w*|dehydrat\w*|hangover|jet\s*lag|sunburn\w*|sunstroke|heatstroke|frostbite
+      | injur\w*|accident\w*|fell|fall(en|ing)?|broke|broken|fractur\w*|sprain\w*|bruis\w*|cut|wound\w*
+      | burn\w*|scald\w*|bite|bites|bitten|sting\w*|stung|bleed\w*|blood|poison\w*|swallow\w*|chok\w*
+      | period|periods|menstru\w*|urin\w*|pee|discharge|palpitat\w*|weight|sleep\w*|stress\w*|anxi\w*|panic
+      | asthma\w*|allerg\w*|eczema|psoriasis|diabet\w*|cancer|tumou?rs?|covid|coronavirus|measles|mumps
+      | chickenpox|shingles|herpes|hiv|std|stds|sti|stis|uti|utis|ibs|copd|adhd|autism|dementia|alzheimer\w*
+      | parkinson\w*|epilep\w*|thyroid|cholesterol|anemi\w*|anaemi\w*|crohn\w*|coeliac|celiac|lactose
+      | intoleran\w*|obes\w*|virus\w*|viral|bacteri\w*|strep|malaria|typhoid|rabies|lyme|mosquito\w*|ticks?
+      | infect\w*|disease\w*|disorder\w*|condition\w*|syndrome|depress\w*|pressure|sugar|pregnan\w*
+      | miscarr\w*|contracept\w*|fertil\w*
+      | \w{3,}(itis|osis|emia|aemia|algia|ectomy|otomy|oscopy|plasty|pathy|uria)
+      | medic\w*|meds|drugs?|pills?|dose\w*|dosage|tablets?|capsules?|prescri\w*|pharmac\w*|cream|ointment
+      | drops|syrup|vitamin\w*|supplement\w*|steroid\w*|antibiotic\w*|antihistamine\w*|antidepressant\w*
+      | paracetamol|acetaminophen|aspirin|tylenol|advil|motrin|aleve|nurofen|calpol|panadol|excedrin
+      | benadryl|claritin|zyrtec|allegra|sudafed|mucinex|nyquil|dayquil|imodium|pepto\w*|gaviscon|rennie|tums
+      | melatonin|insulin|inhaler\w*|ventolin|epipen|codeine|morphine|tramadol|naproxen|diclofenac
+      | cortisone|xanax|valium|adderall|ritalin|ozempic|wegovy|viagra
+      | \w{3,}(profen|cillin|mycin|cycline|oxacin|statin|prazole|olol|pril|sartan|formin|azepam|zolam
+      | oxetine|aline|tadine|tidine|triptan|olone|gliptin|glutide)
+      | doctor\w*|gp|clinic\w*|nurse\w*|appointment\w*|book\w*|visit|referral|hospital\w*|a&e|emergency
+      | health\w*|diet|nutrition|operation|surgery|stitches|recover\w*|vaccin\w*|jab|jabs|shot|shots
+      | test|tests|scan|x-ray|icd|diagnos\w*|treat\w*|therap\w*|remed\w*|first\s+aid
+      | heart|lung\w*|stomach|belly|bowel\w*|gut|liver|kidney\w*|bladder|skin|eyes?|ears?|nose|sinus\w*
+      | mouth|lips?|tongue|throat|neck|head\w*|face|chest|back|spine|arms?|elbows?|wrists?|hands?|fingers?
+      | thumbs?|legs?|hips?|knees?|ankles?|feet|foot|toes?|shoulders?|muscles?|joints?|bones?|tooth|teeth|gums?)\b
+    | \b(what|which)\s+(can|should)\s+(i|we|he|she)\s+(take|give)\b
+    | \b(ok|okay|safe|fine|alright)\s+to\s+(take|give)\b
+    """,
+    re.IGNORECASE | re.VERBOSE,
+)
+
+
+def _is_negated(text: str, start: int) -> bool:
+    clause_start = 0
+    for brk in CLAUSE_BREAK_RE.finditer(text, 0, start):
+        clause_start = brk.end()
+    return NEGATION_RE.search(text[clause_start:start]) is not None
+
+
+def _has_unnegated_emergency(text: str) -> bool:
+    previous = None     # (end, negated) of the last emergency phrase
+    for match in EMERGENCY_RE.finditer(text):
+        if previous and previous[1] and LIST_JOIN_RE.match(text[previous[0]:match.start()]):
+            negated = True
+        else:
+            negated = _is_negated(text, match.start())
+        if not negated:
+            return True
+        previous = (match.end(), negated)
+    return False
+
+
+def _is_emergency(text: str) -> bool:
+    if not _has_unnegated_emergency(text):
+        return False
+    # Self-harm wording is never treated as a mere question
+    if SELF_HARM_RE.search(text):
+        return True
+    return not (INFO_QUESTION_RE.search(text) and not ACUTE_RE.search(text))
+
+
+class TriageClassifier:
+    """
+    Regex rules first; an optional local model only when no rule fires.
+    """
+
+    def __init__(self, model=None):
+        self.model = model
+
+    def classify(self, text: str) -> str:
+        if _is_emergency(text):
+            return EMERGENCY
+        if OFF_TOPIC_RE.search(text) and not MEDICAL_RE.search(text):
+            return OFF_TOPIC
+        if self.model is not None:
+            label = str(self.model.predict([text])[0])
+            if label in (EMERGENCY, OFF_TOPIC):
+                return label
+        return MEDICAL
+
+
+def canned_reply(route: str) -> Optional[str]:
+    return {EMERGENCY: EMERGENCY_REPLY, OFF_TOPIC: OFF_TOPIC_REPLY}.get(route)
+
+
+def get_triage_classifier() -> TriageClassifier:
+    if not TRIAGE_MODEL:
+        return TriageClassifier()
+    try:
+        import joblib
+    except ImportError as e:
+        raise ImportError("TRIAGE_MODEL needs joblib: pip install joblib scikit-learn") from e
+    print(f"[RAG] Loading triage model from: {TRIAGE_MODEL}")
+    return TriageClassifier(model=joblib.load(TRIAGE_MODEL))